@@ -0,0 +1,369 @@
+"""HTTP cache of full responses with ETag and conditional requests."""
+from collections import defaultdict
+from functools import partial
+from hashlib import sha256
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from typing import Awaitable, Callable, Collection
+from urllib.parse import parse_qsl
+
+from fastapi.security.utils import get_authorization_scheme_param
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.logger import get_logger
+from db.cache import dependency as cache_dependency
+from db.cache.helpers import prepare_key_by_args
+from security.auth import get_auth, is_token_valid
+
+logger = get_logger(__name__)
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Ответы с этими параметрами не кешируются: курсор ссылается на point
+# in time, который закрывается после последней страницы или истекает
+NO_STORE_PARAMS = frozenset(("cursor",))
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against an entity tag."""
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _access_token(headers: Headers) -> str | None:
+    """Return the access token from the request cookies."""
+    cookie = SimpleCookie(headers.get("cookie", ""))
+    if "access_token" not in cookie:
+        return None
+    scheme, token = get_authorization_scheme_param(
+        cookie["access_token"].value,
+    )
+    return token if scheme.lower() == "bearer" else None
+
+
+def _parse_query(scope: Scope) -> dict[str, list[str]]:
+    """Parse the query string, values of a param are kept in a list."""
+    query = defaultdict(list)
+    for name, query_arg in parse_qsl(
+        scope["query_string"].decode(),
+        keep_blank_values=True,
+    ):
+        query[name].append(query_arg)
+    return query
+
+
+class _NoStoreSend:
+    """ASGI send that forbids to store the response anywhere."""
+
+    def __init__(self, send: Send) -> None:
+        self.send = send
+
+    async def __call__(self, message: Message):
+        """Mark the response no-store and send it."""
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            headers["cache-control"] = "no-store"
+        await self.send(message)
+
+
+class _BufferingSend:
+    """ASGI send that buffers a cacheable response.
+
+    A successful JSON response that does not set cookies is buffered
+    and its start message and body are passed to `on_response` when
+    the body is complete. Any other response is sent as is.
+
+    Args:
+        send: the ASGI send of the server.
+        on_response: sends and stores the buffered response.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        on_response: Callable[[Message, bytes], Awaitable[None]],
+    ) -> None:
+        self.send = send
+        self.on_response = on_response
+        self._start: Message | None = None
+        self._passthrough = False
+        self._chunks: list[bytes] = []
+
+    async def __call__(self, message: Message):
+        """Buffer or pass through a message of the response."""
+        if self._passthrough:
+            return await self.send(message)
+
+        if self._start is None:
+            headers = Headers(raw=message["headers"])
+            self._passthrough = (
+                message["status"] != HTTPStatus.OK
+                or "set-cookie" in headers
+                or not headers.get("content-type", "").startswith(
+                    JSON_MEDIA_TYPE,
+                )
+            )
+            if self._passthrough:
+                return await self.send(message)
+            self._start = message
+            return None
+
+        self._chunks.append(message.get("body", b""))
+        if message.get("more_body", False):
+            return None
+        return await self.on_response(self._start, b"".join(self._chunks))
+
+
+class HTTPCacheMiddleware:
+    """Cache successful JSON responses of GET requests.
+
+    Responses are stored in the app cache by the route path and
+    normalized query params, with a strong ETag of the body. A request
+    with a matching If-None-Match is answered with 304 and a cached body
+    is returned without calling the route.
+
+    Routes that depend on get_auth are served from cache only for a
+    valid access token; they are marked private and vary by cookie.
+    Responses that set cookies, e.g. refreshed tokens, are not cached.
+    Requests with NO_STORE_PARAMS, e.g. cursor pages, are not cached
+    and their responses are marked no-store. Cache errors are logged,
+    a response is stored only after it is sent.
+
+    Only routes of `include_routes`, if set, and not of `exclude_routes`
+    are cached, e.g. streamed exports are excluded, so requests to them
+    skip the cache lookup. Routes are given by their path templates.
+
+    Args:
+        app: the ASGI app to wrap.
+        routes: routes of the app, to find out which are protected.
+        max_age: max-age of Cache-Control and TTL of cached responses.
+        path_prefix: only paths with this prefix are cached.
+        include_routes: path templates of the only routes to cache.
+        exclude_routes: path templates of routes not to cache.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: list[BaseRoute],
+        max_age: int = 60,
+        path_prefix: str = "/",
+        include_routes: Collection[str] | None = None,
+        exclude_routes: Collection[str] = (),
+    ) -> None:
+        self.app = app
+        self.routes = routes
+        self.max_age = max_age
+        self.path_prefix = path_prefix
+        self.include_routes = (
+            None if include_routes is None else frozenset(include_routes)
+        )
+        self.exclude_routes = frozenset(exclude_routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Serve a request from the cache or cache its response."""
+        protected = self._is_protected(scope)
+        if protected is None:
+            return await self.app(scope, receive, send)
+
+        query = _parse_query(scope)
+        if NO_STORE_PARAMS & query.keys():
+            return await self._call_no_store(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        if_none_match = headers.get("if-none-match")
+        cache_control = "{0}, max-age={1}".format(
+            "private" if protected else "public",
+            self.max_age,
+        )
+        key = prepare_key_by_args(
+            auth_scope="auth" if protected else "public",
+            path=scope["path"],
+            query=query,
+        )
+
+        # Защищённый ответ отдаётся из кеша только с действующим токеном
+        if not protected or is_token_valid(_access_token(headers)):
+            entry = await self._load(key)
+            if entry:
+                etag, media_type, body = entry.split(b"\n", 2)
+                response = self._response(
+                    body=body,
+                    etag=etag.decode(),
+                    media_type=media_type.decode(),
+                    cache_control=cache_control,
+                    protected=protected,
+                    if_none_match=if_none_match,
+                )
+                return await response(scope, receive, send)
+
+        await self._call_and_store(
+            scope,
+            receive,
+            send,
+            key=key,
+            cache_control=cache_control,
+            protected=protected,
+            if_none_match=if_none_match,
+        )
+
+    def _is_protected(self, scope: Scope) -> bool | None:
+        """Check whether the matching route requires authentication.
+
+        Returns:
+            None if the request is not cached, e.g. no route matches it.
+        """
+        if (
+            cache_dependency.cache is None
+            or scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            return None
+
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                if not self._is_cached(route):
+                    return None
+                return any(
+                    depends.dependency is get_auth
+                    for depends in getattr(route, "dependencies", [])
+                )
+        return None
+
+    def _is_cached(self, route: BaseRoute) -> bool:
+        """Check a route against the lists of included and excluded."""
+        path = getattr(route, "path", None)
+        if path in self.exclude_routes:
+            return False
+        return self.include_routes is None or path in self.include_routes
+
+    async def _load(self, key: str) -> bytes | None:
+        """Get a cached response, a cache error is a miss."""
+        try:
+            return await cache_dependency.cache.get(  # type: ignore
+                name="http_response",
+                key=key,
+                raw=True,
+            )
+        except Exception as error:
+            logger.warning(
+                "HTTP response cache get failed: {0!r}".format(error),
+            )
+            return None
+
+    async def _store(self, key: str, etag: str, media_type: str, body: bytes):
+        """Cache a response, a cache error only loses the entry."""
+        try:
+            await cache_dependency.cache.set(  # type: ignore
+                name="http_response",
+                key=key,
+                key_value=b"\n".join(
+                    (etag.encode(), media_type.encode(), body),
+                ),
+                expire_time=self.max_age,
+            )
+        except Exception as error:
+            logger.warning(
+                "HTTP response cache set failed: {0!r}".format(error),
+            )
+
+    async def _call_no_store(self, scope: Scope, receive: Receive, send: Send):
+        """Call the app, forbidding to store its response anywhere."""
+        await self.app(scope, receive, _NoStoreSend(send))
+
+    def _response(
+        self,
+        body: bytes,
+        etag: str,
+        media_type: str,
+        cache_control: str,
+        protected: bool,
+        if_none_match: str | None,
+    ) -> Response:
+        """Build a full or a not modified response for a cached body."""
+        headers = {"etag": etag, "cache-control": cache_control}
+        if protected:
+            headers["vary"] = "Cookie"
+        if _etag_matches(if_none_match, etag):
+            return Response(
+                status_code=HTTPStatus.NOT_MODIFIED,
+                headers=headers,
+            )
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    async def _call_and_store(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        key: str,
+        cache_control: str,
+        protected: bool,
+        if_none_match: str | None,
+    ):
+        """Call the app and cache its response if it is cacheable.
+
+        A cacheable response is buffered to compute its ETag, any other
+        one is passed through as is.
+        """
+        await self.app(
+            scope,
+            receive,
+            _BufferingSend(
+                send,
+                on_response=partial(
+                    self._send_and_store,
+                    scope,
+                    receive,
+                    send,
+                    key=key,
+                    cache_control=cache_control,
+                    protected=protected,
+                    if_none_match=if_none_match,
+                ),
+            ),
+        )
+
+    async def _send_and_store(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        start: Message,
+        body: bytes,
+        key: str,
+        cache_control: str,
+        protected: bool,
+        if_none_match: str | None,
+    ):
+        """Send a buffered response with its ETag and cache it."""
+        etag = '"{0}"'.format(sha256(body).hexdigest()[:32])
+        media_type = Headers(raw=start["headers"]).get("content-type")
+
+        if _etag_matches(if_none_match, etag):
+            response = self._response(
+                body=body,
+                etag=etag,
+                media_type=media_type,
+                cache_control=cache_control,
+                protected=protected,
+                if_none_match=if_none_match,
+            )
+            await response(scope, receive, send)
+        else:
+            headers = MutableHeaders(raw=start["headers"])
+            headers["etag"] = etag
+            headers["cache-control"] = cache_control
+            if protected:
+                headers.append("vary", "Cookie")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self._store(key, etag, media_type, body)
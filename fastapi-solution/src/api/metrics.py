@@ -0,0 +1,64 @@
+"""Runtime statistics of caches and clients for operators."""
+from typing import Any
+
+from fastapi import APIRouter
+
+from db.cache import dependency as cache_dependency
+from db.cache.abc.cache import AbstractCache
+from db.cache.breaker import CircuitBreakerCache
+from db.cache.local import LocalCache
+from db.cache.writer import WriteBehindCache
+from db.search import dependency as search_dependency
+from db.search.elastic.search import Search
+from security import dependency as auth_dependency
+
+router = APIRouter()
+
+
+def find_cache_layer(
+    cache: AbstractCache | None,
+    layer_type: type[AbstractCache],
+) -> Any | None:
+    """Find a wrapper of a type in the chain of cache wrappers."""
+    while cache is not None:
+        if isinstance(cache, layer_type):
+            return cache
+        cache = getattr(cache, "cache", None)
+    return None
+
+
+@router.get("/metrics")
+async def metrics() -> dict[str, Any]:
+    """
+    ### Return runtime statistics of caches and clients.
+
+    Only components enabled in settings are reported.
+
+    ### Returns:
+    - **cache_breaker**: state and counters of the Redis circuit breaker.
+    - **cache_writer**: pending, applied, dropped and failed cache writes.
+    - **local_cache**: occupancy and hit statistics of the in-process cache.
+    - **claims_cache**: occupancy and hit statistics of verified tokens.
+    - **search_pool**: connections and requests of every search node.
+    """
+    stats: dict[str, Any] = {}
+
+    breaker = find_cache_layer(cache_dependency.cache, CircuitBreakerCache)
+    if breaker is not None:
+        stats["cache_breaker"] = breaker.stats()
+
+    writer = find_cache_layer(cache_dependency.cache, WriteBehindCache)
+    if writer is not None:
+        stats["cache_writer"] = writer.stats()
+
+    local = find_cache_layer(cache_dependency.cache, LocalCache)
+    if local is not None:
+        stats["local_cache"] = local.stats()
+
+    if auth_dependency.claims_cache is not None:
+        stats["claims_cache"] = auth_dependency.claims_cache.stats()
+
+    if isinstance(search_dependency.db, Search):
+        stats["search_pool"] = search_dependency.db.stats()
+
+    return stats
@@ -1,16 +1,27 @@
 """Response model and etc for api."""
-from pydantic import BaseModel, Field
-from uuid import UUID
-from models.common import ConfigOrjsonMixin
+from http import HTTPStatus
 from math import ceil
-from fastapi import Query
+from typing import Annotated, ClassVar
+from uuid import UUID
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, Field
+
 from core.config import es_conf
-from typing import Annotated
+from core.messages import INVALID_FIELDS
+from models.common import ConfigOrjsonMixin
+from models.film import Film
+
+# Поля фильма в ответе и соответствующие им поля индекса
+FILM_FIELDS = {field.alias: name for name, field in Film.__fields__.items()}
 
 
 class ResponseFilms(BaseModel):
     """Response model for the film list endpoints."""
 
+    # Поля фильма, которые нужно получить из индекса для этой модели
+    source_fields: ClassVar[list[str]] = ["id", "title", "imdb_rating"]
+
     class _ResponseFilm(BaseModel):
         """Response film submodel."""
 
@@ -29,6 +40,7 @@ class ResponseFilms(BaseModel):
     page_number: int
     next_page: int | None = None
     prev_page: int | None = None
+    next_cursor: str | None = None
     films: list[_ResponseFilm] = Field(default_factory=list)
 
     def __init__(self, **kwargs):
@@ -55,7 +67,7 @@ async def pagination_parameters(
             description="The size of the results to retrieve per page",
             ge=1,
         ),
-    ] = es_conf.DEFAULT_ELASTIC_QUERY_SIZE,
+    ] = es_conf.default_elastic_query_size,
     page_number: Annotated[
         int,
         Query(
@@ -63,9 +75,72 @@ async def pagination_parameters(
             ge=1,
         ),
     ] = 1,
+    cursor: Annotated[
+        str | None,
+        Query(
+            description="Cursor: `start`, then `next_cursor` of a page",
+        ),
+    ] = None,
 ):
     """Define common pagination parameters."""
     return {
         "page_size": page_size,
         "page_number": page_number,
+        "cursor": cursor,
     }
+
+
+async def list_parameters(
+    sort: Annotated[
+        str | None,
+        Query(
+            description="Sort by rating e.g. `+imdb_rating` or `-imdb_rating`",
+        ),
+    ] = None,
+    genre: Annotated[
+        list[str] | None,
+        Query(
+            description="Filter by genre, e.g. `Action`",
+        ),
+    ] = None,
+):
+    """Define sort and filter parameters of the film list endpoints."""
+    sort_field = None
+    if sort:
+        order = None
+        if sort[0] == "+":
+            order = "asc"
+        elif sort[0] == "-":
+            order = "desc"
+
+        sort_field = {
+            sort[1:]: {"order": order},
+        }
+
+    return {
+        "sort_field": sort_field,
+        "filter_field": {"genre": genre} if genre else None,
+    }
+
+
+async def fields_parameter(
+    fields: Annotated[
+        list[str] | None,
+        Query(
+            description="The film fields to retrieve, e.g. `title`",
+        ),
+    ] = None,
+) -> list[str] | None:
+    """Define the projection parameter as index fields.
+
+    Raises:
+        HTTPException: If a field is unknown.
+    """
+    if not fields:
+        return None
+    if set(fields) - FILM_FIELDS.keys():
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=INVALID_FIELDS,
+        )
+    return [FILM_FIELDS[field] for field in fields]
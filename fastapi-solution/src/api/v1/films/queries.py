@@ -1,3 +1,4 @@
+from core.config import es_conf
 from db.search.abc.query import SelectQuery
 
 
@@ -11,6 +12,8 @@ class QueryFilm(SelectQuery):
             filter_field: The field to filter the results by.
             search_query: The phrase to search.
             search_fields: The fields to search in.
+            pit_id: The point in time to search in.
+            search_after: Sort values of the last hit of previous page.
     """
 
     def __init__(
@@ -20,23 +23,40 @@ class QueryFilm(SelectQuery):
         filter_field: dict[str, list[str]] | None = None,
         search_query: str | None = None,
         search_fields: list[str] | None = None,
+        pit_id: str | None = None,
+        search_after: list | None = None,
     ) -> None:
         self._fields = fields
         self.sort_field = sort_field
         self.filter_field = filter_field
         self.search_query = search_query
         self.search_fields = search_fields
+        self.pit_id = pit_id
+        self.search_after = search_after
 
         super().__init__()
 
     @property
     def fields(self) -> list[str] | None:
+        """Return the document fields to retrieve, all if None."""
         return self._fields
 
+    @property
+    def pit_sort(self) -> list[dict]:
+        """Return the sort of point in time pages.
+
+        search_after holds a value for every sort of the list.
+        """
+        # Порядок между равными документами задаёт _shard_doc
+        return [
+            self.sort_field or {"_score": {"order": "desc"}},
+            {"_shard_doc": {"order": "asc"}},
+        ]
+
     @property
     def query(self):
         """Create a query for ES which would search by id and name."""
-        _query: dict = {
+        es_query: dict = {
             "query": {
                 "bool": {
                     "must": {
@@ -47,15 +67,26 @@ class QueryFilm(SelectQuery):
         }
 
         if self.filter_field:
-            _query["query"]["bool"]["filter"] = {
+            es_query["query"]["bool"]["filter"] = {
                 "terms": self.filter_field,
             }
 
         if self.sort_field:
-            _query["sort"] = [self.sort_field]
+            es_query["sort"] = [self.sort_field]
+
+        if self.pit_id:
+            es_query["pit"] = {
+                "id": self.pit_id,
+                "keep_alive": es_conf.elastic_pit_keep_alive,
+            }
+            # Сортировка нужна для search_after
+            es_query["sort"] = self.pit_sort
+
+        if self.search_after:
+            es_query["search_after"] = self.search_after
 
         if self.search_query and self.search_fields:
-            _query["query"]["bool"]["must"] = {
+            es_query["query"]["bool"]["must"] = {
                 "multi_match": {
                     "query": self.search_query,
                     "fields": self.search_fields,
@@ -64,7 +95,7 @@ class QueryFilm(SelectQuery):
                 },
             }
 
-        return _query
+        return es_query
 
 
 class QueryPersonName(SelectQuery):
@@ -83,6 +114,7 @@ class QueryPersonName(SelectQuery):
 
     @property
     def fields(self) -> list[str] | None:
+        """Return the document fields to retrieve, all if None."""
         return self._fields
 
     @property
@@ -1,31 +1,124 @@
+from functools import partial
 from http import HTTPStatus
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
+from fastapi.responses import StreamingResponse
 
-from core.messages import FILM_NOT_FOUND
+from core.messages import FILM_NOT_FOUND, INVALID_CURSOR
+from db.cache.helpers import prepare_key_by_args
+from db.search.abc.search import InvalidSearchQuery, SearchContextMissing
 from models import Film
-from security.auth import Auth
+from security.auth import get_auth
 
-from .models import ResponseFilms, pagination_parameters
+from .models import (
+    ResponseFilms,
+    fields_parameter,
+    list_parameters,
+    pagination_parameters,
+)
 from .service import FilmService, get_film_service
 
 router = APIRouter()
 
 PaginationParameters = Annotated[dict, Depends(pagination_parameters)]
+ListParameters = Annotated[dict, Depends(list_parameters)]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def copy_cookies(source: Response, target: Response) -> Response:
+    """Copy cookies set by dependencies, e.g. refreshed tokens.
+
+    FastAPI drops the headers of the dependency response when a route
+    returns a response itself.
+    """
+    target.raw_headers.extend(
+        header for header in source.raw_headers if header[0] == b"set-cookie"
+    )
+    return target
+
+
+def render_films_page(
+    pagination_params: dict,
+    exclude_unset: bool,
+    films_count: int,
+    films: list[Film],
+    next_cursor: str | None = None,
+) -> bytes:
+    """Serialize a page of films to the response body."""
+    response = ResponseFilms(
+        page_size=pagination_params["page_size"],
+        page_number=pagination_params["page_number"],
+        films_count=films_count,
+        next_cursor=next_cursor,
+        films=films,
+    )
+    return orjson.dumps(
+        response.dict(by_alias=True, exclude_unset=exclude_unset),
+    )
+
+
+async def get_films_response(
+    film_service: FilmService,
+    pagination_params: dict,
+    exclude_unset: bool = False,
+    **query_params,
+) -> Response:
+    """Return a serialized page of films, cached by the page number.
+
+    A cached body is returned as is, without building and validating
+    models again. Cursor pages are bound to a point in time, so they
+    are not cached.
+
+    Raises:
+        HTTPException: If the cursor is malformed or expired.
+    """
+    render = partial(render_films_page, pagination_params, exclude_unset)
+    if pagination_params["cursor"]:
+        try:
+            page = await film_service.get_films_page_by_cursor(
+                page_size=pagination_params["page_size"],
+                cursor=pagination_params["cursor"],
+                fields=ResponseFilms.source_fields,
+                **query_params,
+            )
+        except (ValueError, SearchContextMissing, InvalidSearchQuery):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=INVALID_CURSOR,
+            )
+        body = render(*page)
+    else:
+        body = await film_service.get_films_list_response(
+            response_key=prepare_key_by_args(
+                exclude_unset=exclude_unset,
+                **pagination_params,
+                **query_params,
+            ),
+            render=render,
+            page_size=pagination_params["page_size"],
+            page_number=pagination_params["page_number"],
+            fields=ResponseFilms.source_fields,
+            **query_params,
+        )
+
+    return Response(content=body, media_type="application/json")
 
 
 @router.get(
     "/search",
     response_model=ResponseFilms,
-    dependencies=[Depends(Auth)],
+    dependencies=[Depends(get_auth)],
 )
 async def films_search(
+    response: Response,
     pagination_params: PaginationParameters,
     query: Annotated[str, Query(description="Search by query")],
     film_service: FilmService = Depends(get_film_service),
-) -> ResponseFilms:
+) -> Response:
     """
     ### Retrieve a paginated list of films that match the search query.
 
@@ -36,15 +129,13 @@ async def films_search(
     ### Query arguments:
     - **page_size**: The size of the films retrieved per page.
     - **page_number**: The page number to retrieve.
+    - **cursor**: `start` or `next_cursor` to paginate by cursor.
     - **query**: The phrase to search.
 
     ### Returns:
     A dictionary containing the paginated list of `Film` objects,
     along with the total number of films and pagination details.
     """
-    page_number = pagination_params["page_number"]
-    page_size = pagination_params["page_size"]
-
     search_fields = [
         "title",
         "description",
@@ -54,18 +145,14 @@ async def films_search(
         "genre",
     ]
 
-    films_count, films = await film_service.get_films_list(
-        page_size=page_size,
-        page_number=page_number,
-        search_query=query,
-        search_fields=search_fields,
-    )
-
-    return ResponseFilms(
-        page_size=page_size,
-        page_number=page_number,
-        films_count=films_count,
-        films=films,
+    return copy_cookies(
+        response,
+        await get_films_response(
+            film_service,
+            pagination_params,
+            search_query=query,
+            search_fields=search_fields,
+        ),
     )
 
 
@@ -76,20 +163,9 @@ async def films_search(
 )
 async def films_list(
     pagination_params: PaginationParameters,
-    sort: Annotated[
-        str | None,
-        Query(
-            description="Sort by rating e.g. `+imdb_rating` or `-imdb_rating`",
-        ),
-    ] = None,
-    genre: Annotated[
-        list[str] | None,
-        Query(
-            description="Filter by genre, e.g. `Action`",
-        ),
-    ] = None,
+    list_params: ListParameters,
     film_service: FilmService = Depends(get_film_service),
-) -> ResponseFilms:
+) -> Response:
     """
     ### Retrieve a paginated list of films.
 
@@ -99,6 +175,7 @@ async def films_list(
     ### Query arguments:
     - **page_size**: The size of the films retrieved per page.
     - **page_number**: The page number to retrieve.
+    - **cursor**: `start` or `next_cursor` to paginate by cursor.
     - **sort**: The sort field and the sort direction.
     - **genre**: The genre(s) of films to retrieve.
 
@@ -106,47 +183,54 @@ async def films_list(
     A dictionary containing the paginated list of `Film` objects,
     along with the total number of films and pagination details.
     """
-    page_number = pagination_params["page_number"]
-    page_size = pagination_params["page_size"]
-
-    genres = None
-    sort_field = None
-
-    if genre:
-        genres = {"genre": genre}
-    if sort:
-        order = None
-        if sort[0] == "+":
-            order = "asc"
-        elif sort[0] == "-":
-            order = "desc"
-
-        sort_field = {
-            sort[1:]: {"order": order},
-        }
-
-    films_count, _films = await film_service.get_films_list(
-        page_size=page_size,
-        page_number=page_number,
-        sort_field=sort_field,
-        filter_field=genres,
+    return await get_films_response(
+        film_service,
+        pagination_params,
+        exclude_unset=True,
+        **list_params,
     )
 
-    films = (
-        Film(
-            uuid=film.id,
-            title=film.title,
-            imdb_rating=film.imdb_rating,
-            description=None,
-        )
-        for film in _films
-    )
 
-    return ResponseFilms(
-        page_size=page_size,
-        page_number=page_number,
-        films_count=films_count,
-        films=films,
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        HTTPStatus.OK.value: {"content": {NDJSON_MEDIA_TYPE: {}}},
+    },
+    dependencies=[Depends(get_auth)],
+)
+async def films_export(
+    response: Response,
+    list_params: ListParameters,
+    fields: Annotated[list[str] | None, Depends(fields_parameter)],
+    film_service: FilmService = Depends(get_film_service),
+) -> StreamingResponse:
+    """
+    ### Stream all films as newline delimited JSON.
+
+    One film per line, the films can optionally be filtered by genre
+    and sorted by a specified order field. Use it instead of paging
+    through the whole list.
+
+    Only authenticated users can access this endpoint.
+
+    ### Query arguments:
+    - **sort**: The sort field and the sort direction.
+    - **genre**: The genre(s) of films to retrieve.
+    - **fields**: The film fields to retrieve, all fields if not set.
+
+    ### Returns:
+    A stream of `Film` objects with the requested fields.
+
+    ### Raises:
+        HTTPException: If a field is unknown.
+    """
+    return copy_cookies(
+        response,
+        StreamingResponse(
+            film_service.export_films(fields=fields, **list_params),
+            media_type=NDJSON_MEDIA_TYPE,
+        ),
     )
 
 
@@ -154,7 +238,7 @@ async def films_list(
     "/{film_id}/",
     response_model=Film,
     response_model_exclude_unset=True,
-    dependencies=[Depends(Auth)],
+    dependencies=[Depends(get_auth)],
 )
 async def film_details(
     film_id: Annotated[UUID, Path(description="ID of the film to retrieve")],
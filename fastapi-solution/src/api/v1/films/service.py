@@ -1,21 +1,93 @@
-from functools import lru_cache
+import asyncio
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from contextlib import AsyncExitStack, aclosing
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Callable
 from uuid import UUID
 
+import orjson
 from fastapi import Depends
-from api.v1.films.queries import QueryFilm
 
-from db.search.abc.search import AbstractSearch
-from db.cache.abc.cache import AbstractCache
+from api.v1.films.queries import QueryFilm
 from core.config import es_conf
+from core.deadline import override_deadline
 from core.logger import get_logger
-from db.search.dependency import get_search
+from db.cache.abc.cache import AbstractCache
 from db.cache.dependency import get_cache
+from db.cache.helpers import load_model, load_models, prepare_key_by_args
+from db.cache.single_flight import SingleFlight
+from db.search.abc.search import AbstractSearch
+from db.search.dependency import get_search
 from models.film import Film
 
-from db.cache.helpers import prepare_key_by_args
-
 logger = get_logger(__name__)
 
+# Курсор первой страницы при постраничном обходе по курсору
+FIRST_PAGE_CURSOR = "start"
+
+# Типы значений сортировки, которые Elasticsearch принимает в search_after
+SORT_VALUE_TYPES = (str, int, float, type(None))
+
+
+def _encode_cursor(state: dict) -> str:
+    """Pack the pagination state to an opaque cursor."""
+    return urlsafe_b64encode(orjson.dumps(state)).decode()
+
+
+def _is_cursor_state(state: Any, query_key: str, sort_size: int) -> bool:
+    """Check that a cursor state is well formed and made for a query."""
+    if not isinstance(state, dict) or not isinstance(state.get("pit"), str):
+        return False
+    after = state.get("after")
+    return (
+        state.get("query") == query_key
+        and isinstance(after, list)
+        and len(after) == sort_size
+        and all(isinstance(sort, SORT_VALUE_TYPES) for sort in after)
+    )
+
+
+def _decode_cursor(cursor: str, query_key: str, sort_size: int) -> dict:
+    """Unpack the pagination state from a cursor.
+
+    A cursor is valid only for the query it was made for: `query_key`
+    must be the key of the same query args, and the cursor must hold
+    a value for each of `sort_size` sorts.
+
+    Raises:
+        ValueError: if the cursor is malformed or made for another query.
+    """
+    if cursor == FIRST_PAGE_CURSOR:
+        return {}
+    try:
+        state = orjson.loads(urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as error:
+        raise ValueError("Malformed cursor") from error
+    if not _is_cursor_state(state, query_key, sort_size):
+        raise ValueError("Malformed cursor")
+    return state
+
+
+def _dump_film_line(film: dict) -> bytes:
+    """Serialize a film source to a NDJSON line, id is named uuid."""
+    if "id" in film:
+        film = {"uuid": film.pop("id"), **film}
+    return orjson.dumps(film, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def _load_films(cached_films: dict) -> dict:
+    """Parse a cached films list entry."""
+    return {
+        "count": cached_films["count"],
+        "values": load_models(Film, cached_films["values"]),
+    }
+
+
+CACHE_LOADERS = {
+    "film": partial(load_model, Film),
+    "films": _load_films,
+}
+
 
 class FilmService:
     """FilmService class."""
@@ -23,6 +95,7 @@ class FilmService:
     def __init__(self, cache: AbstractCache, search: AbstractSearch):
         self.cache = cache
         self.search = search
+        self.single_flight = SingleFlight(cache)
 
     async def get_films_list(
         self,
@@ -32,6 +105,7 @@ class FilmService:
         filter_field: dict[str, list[str]] | None = None,
         search_query: str | None = None,
         search_fields: list[str] | None = None,
+        fields: list[str] | None = None,
     ) -> tuple[int, list[Film]]:
         """
         Fetch films from Redis cache or Elasticsearch index.
@@ -42,6 +116,8 @@ class FilmService:
             sort_field: The field to sort the results by.
             filter_field: The field to filter the results by.
             search_query: The phrase to search.
+            search_fields: The fields to search in.
+            fields: The film fields to retrieve, all fields if not set.
 
         Returns:
             A tuple containing the total number of films and a list of films.
@@ -53,24 +129,108 @@ class FilmService:
             filter_field=filter_field,
             search_fields=search_fields,
             search_query=search_query,
+            fields=fields,
         )
 
-        films_count, films = await self._get_films_from_cache(key)
-
         from_index = page_size * (page_number - 1)
 
-        if not films or not films_count:
-            films_count, films = await self._get_films_list_from_search(
-                query_size=page_size,
-                from_index=from_index,
-                sort_field=sort_field,
-                filter_field=filter_field,
-                search_query=search_query,
-                search_fields=search_fields,
+        flight_key = "films:{0}".format(key)
+        load = partial(
+            self._get_films_list_from_search,
+            query_size=page_size,
+            from_index=from_index,
+            sort_field=sort_field,
+            filter_field=filter_field,
+            search_query=search_query,
+            search_fields=search_fields,
+            fields=fields,
+        )
+
+        store = partial(self._put_films_to_cache, key)
+        cached_films = await self._get_films_from_cache(
+            key,
+            on_stale=partial(
+                self.single_flight.refresh,
+                flight_key,
+                load,
+                store,
+            ),
+        )
+        if cached_films:
+            return cached_films
+
+        return await self.single_flight.fetch(
+            key=flight_key,
+            load=load,
+            store=store,
+            recheck=partial(self._get_films_from_cache, key),
+        )
+
+    async def get_films_list_response(
+        self,
+        response_key: str,
+        render: Callable[[int, list[Film]], bytes],
+        page_size: int,
+        page_number: int,
+        sort_field: dict[str, dict[str, str | None]] | None = None,
+        filter_field: dict[str, list[str]] | None = None,
+        search_query: str | None = None,
+        search_fields: list[str] | None = None,
+        fields: list[str] | None = None,
+    ) -> bytes:
+        """Return a serialized page of films, cached as is.
+
+        A cached body is returned without building and validating models
+        again, a stale one is rebuilt in background. The page is cached
+        only as the body, films are fetched from the search db directly.
+        Empty lists are not cached.
+
+        Args:
+            response_key: The cache key of the response.
+            render: Serializes the total number of films and the page.
+            page_size: The list size of the films retrieved per page.
+            page_number: The page number to retrieve.
+            sort_field: The field to sort the results by.
+            filter_field: The field to filter the results by.
+            search_query: The phrase to search.
+            search_fields: The fields to search in.
+            fields: The film fields to retrieve, all fields if not set.
+
+        Returns:
+            The response body.
+        """
+        flight_key = "films_response:{0}".format(response_key)
+        load = partial(
+            self._render_films_list,
+            render,
+            query_size=page_size,
+            from_index=page_size * (page_number - 1),
+            sort_field=sort_field,
+            filter_field=filter_field,
+            search_query=search_query,
+            search_fields=search_fields,
+            fields=fields,
+        )
+        store = partial(self.put_response_to_cache, response_key)
+
+        body = await self.get_response_from_cache(
+            response_key,
+            on_stale=partial(
+                self.single_flight.refresh,
+                flight_key,
+                load,
+                store,
+            ),
+        )
+        if not body:
+            body = await self.single_flight.fetch(
+                key=flight_key,
+                load=load,
+                store=store,
+                recheck=partial(self.get_response_from_cache, response_key),
             )
-            await self._put_films_to_cache(key, films_count, films)
 
-        return films_count, films
+        return body or render(0, [])
 
     async def get_by_id(self, film_id: UUID) -> Film | None:
         """Retrieve a film by ID.
@@ -81,15 +241,46 @@ class FilmService:
         Returns:
             The requested film or None.
         """
-        film = await self._get_film_from_cache(str(film_id))
+        flight_key = "film:{0}".format(film_id)
+        load = partial(self._get_film_from_search, film_id)
+
+        film = await self._get_film_from_cache(
+            str(film_id),
+            on_stale=partial(
+                self.single_flight.refresh,
+                flight_key,
+                load,
+                self._put_film_to_cache,
+            ),
+        )
         if not film:
-            film = await self._get_film_from_search(film_id)
-            if not film:
-                return None
-            await self._put_film_to_cache(film)
+            film = await self.single_flight.fetch(
+                key=flight_key,
+                load=load,
+                store=self._put_film_to_cache,
+                recheck=partial(self._get_film_from_cache, str(film_id)),
+            )
 
         return film
 
+    async def get_top_rated_ids(self, count: int) -> list[UUID]:
+        """Return IDs of the top rated films, bypassing the cache.
+
+        Args:
+            count: The number of films.
+        """
+        response = await self.search.search(
+            index="movies",
+            query=QueryFilm(
+                fields=["id"],
+                sort_field={"imdb_rating": {"order": "desc"}},
+            ),
+            size=min(count, es_conf.max_elastic_query_size),
+        )
+        return [
+            UUID(hit["_source"]["id"]) for hit in response["hits"]["hits"]
+        ]
+
     async def _get_films_list_from_search(
         self,
         query_size: int,
@@ -98,13 +289,15 @@ class FilmService:
         filter_field: dict[str, list[str]] | None = None,
         search_query: str | None = None,
         search_fields: list[str] | None = None,
+        fields: list[str] | None = None,
     ) -> tuple[int, list[Film]]:
         """Fetch films from elasticsearch.
 
         If the requested query size is larger than
         the maximum query size (MAX_ELASTIC_QUERY_SIZE),
-        the query will be paginated using elasticsearch's scrolling
-        functionality, to avoid overloading elasticsearch.
+        the query will be paginated using a point in time and
+        search_after, to avoid overloading elasticsearch.
+        The point in time is always closed afterwards.
 
         Args:
             query_size: The size of the query to retrieve.
@@ -113,58 +306,250 @@ class FilmService:
             filter_field: The field to filter the results by.
             search_query: The phrase to search.
             search_fields: The fields to search in.
+            fields: The film fields to retrieve, all fields if not set.
 
         Returns:
             Total number of documents in the index and list of fetched films.
         """
-        max_query_size = es_conf.MAX_ELASTIC_QUERY_SIZE
-        paginate_query_request = False
+        query = QueryFilm(
+            fields=fields,
+            sort_field=sort_field,
+            filter_field=filter_field,
+            search_query=search_query,
+            search_fields=search_fields,
+        )
+
+        max_query_size = es_conf.max_elastic_query_size
+        if query_size <= max_query_size:
+            response = await self.search.search(
+                index="movies",
+                query=query,
+                size=query_size,
+                from_=from_index,
+            )
+            hits = response["hits"]["hits"]
+            films = [Film(**hit["_source"]) for hit in hits]
+            return (self._get_films_count(response), films)
+
+        films_count = 0
+        films = []
+        skip = from_index
+        async with aclosing(
+            self._iter_pit_pages(query, size=max_query_size),
+        ) as pages:
+            async for page in pages:
+                films_count = self._get_films_count(page)
+                hits = page["hits"]["hits"]
+                films.extend(
+                    Film(**hit["_source"])
+                    for hit in hits[skip:skip + query_size - len(films)]
+                )
+                skip = max(skip - len(hits), 0)
+                if len(films) >= query_size:
+                    break
+
+        return (films_count, films)
+
+    async def _render_films_list(
+        self,
+        render: Callable[[int, list[Film]], bytes],
+        **search_args,
+    ) -> bytes | None:
+        """Serialize films from the search db, None if nothing is found."""
+        films_count, films = await self._get_films_list_from_search(
+            **search_args,
+        )
+        if not films_count:
+            return None
+        return render(films_count, films)
 
-        if query_size > max_query_size:
-            paginate_query_request = True
-            query_size = max_query_size
+    async def get_films_page_by_cursor(
+        self,
+        page_size: int,
+        cursor: str,
+        sort_field: dict[str, dict[str, str | None]] | None = None,
+        filter_field: dict[str, list[str]] | None = None,
+        search_query: str | None = None,
+        search_fields: list[str] | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[int, list[Film], str | None]:
+        """Fetch a page of films using point in time and search_after.
+
+        Unlike offset pagination, a deep page costs the same as the first
+        one. The point in time is opened on the first page and closed
+        after the last one, abandoned ones expire after keep alive time.
+        Pages are not cached, because they are bound to the point in time.
+
+        Args:
+            page_size: The list size of the films retrieved per page.
+            cursor: FIRST_PAGE_CURSOR or a cursor of the previous page.
+            sort_field: The field to sort the results by.
+            filter_field: The field to filter the results by.
+            search_query: The phrase to search.
+            search_fields: The fields to search in.
+            fields: The film fields to retrieve, all fields if not set.
 
-        scroll = None
-        if paginate_query_request:
-            scroll = "5m"
+        Returns:
+            Total number of films, list of films and the next page cursor,
+            which is None for the last page.
+
+        A malformed cursor or one made for other query args raises
+        ValueError.
 
+        Raises:
+            Exception: errors of the search db, e.g. SearchContextMissing
+                if the cursor has expired.
+        """
         query = QueryFilm(
+            fields=fields,
             sort_field=sort_field,
             filter_field=filter_field,
             search_query=search_query,
             search_fields=search_fields,
         )
-
-        response = await self.search.search(
+        query_key = prepare_key_by_args(
+            sort_field=sort_field,
+            filter_field=filter_field,
+            search_query=search_query,
+            search_fields=search_fields,
+        )
+        state = _decode_cursor(cursor, query_key, len(query.pit_sort))
+        pit_id = state.get("pit") or await self.search.open_point_in_time(
             index="movies",
-            query=query,
-            size=query_size,
-            from_=from_index,
+            keep_alive=es_conf.elastic_pit_keep_alive,
         )
+        query.pit_id = pit_id
+        query.search_after = state.get("after")
+        page_size = min(page_size, es_conf.max_elastic_query_size)
 
         try:
-            films_count = int(response["hits"]["total"]["value"])
-        except ValueError:
-            films_count = 0
+            response = await self.search.search(
+                index=None,
+                query=query,
+                size=page_size,
+            )
+        except Exception:
+            # Курсор клиента можно повторить, закрываем только свой PIT
+            if "pit" not in state:
+                await self._close_point_in_time(pit_id)
+            raise
 
+        pit_id = response.get("pit_id", pit_id)
         hits = response["hits"]["hits"]
+        films = [Film(**hit["_source"]) for hit in hits]
+
+        next_cursor = None
+        if len(hits) < page_size:
+            await self._close_point_in_time(pit_id)
+        else:
+            next_cursor = _encode_cursor(
+                {"pit": pit_id, "after": hits[-1]["sort"], "query": query_key},
+            )
+
+        return self._get_films_count(response), films, next_cursor
+
+    async def export_films(
+        self,
+        sort_field: dict[str, dict[str, str | None]] | None = None,
+        filter_field: dict[str, list[str]] | None = None,
+        fields: list[str] | None = None,
+        page_size: int = es_conf.elastic_export_page_size,
+    ) -> AsyncIterator[bytes]:
+        """Yield all matching films as NDJSON, a chunk per page.
+
+        Pages are read in a point in time with search_after and
+        serialized straight from the index source without models, so
+        memory use does not depend on the number of films. The next page
+        is requested only after the previous chunk is consumed, i.e.
+        sent to a client. The export is not cached.
 
-        if paginate_query_request:
-            scroll_id = response["_scroll_id"]
-            films = []
-            while hits:
-                films.extend([Film(**hit["_source"]) for hit in hits])
+        Args:
+            sort_field: The field to sort the results by.
+            filter_field: The field to filter the results by.
+            fields: The film fields to retrieve, all fields if not set.
+            page_size: The number of films to read per page.
 
-                response = await self.search.scroll(
-                    scroll_id=scroll_id,
-                    scroll=scroll,
+        Yields:
+            NDJSON lines of the films of a page.
+        """
+        query = QueryFilm(
+            fields=fields,
+            sort_field=sort_field,
+            filter_field=filter_field,
+        )
+        page_size = min(page_size, es_conf.max_elastic_query_size)
+        # Выгрузка длится дольше бюджета запроса, повторы запросов
+        # страниц ограничены только числом попыток
+        with override_deadline(None):
+            async with aclosing(
+                self._iter_pit_pages(query, size=page_size),
+            ) as pages:
+                async for response in pages:
+                    yield b"".join(
+                        _dump_film_line(hit["_source"])
+                        for hit in response["hits"]["hits"]
+                    )
+
+    async def _iter_pit_pages(
+        self,
+        query: QueryFilm,
+        size: int,
+    ) -> AsyncIterator[Any]:
+        """Yield search responses page by page in a point in time.
+
+        The point in time is closed when the iteration ends, fails
+        or the generator is closed, so use it with contextlib.aclosing.
+
+        Yields:
+            A search response with a page of hits.
+        """
+        query.pit_id = await self.search.open_point_in_time(
+            index="movies",
+            keep_alive=es_conf.elastic_pit_keep_alive,
+        )
+        async with AsyncExitStack() as stack:
+            # Закрываем PIT, даже если выгрузку отменил отключившийся клиент
+            stack.push_async_callback(self._close_query_point_in_time, query)
+            while True:
+                response = await self.search.search(
+                    index=None,
+                    query=query,
+                    size=size,
                 )
-                scroll_id = response["_scroll_id"]
+                query.pit_id = response.get("pit_id", query.pit_id)
                 hits = response["hits"]["hits"]
-        else:
-            films = [Film(**hit["_source"]) for hit in hits]
+                if not hits:
+                    return
 
-        return (films_count, films)
+                yield response
+
+                if len(hits) < size:
+                    return
+                query.search_after = hits[-1]["sort"]
+
+    async def _close_query_point_in_time(self, query: QueryFilm):
+        """Close the point in time of a query, even if cancelled."""
+        await asyncio.shield(self._close_point_in_time(query.pit_id))
+
+    async def _close_point_in_time(self, pit_id: str):
+        """Close a point in time, logging a failure instead of raising it.
+
+        A failed close must not hide the error of reading the pages,
+        an unclosed point in time expires after its keep alive time.
+        """
+        try:
+            await self.search.close_point_in_time(pit_id)
+        except Exception as error:
+            logger.warning(
+                "Closing point in time failed: {0!r}".format(error),
+            )
+
+    def _get_films_count(self, response: Any) -> int:
+        """Return total number of found films from a search response."""
+        try:
+            return int(response["hits"]["total"]["value"])
+        except ValueError:
+            return 0
 
     async def _get_film_from_search(self, film_id: UUID) -> Film | None:
         """Fetch a film from Search by ID.
@@ -184,37 +569,86 @@ class FilmService:
             return None
         return Film(**doc)
 
-    async def _get_film_from_cache(self, film_id: str) -> Film | None:
+    async def _get_film_from_cache(
+        self,
+        film_id: str,
+        on_stale: Callable[[], Any] | None = None,
+    ) -> Film | None:
         """Search for a film in cache by film ID."""
-        cached_films = await self.cache.get(name="film", key=film_id)
-        if not cached_films:
+        cached_film = await self.cache.get(
+            name="film",
+            key=film_id,
+            on_stale=on_stale,
+        )
+        if not cached_film:
             return None
 
-        return Film.parse_raw(cached_films)
+        return load_model(Film, cached_film)
 
     async def _get_films_from_cache(
         self,
         args_key: str,
-    ) -> tuple[int | None, list[Film] | None]:
+        on_stale: Callable[[], Any] | None = None,
+    ) -> tuple[int, list[Film]] | None:
         """
         Fetch films from cache.
 
         Args:
             args_key: The key for films list to retrieve
+            on_stale: Called if the cached list should be refreshed
 
         Returns:
-            Count of films list items, list of films objects
+            Count of films list items and list of films objects or None
         """
-        cached_films = await self.cache.get(name="films", key=args_key)
+        cached_films = await self.cache.get(
+            name="films",
+            key=args_key,
+            on_stale=on_stale,
+        )
 
-        if not cached_films:
-            return None, None
+        if not cached_films or not cached_films["count"]:
+            return None
 
         films_count = cached_films["count"]
-        films = [Film.parse_obj(film) for film in cached_films["values"]]
+        films = load_models(Film, cached_films["values"])
 
         return films_count, films
 
+    async def get_response_from_cache(
+        self,
+        args_key: str,
+        on_stale: Callable[[], Any] | None = None,
+    ) -> bytes | None:
+        """Return a serialized films list response from cache.
+
+        Args:
+            args_key: query args of the response.
+            on_stale: Called if the cached response should be refreshed.
+        """
+        return await self.cache.get(
+            name="films_response",
+            key=args_key,
+            on_stale=on_stale,
+            raw=True,
+        )
+
+    async def put_response_to_cache(
+        self,
+        args_key: str,
+        body: bytes,
+    ) -> None:
+        """Put a serialized films list response to cache.
+
+        Args:
+            args_key: query args of the response.
+            body: the response body.
+        """
+        await self.cache.set(
+            name="films_response",
+            key=args_key,
+            key_value=body,
+        )
+
     async def _put_film_to_cache(self, film: Film) -> None:
         """
         Put film to cache.
@@ -225,22 +659,21 @@ class FilmService:
         await self.cache.set(
             name="film",
             key=str(film.id),
-            key_value=film.json(),
+            key_value=film,
         )
 
     async def _put_films_to_cache(
         self,
         args_key: str,
-        films_count: int,
-        films: list[Film],
+        films_list: tuple[int, list[Film]],
     ) -> None:
         """Put films to cache.
 
         Args:
             args_key: query args for function get_films_list
-            films_count: count of films list, that was fetched
-            films: films that was fetched
+            films_list: count of films list and films, that was fetched
         """
+        films_count, films = films_list
         films_data = {"count": films_count, "values": list(films)}
 
         await self.cache.set(
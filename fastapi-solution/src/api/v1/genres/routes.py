@@ -1,8 +1,9 @@
 from http import HTTPStatus
 
+from fastapi import APIRouter, Depends, HTTPException, Path
+
 from core.config import fast_api_conf
 from core.messages import GENRE_NOT_FOUND
-from fastapi import APIRouter, Depends, HTTPException, Path
 
 from .models import GenreResponse
 from .service import GenreService, get_genres_service
@@ -34,7 +35,7 @@ async def genre(
     genre_id: str = Path(
         description="Genre's UUID",
         example="3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff",
-        regex=fast_api_conf.UUID_REGEXP,
+        regex=fast_api_conf.uuid_regexp,
     ),
     genre_service: GenreService = Depends(get_genres_service),
 ) -> GenreResponse:
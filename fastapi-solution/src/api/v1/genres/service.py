@@ -1,12 +1,22 @@
-from functools import lru_cache
+from contextlib import aclosing
+from functools import lru_cache, partial
+from typing import Any, Callable
 
+from fastapi import Depends
+
+from db.cache.abc.cache import AbstractCache
+from db.cache.dependency import get_cache
+from db.cache.helpers import load_model, load_models
+from db.cache.single_flight import SingleFlight
 from db.search.abc.search import AbstractSearch
 from db.search.dependency import get_search
-from db.cache.dependency import get_cache
-from db.cache.abc.cache import AbstractCache
-from fastapi import Depends
 from models.genre import Genre
 
+CACHE_LOADERS = {
+    "all_genres": partial(load_models, Genre),
+    "genre": partial(load_model, Genre),
+}
+
 
 class GenreService:
     """Contain a methods for fetching data from ES or Redis."""
@@ -14,65 +24,97 @@ class GenreService:
     def __init__(self, cache: AbstractCache, search: AbstractSearch):
         self.cache = cache
         self.search = search
+        self.single_flight = SingleFlight(cache)
 
     # Возвращает список всех жанров.
     # Он опционален, так как жанр может отсутствовать в базе
     async def get_all(self) -> list[Genre] | None:
         """Return all genres."""
-        genres = await self._get_genres_from_cache()
+        genres = await self._get_genres_from_cache(
+            on_stale=partial(
+                self.single_flight.refresh,
+                "all_genres",
+                self._get_genres_from_search,
+                self._put_genres_to_cache,
+            ),
+        )
 
         if not genres:
             # Если жанра нет в кеше, то ищем его в Elasticsearch
-            genres = await self._get_genres_from_search()
+            genres = await self.single_flight.fetch(
+                key="all_genres",
+                load=self._get_genres_from_search,
+                store=self._put_genres_to_cache,
+                recheck=self._get_genres_from_cache,
+            )
             if not genres:
                 # Если список отсутствует в Elasticsearch, значит ошибка
                 return None
-            await self._put_genres_to_cache(genres)
 
         return genres
 
     async def _get_genres_from_search(self) -> list[Genre] | None:
         """Return all genres from elastic."""
-        hits = []
-        _hits = await self.search.scan(index="genres")
-        async for hit in _hits:
-            hits.append(hit)
-
-        return [Genre.parse_obj(x["_source"]) for x in hits]
-
-    async def _get_genres_from_cache(self) -> list[Genre] | None:
+        _genres = await self.search.scan(index="genres", parse=Genre.parse_obj)
+        async with aclosing(_genres) as genres:
+            return [genre async for genre in genres]
+
+    async def _get_genres_from_cache(
+        self,
+        on_stale: Callable[[], Any] | None = None,
+    ) -> list[Genre] | None:
         """Return all genres from cache."""
         cached_genres = await self.cache.get(
             name="all_genres",
             key="all_genres",
+            on_stale=on_stale,
         )
         if not cached_genres:
             return None
 
-        return [Genre.parse_obj(genre) for genre in cached_genres]
+        return load_models(Genre, cached_genres)
 
     async def _put_genres_to_cache(self, genres: list[Genre]):
-        """Save all genres from cache."""
+        """Save all genres and every single genre to cache."""
         await self.cache.set(
             name="all_genres",
             key="all_genres",
             key_value=genres,
         )
+        await self.cache.mset(
+            name="genre",
+            mapping={str(genre.id): genre for genre in genres},
+        )
 
     # Возвращает жанр по id.
     # Он опционален, так как жанр может отсутствовать в базе
     async def get_by_id(self, genre_id: str) -> Genre | None:
         """Return a genre by id."""
+        flight_key = "genre:{0}".format(genre_id)
+        load = partial(self._get_genre_from_search, genre_id)
+
         # Пытаемся получить данные из кеша, потому что оно работает быстрее
-        genre = await self._get_genre_from_cache(genre_id)
+        genre = await self._get_genre_from_cache(
+            genre_id,
+            on_stale=partial(
+                self.single_flight.refresh,
+                flight_key,
+                load,
+                self._put_genre_to_cache,
+            ),
+        )
         if not genre:
             # Если жанра нет в кеше, то ищем его в Elasticsearch
-            genre = await self._get_genre_from_search(genre_id)
+            # и сохраняем в кеш
+            genre = await self.single_flight.fetch(
+                key=flight_key,
+                load=load,
+                store=self._put_genre_to_cache,
+                recheck=partial(self._get_genre_from_cache, genre_id),
+            )
             if not genre:
                 # Если список отсутствует в Elasticsearch, значит ошибка
                 return None
-            # Сохраняем жанры в кеш
-            await self._put_genre_to_cache(genre)
 
         return genre
 
@@ -87,16 +129,21 @@ class GenreService:
 
         return Genre.parse_obj(doc)
 
-    async def _get_genre_from_cache(self, genre_id: str) -> Genre | None:
+    async def _get_genre_from_cache(
+        self,
+        genre_id: str,
+        on_stale: Callable[[], Any] | None = None,
+    ) -> Genre | None:
         """Return a genre from cache by id."""
         cached_genre = await self.cache.get(
             name="genre",
             key=genre_id,
+            on_stale=on_stale,
         )
         if not cached_genre:
             return None
 
-        return Genre.parse_obj(cached_genre)
+        return load_model(Genre, cached_genre)
 
     async def _put_genre_to_cache(self, genre: Genre):
         """Save a genre to cache."""
@@ -1,7 +1,9 @@
 from uuid import UUID
+
 from pydantic import BaseModel, Field
-from models.film import Film
+
 from models.common import UUIDMixin
+from models.person import PersonFilm
 
 
 class FilmRolesResponse(UUIDMixin, BaseModel):
@@ -29,43 +31,13 @@ class PersonResponse(UUIDMixin, BaseModel):
     @classmethod
     def get_films_roles(
         cls,
-        person_name: str,
-        films: list[Film],
+        films: list[PersonFilm],
     ) -> list[FilmRolesResponse]:
-        """Extract roles from films."""
-        films_roles = []
-        for film in films:
-            roles = []
-
-            a = film.actors
-            w = film.writers
-            d = film.director
-            if a:
-                if list(
-                    filter(
-                        lambda x: True
-                        if x and x.name == person_name
-                        else False,
-                        a,
-                    ),
-                ):
-                    roles.append("actor")
-            if w:
-                if list(
-                    filter(
-                        lambda x: True
-                        if x and x.name == person_name
-                        else False,
-                        w,
-                    ),
-                ):
-                    roles.append("writer")
-            if d and person_name in d:
-                roles.append("director")
-
-            films_roles.append(FilmRolesResponse(uuid=film.id, roles=roles))
-
-        return films_roles
+        """Return film ids with roles from the person filmography."""
+        return [
+            FilmRolesResponse(uuid=film.id, roles=film.roles)
+            for film in films
+        ]
 
 
 class FilmResponse(BaseModel):
@@ -17,6 +17,7 @@ class QueryPersonByIdAndName(SelectQuery):
 
     @property
     def fields(self) -> list[str] | None:
+        """Return the document fields to retrieve, all if None."""
         return self._fields
 
     @property
@@ -65,6 +66,7 @@ class QueryPersonByName(SelectQuery):
 
     @property
     def fields(self) -> list[str] | None:
+        """Return the document fields to retrieve, all if None."""
         return self._fields
 
     @property
@@ -75,3 +77,55 @@ class QueryPersonByName(SelectQuery):
                 "match": {"name": self.name},
             },
         }
+
+
+class QueryPersonsByIdsAndNames(SelectQuery):
+    """Create a query for films of several persons at once."""
+
+    def __init__(
+        self,
+        ids: list[str],
+        names: list[str],
+        fields: list[str] | None = None,
+    ) -> None:
+        self.ids = ids
+        self.names = names
+        self._fields = fields
+        super().__init__()
+
+    @property
+    def fields(self) -> list[str] | None:
+        """Return the document fields to retrieve, all if None."""
+        return self._fields
+
+    @property
+    def query(self):
+        """Create a query for ES which would search by ids and names."""
+        return {
+            "query": {
+                "bool": {
+                    "should": [
+                        {
+                            "nested": {
+                                "path": "actors",
+                                "query": {
+                                    "terms": {"actors.id": self.ids},
+                                },
+                            },
+                        },
+                        {
+                            "nested": {
+                                "path": "writers",
+                                "query": {
+                                    "terms": {"writers.id": self.ids},
+                                },
+                            },
+                        },
+                        *[
+                            {"match_phrase": {"director": name}}
+                            for name in self.names
+                        ],
+                    ],
+                },
+            },
+        }
@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, Path, Query
 
 from core.config import es_conf, fast_api_conf
 from core.messages import FILM_NOT_FOUND, PERSON_NOT_FOUND
-from security.auth import Auth
+from security.auth import get_auth
 
 from .models import FilmResponse, PersonResponse
 from .service import PersonService, get_person_service
@@ -16,7 +16,7 @@ router = APIRouter()
 @router.get(
     "/search",
     response_model=list[PersonResponse],
-    dependencies=[Depends(Auth)],
+    dependencies=[Depends(get_auth)],
 )
 async def person_search(
     query: Annotated[
@@ -30,7 +30,7 @@ async def person_search(
     page_size: Annotated[
         int,
         Query(description="Pagination page size", ge=1),
-    ] = es_conf.DEFAULT_ELASTIC_QUERY_SIZE,
+    ] = es_conf.default_elastic_query_size,
     page_number: Annotated[
         int,
         Query(description="Number of page", ge=0),
@@ -56,20 +56,16 @@ async def person_search(
             detail=PERSON_NOT_FOUND,
         )
 
+    persons_films = await person_service.get_persons_films(persons)
+
     for person in persons:
-        films = await person_service.get_person_films(
-            person_id=str(person.id),
-            person_name=person.name,
-        )
+        films = persons_films.get(str(person.id))
         if films:
             person_resp.append(
                 PersonResponse(
                     uuid=person.id,
                     full_name=person.name,
-                    films=PersonResponse.get_films_roles(
-                        person_name=person.name,
-                        films=films,
-                    ),
+                    films=PersonResponse.get_films_roles(films),
                 ),
             )
         else:
@@ -87,13 +83,13 @@ async def person_search(
 @router.get(
     "/{person_id}/film",
     response_model=list[FilmResponse],
-    dependencies=[Depends(Auth)],
+    dependencies=[Depends(get_auth)],
 )
 async def person_films(
     person_id: str = Path(
         description="Persons's UUID",
         example="8b197ae2-38c2-48c7-8cf6-6dc234d16efb",
-        regex=fast_api_conf.UUID_REGEXP,
+        regex=fast_api_conf.uuid_regexp,
     ),
     person_service: PersonService = Depends(get_person_service),
 ) -> list[FilmResponse]:
@@ -104,14 +100,13 @@ async def person_films(
     Raises:
         HTTPException: If requested person or films not found.
     """
-    person = await person_service.get_by_id(person_id)
+    person, films = await person_service.get_person_with_films(person_id)
     if not person:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail=PERSON_NOT_FOUND,
         )
 
-    films = await person_service.get_person_films(person_id, person.name)
     if not films:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
@@ -124,13 +119,13 @@ async def person_films(
 @router.get(
     "/{person_id}/",
     response_model=PersonResponse,
-    dependencies=[Depends(Auth)],
+    dependencies=[Depends(get_auth)],
 )
 async def person(
     person_id: str = Path(
         description="Persons's UUID",
         example="8b197ae2-38c2-48c7-8cf6-6dc234d16efb",
-        regex=fast_api_conf.UUID_REGEXP,
+        regex=fast_api_conf.uuid_regexp,
     ),
     person_service: PersonService = Depends(get_person_service),
 ) -> PersonResponse:
@@ -141,22 +136,20 @@ async def person(
     Raises:
         HTTPException: If requested person not found.
     """
-    person_model = await person_service.get_by_id(person_id)
+    person_model, films = await person_service.get_person_with_films(
+        person_id,
+    )
     if not person_model:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail=PERSON_NOT_FOUND,
         )
 
-    films = await person_service.get_person_films(person_id, person_model.name)
     if films:
         return PersonResponse(
             uuid=person_model.id,
             full_name=person_model.name,
-            films=PersonResponse.get_films_roles(
-                person_name=person_model.name,
-                films=films,
-            ),
+            films=PersonResponse.get_films_roles(films),
         )
     return PersonResponse(
         uuid=person_model.id,
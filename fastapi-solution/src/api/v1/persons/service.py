@@ -1,20 +1,94 @@
-from functools import lru_cache
+from collections import defaultdict
+from contextlib import aclosing
+from functools import lru_cache, partial
+from typing import Any, Callable
 
+from fastapi import Depends
+
+from core.concurrency import gather_limited
+from core.config import fast_api_conf
 from core.logger import get_logger
-from db.cache.helpers import prepare_key_by_args
+from db.cache.abc.cache import AbstractCache
+from db.cache.dependency import get_cache
+from db.cache.helpers import load_model, load_models, prepare_key_by_args
+from db.cache.single_flight import SingleFlight
 from db.search.abc.search import AbstractSearch
 from db.search.dependency import get_search
-from db.cache.dependency import get_cache
-from db.cache.abc.cache import AbstractCache
-from fastapi import Depends
-from models.film import Film
-from models.person import Person
-from .queries import QueryPersonByIdAndName, QueryPersonByName
+from models.person import Person, PersonFilm
+
+from .queries import (
+    QueryPersonByIdAndName,
+    QueryPersonByName,
+    QueryPersonsByIdsAndNames,
+)
 
 ES_BODY_SEARCH = "_source"
 
+# Поля фильма, из которых строится фильмография персоны
+FILMOGRAPHY_FIELDS = [
+    "id",
+    "title",
+    "imdb_rating",
+    "actors",
+    "writers",
+    "director",
+]
+
 logger = get_logger(__name__)
 
+CACHE_LOADERS = {
+    "person": partial(load_model, Person),
+    "person_key": partial(load_models, Person),
+    "filmography": partial(load_models, PersonFilm),
+}
+
+
+def _persons_roles(
+    film: dict[str, Any],
+    names: dict[str, list[str]],
+) -> dict[str, list[str]]:
+    """Return roles of the requested persons in a film by person id.
+
+    Works on the raw film document, so participants are not parsed
+    into models. Actors and writers are matched by id, directors are
+    stored only by name, so they are matched by the names of the
+    requested persons.
+
+    Args:
+        film: the film document from the search db.
+        names: person name to ids of the requested persons.
+    """
+    requested = {
+        person_id for person_ids in names.values() for person_id in person_ids
+    }
+    roles: dict[str, list[str]] = defaultdict(list)
+    for role, participants in (
+        ("actor", film.get("actors") or []),
+        ("writer", film.get("writers") or []),
+    ):
+        for participant in participants:
+            if not participant or participant["id"] not in requested:
+                continue
+            if role not in roles[participant["id"]]:
+                roles[participant["id"]].append(role)
+
+    for director in film.get("director") or []:
+        for person_id in names.get(director, []):
+            if "director" not in roles[person_id]:
+                roles[person_id].append("director")
+
+    return roles
+
+
+def _to_person_film(film: dict[str, Any], roles: list[str]) -> PersonFilm:
+    """Convert a film document to an entry of the person filmography."""
+    return PersonFilm(
+        id=film["id"],
+        title=film["title"],
+        imdb_rating=film.get("imdb_rating"),
+        roles=roles,
+    )
+
 
 class PersonService:
     """Contain a merhods for fetching data from ES or Redis."""
@@ -26,6 +100,7 @@ class PersonService:
     ):
         self.cache = cache
         self.search = search
+        self.single_flight = SingleFlight(cache)
 
     # get_by_id возвращает объект персоны.
     # Он опционален, так как персона может отсутствовать в базе
@@ -34,16 +109,31 @@ class PersonService:
         person_id: str,
     ) -> Person | None:
         """Return a person by id."""
+        flight_key = "person:{0}".format(person_id)
+        load = partial(self._get_person_from_search, person_id)
+
         # Пытаемся получить данные из кеша, потому что оно работает быстрее
-        person = await self._get_person_from_cache(person_id)
+        person = await self._get_person_from_cache(
+            person_id,
+            on_stale=partial(
+                self.single_flight.refresh,
+                flight_key,
+                load,
+                self._put_person_to_cache,
+            ),
+        )
         if not person:
             # Если персоны нет в кеше, то ищем его в Elasticsearch
-            person = await self._get_person_from_search(person_id)
+            # и сохраняем в кеш
+            person = await self.single_flight.fetch(
+                key=flight_key,
+                load=load,
+                store=self._put_person_to_cache,
+                recheck=partial(self._get_person_from_cache, person_id),
+            )
             if not person:
                 # Если он отсутствует в ES, то персоны вообще нет в базе
                 return None
-            # Сохраняем персону в кеш
-            await self._put_person_to_cache(person)
 
         return person
 
@@ -62,22 +152,36 @@ class PersonService:
             page_size=page_size,
             page_number=page_number,
         )
-        persons = await self._get_persons_by_key_from_cache(key)
+        flight_key = "person_key:{0}".format(key)
+        load = partial(
+            self._get_persons_by_name_from_search,
+            name=name,
+            page_size=page_size,
+            page_number=page_number,
+        )
+        store = partial(self._put_persons_by_key_to_cache, key)
+
+        persons = await self._get_persons_by_key_from_cache(
+            key,
+            on_stale=partial(
+                self.single_flight.refresh,
+                flight_key,
+                load,
+                store,
+            ),
+        )
         if not persons:
             # Если персоны нет в кеше, то ищем его в Elasticsearch
-            persons = await self._get_persons_by_name_from_search(
-                name=name,
-                page_size=page_size,
-                page_number=page_number,
+            # и сохраняем в кеш
+            persons = await self.single_flight.fetch(
+                key=flight_key,
+                load=load,
+                store=store,
+                recheck=partial(self._get_persons_by_key_from_cache, key),
             )
             if not persons:
                 # Если он отсутствует в ES, то персоны вообще нет в базе
                 return None
-            # Сохраняем персону в кеш
-            await self._put_persons_by_key_to_cache(
-                key=key,
-                persons=persons,
-            )
 
         return persons
 
@@ -104,29 +208,35 @@ class PersonService:
     async def _get_persons_by_key_from_cache(
         self,
         key: str,
+        on_stale: Callable[[], Any] | None = None,
     ) -> list[Person] | None:
         """Return persons by name from cache."""
         cached_persons = await self.cache.get(
             name="person_key",
             key=key,
+            on_stale=on_stale,
         )
         if not cached_persons:
             return None
 
         # pydantic предоставляет API для создания объекта моделей из json
-        return [Person.parse_obj(person) for person in cached_persons]
+        return load_models(Person, cached_persons)
 
     async def _put_persons_by_key_to_cache(
         self,
         key: str,
         persons: list[Person],
     ):
-        """Save a person data to cache."""
+        """Save found persons and every single person to cache."""
         await self.cache.set(
             name="person_key",
             key=key,
             key_value=persons,
         )
+        await self.cache.mset(
+            name="person",
+            mapping={str(person.id): person for person in persons},
+        )
 
     async def _get_person_from_search(
         self,
@@ -148,14 +258,19 @@ class PersonService:
     async def _get_person_from_cache(
         self,
         person_id: str,
+        on_stale: Callable[[], Any] | None = None,
     ) -> Person | None:
         """Get a person from cache."""
-        cached_person = await self.cache.get(name="person", key=person_id)
+        cached_person = await self.cache.get(
+            name="person",
+            key=person_id,
+            on_stale=on_stale,
+        )
         if not cached_person:
             return None
 
         # pydantic предоставляет API для создания объекта моделей из json
-        return Person.parse_obj(cached_person)
+        return load_model(Person, cached_person)
 
     async def _put_person_to_cache(
         self,
@@ -169,148 +284,221 @@ class PersonService:
             key_value=person,
         )
 
-    # Возвращает список всех жанров.
-    # Он опционален, так как жанр может отсутствовать в базе
+    # Возвращает фильмографию персоны.
+    # Она опциональна, так как фильмы могут отсутствовать в базе
     async def get_person_films(
         self,
         person_id: str,
         person_name: str,
-    ) -> list[Film] | None:
-        """Return person films by id."""
+    ) -> list[PersonFilm] | None:
+        """Return the person filmography by id.
+
+        The filmography is the single cached list of the person films
+        with the person roles, shared by all person endpoints.
+        """
+        flight_key, load, store = self._person_films_flight(
+            person_id,
+            person_name,
+        )
+
         # Пытаемся получить данные из кеша, потому что оно работает быстрее
-        person_films = await self._get_person_films_from_cache(person_id)
+        person_films = await self._get_person_films_from_cache(
+            person_id,
+            on_stale=partial(
+                self.single_flight.refresh,
+                flight_key,
+                load,
+                store,
+            ),
+        )
         if not person_films:
-            # Если жанра нет в кеше, то ищем его в Elasticsearch
-            person_films = await self._get_person_films_from_search(
-                person_id=person_id,
-                person_name=person_name,
+            # Если фильмов нет в кеше, то ищем их в Elasticsearch
+            # и сохраняем в кеш
+            person_films = await self.single_flight.fetch(
+                key=flight_key,
+                load=load,
+                store=store,
+                recheck=partial(
+                    self._get_person_films_from_cache,
+                    person_id,
+                ),
             )
             if not person_films:
                 # Если список отсутствует в Elasticsearch, значит ошибка
                 return None
-            # Сохраняем жанры в кеш
-            await self._put_person_films_to_cache(
-                person_id=person_id,
-                person_films=person_films,
-            )
 
         return person_films
 
-    async def _get_person_films_from_search(
+    async def get_person_with_films(
         self,
         person_id: str,
-        person_name: str,
-    ) -> list[Film] | None:
-        """Get a person films data from elasticsearch."""
-        query = QueryPersonByIdAndName(
-            id=person_id,
-            name=person_name,
+    ) -> tuple[Person | None, list[PersonFilm] | None]:
+        """Return a person and the person films.
+
+        The person and the cached films are requested concurrently,
+        ES is asked for the films only on a cache miss, because
+        the search needs the person name.
+        """
+        stale = []
+        person, person_films = await gather_limited(
+            self.get_by_id(person_id),
+            self._get_person_films_from_cache(
+                person_id,
+                on_stale=lambda: stale.append(True),
+            ),
+            limit=fast_api_conf.concurrency_limit,
         )
+        if not person:
+            return None, None
 
-        hits = []
-        _hits = await self.search.scan(
-            index="movies",
-            query=query,
-        )
-        async for hit in _hits:
-            hits.append(hit["_source"])
+        if not person_films:
+            person_films = await self.get_person_films(person_id, person.name)
+        elif stale:
+            self.single_flight.refresh(
+                *self._person_films_flight(person_id, person.name),
+            )
 
-        return [Film.parse_obj(x) for x in hits]
+        return person, person_films
 
-    async def _get_person_films_from_cache(
+    def _person_films_flight(
         self,
         person_id: str,
-    ) -> list[Film] | None:
-        """Get a person films data from cache."""
-        cached_person_films = await self.cache.get(
-            name="person_films",
-            key=person_id,
+        person_name: str,
+    ) -> tuple[str, Callable, Callable]:
+        """Return key, load and store functions to fetch person films."""
+        load = partial(
+            self._get_person_films_from_search,
+            person_id=person_id,
+            person_name=person_name,
         )
-        if not cached_person_films:
-            return None
+        store = partial(self._put_person_films_to_cache, person_id)
+        return "filmography:{0}".format(person_id), load, store
 
-        # pydantic предоставляет API для создания объекта моделей из json
-        return [Film.parse_obj(x) for x in cached_person_films]
-
-    async def _put_person_films_to_cache(
+    async def get_persons_films(
         self,
-        person_id: str,
-        person_films: list[Film],
-    ):
-        """Save a film data to cache."""
-        await self.cache.set(
-            name="person_films",
-            key=person_id,
-            key_value=person_films,
+        persons: list[Person],
+    ) -> dict[str, list[PersonFilm]]:
+        """Return filmographies of several persons by one cache and ES call.
+
+        Returns:
+            Person id to the person filmography.
+        """
+        person_ids = [str(person.id) for person in persons]
+        cached = await self.cache.mget(name="filmography", keys=person_ids)
+
+        filmographies = {}
+        missed_persons = []
+        for person, person_films in zip(persons, cached):
+            if person_films:
+                filmographies[str(person.id)] = load_models(
+                    PersonFilm,
+                    person_films,
+                )
+            else:
+                missed_persons.append(person)
+
+        if not missed_persons:
+            return filmographies
+
+        found_films = await self._get_persons_films_from_search(missed_persons)
+        filmographies.update(found_films)
+
+        await self.cache.mset(
+            name="filmography",
+            mapping={
+                person_id: films
+                for person_id, films in found_films.items()
+                if films
+            },
         )
 
-    async def get_person_data(
+        return filmographies
+
+    async def _get_persons_films_from_search(
         self,
-        person_id: str,
-        person_name: str,
-    ) -> list[Film] | None:
-        """Get a person films."""
-        # Пытаемся получить данные из кеша, потому что оно работает быстрее
-        person_data = await self._get_person_data_from_cache(person_id)
-        if not person_data:
-            # Если жанра нет в кеше, то ищем его в Elasticsearch
-            person_data = await self._get_person_data_from_search(
-                person_id=person_id,
-                person_name=person_name,
-            )
-            if not person_data:
-                return None
+        persons: list[Person],
+    ) -> dict[str, list[PersonFilm]]:
+        """Get filmographies of several persons from elasticsearch at once."""
+        query = QueryPersonsByIdsAndNames(
+            ids=[str(person.id) for person in persons],
+            names=[person.name for person in persons],
+            fields=FILMOGRAPHY_FIELDS,
+        )
+
+        filmographies: dict[str, list[PersonFilm]] = {
+            str(person.id): [] for person in persons
+        }
+        names = defaultdict(list)
+        for person in persons:
+            names[person.name].append(str(person.id))
 
-            # Сохраняем жанры в кеш
-            await self._put_person_data_to_cache(person_id, person_data)
+        _hits = await self.search.scan(
+            index="movies",
+            query=query,
+        )
+        async with aclosing(_hits) as hits:
+            async for hit in hits:
+                film = hit["_source"]
+                for person_id, roles in _persons_roles(film, names).items():
+                    person_film = _to_person_film(film, roles)
+                    filmographies[person_id].append(person_film)
 
-        return person_data
+        return filmographies
 
-    async def _get_person_data_from_search(
+    async def _get_person_films_from_search(
         self,
         person_id: str,
         person_name: str,
-    ) -> list[Film] | None:
-        """Return person films by id."""
+    ) -> list[PersonFilm] | None:
+        """Get a person filmography from elasticsearch."""
         query = QueryPersonByIdAndName(
             id=person_id,
             name=person_name,
+            fields=FILMOGRAPHY_FIELDS,
         )
 
-        hits = []
+        names = {person_name: [person_id]}
+        person_films = []
         _hits = await self.search.scan(
             index="movies",
             query=query,
         )
-        async for hit in _hits:
-            hits.append(hit["_source"])
+        async with aclosing(_hits) as hits:
+            async for hit in hits:
+                film = hit["_source"]
+                roles = _persons_roles(film, names).get(person_id)
+                if roles:
+                    person_films.append(_to_person_film(film, roles))
 
-        return [Film.parse_obj(x) for x in hits]
+        return person_films
 
-    async def _get_person_data_from_cache(
+    async def _get_person_films_from_cache(
         self,
         person_id: str,
-    ) -> list[Film] | None:
-        """Return person films by id from cache."""
-        cached_person_data = await self.cache.get(
-            name="person_data",
+        on_stale: Callable[[], Any] | None = None,
+    ) -> list[PersonFilm] | None:
+        """Get a person filmography from cache."""
+        cached_person_films = await self.cache.get(
+            name="filmography",
             key=person_id,
+            on_stale=on_stale,
         )
-        if not cached_person_data:
+        if not cached_person_films:
             return None
 
-        return [Film.parse_obj(film) for film in cached_person_data]
+        # pydantic предоставляет API для создания объекта моделей из json
+        return load_models(PersonFilm, cached_person_films)
 
-    async def _put_person_data_to_cache(
+    async def _put_person_films_to_cache(
         self,
         person_id: str,
-        person_data: list[Film],
+        person_films: list[PersonFilm],
     ):
-        """Save a person data to cache."""
+        """Save a person filmography to cache."""
         await self.cache.set(
-            name="person_data",
+            name="filmography",
             key=person_id,
-            key_value=person_data,
+            key_value=person_films,
         )
 
 
@@ -0,0 +1,163 @@
+"""Cache warm-up of the most requested responses."""
+import asyncio
+from functools import partial
+from itertools import product
+from typing import Any, Awaitable, Callable
+from uuid import UUID
+
+from api.v1.films.models import list_parameters
+from api.v1.films.routes import get_films_response
+from api.v1.films.service import FilmService, get_film_service
+from api.v1.genres.service import GenreService, get_genres_service
+from core.concurrency import gather_limited
+from core.config import es_conf
+from core.logger import get_logger
+from db.cache.abc.cache import AbstractCache
+from db.search.abc.search import AbstractSearch
+from models.genre import Genre
+
+logger = get_logger(__name__)
+
+
+async def _safe(call: Callable[[], Awaitable[Any]], what: str) -> bool:
+    """Run a warm-up step, logging its failure instead of raising."""
+    try:
+        await call()
+    except Exception as error:
+        logger.warning("Warm-up of {0} failed: {1!r}".format(what, error))
+        return False
+    return True
+
+
+async def _warm_up_films_page(
+    film_service: FilmService,
+    page_number: int,
+    sort: str | None,
+    genre: str | None,
+):
+    """Cache a page of the film list as the route does."""
+    list_params = await list_parameters(
+        sort=sort,
+        genre=[genre] if genre else None,
+    )
+    await get_films_response(
+        film_service,
+        {
+            "page_size": es_conf.default_elastic_query_size,
+            "page_number": page_number,
+            "cursor": None,
+        },
+        exclude_unset=True,
+        **list_params,
+    )
+
+
+async def _get_warm_up_targets(
+    film_service: FilmService,
+    genre_service: GenreService,
+    top_films: int,
+) -> tuple[list[Genre], list[UUID]]:
+    """Return all genres and IDs of the top rated films."""
+    genres = await genre_service.get_all() or []
+    if not top_films:
+        return genres, []
+    return genres, await film_service.get_top_rated_ids(top_films)
+
+
+async def warm_up_cache(
+    cache: AbstractCache,
+    search: AbstractSearch,
+    films_pages: int = 1,
+    films_sorts: list[str | None] | None = None,
+    top_films: int = 100,
+    concurrency: int = 10,
+) -> None:
+    """Fill the cache with responses requested right after a rollout.
+
+    Caches all genres, the first pages of the film list for every
+    combination of a sort and a genre filter, including none, and
+    details of the top rated films. Responses are built by the same
+    code as in the routes, so they are cached under the same keys.
+    The HTTP response cache of HTTPCacheMiddleware is not filled.
+    A failed step is logged and skipped.
+
+    Args:
+        cache: the app cache.
+        search: the search db.
+        films_pages: the number of film list pages per combination.
+        films_sorts: values of the sort param, None for no sorting.
+        top_films: the number of top rated films to cache details of.
+        concurrency: the maximum number of steps running at once.
+    """
+    # Сервисы кешируются по аргументам, FastAPI передаёт их по имени,
+    # так прогрев использует те же экземпляры, что и обработчики запросов
+    film_service = get_film_service(cache=cache, search=search)
+    genre_service = get_genres_service(cache=cache, search=search)
+    films_sorts = films_sorts or [None]
+
+    try:
+        genres, film_ids = await _get_warm_up_targets(
+            film_service,
+            genre_service,
+            top_films,
+        )
+    except Exception as error:
+        logger.warning(
+            "Warm-up of genres and top films failed: {0!r}".format(error),
+        )
+        genres, film_ids = [], []
+
+    genre_names = [None, *(genre.name for genre in genres)]
+    steps = [
+        _safe(
+            partial(
+                _warm_up_films_page,
+                film_service,
+                page_number,
+                sort,
+                genre,
+            ),
+            "films page {0} sort={1} genre={2}".format(
+                page_number,
+                sort,
+                genre,
+            ),
+        )
+        for sort, genre, page_number in product(
+            films_sorts,
+            genre_names,
+            range(1, films_pages + 1),
+        )
+    ]
+    steps.extend(
+        _safe(
+            partial(film_service.get_by_id, film_id),
+            "film {0}".format(film_id),
+        )
+        for film_id in film_ids
+    )
+
+    warmed_up = await gather_limited(*steps, limit=concurrency)
+    logger.info(
+        "Cache is warmed up: {0} of {1} responses, {2} genres".format(
+            sum(warmed_up),
+            len(warmed_up),
+            len(genres),
+        ),
+    )
+
+
+async def warm_up_cache_until(timeout: float, **kwargs) -> None:
+    """Warm up the cache, giving up after `timeout` seconds.
+
+    The app is served cold rather than not served, so errors and
+    the timeout are only logged.
+    """
+    try:
+        await asyncio.wait_for(warm_up_cache(**kwargs), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(
+            "Cache warm-up did not finish in {0} sec".format(timeout),
+        )
+    except Exception:
+        logger.exception("Cache warm-up failed")
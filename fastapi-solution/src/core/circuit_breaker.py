@@ -0,0 +1,83 @@
+"""Circuit breaker for calls to external services."""
+from enum import Enum
+from time import monotonic
+
+
+class CircuitState(Enum):
+    """States of a circuit breaker."""
+
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """Stop calling a failing service for a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are short-circuited for `reset_timeout` seconds. Then a single
+    probe call is let through: its success closes the circuit, its
+    failure opens it again.
+
+    Args:
+        failure_threshold: consecutive failures to open the circuit.
+        reset_timeout: seconds to wait before probing the service.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_count = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        """Return the current state of the circuit."""
+        if self._opened_at is None:
+            return CircuitState.closed
+        if monotonic() - self._opened_at >= self.reset_timeout:
+            return CircuitState.half_open
+        return CircuitState.open
+
+    def allow(self) -> bool:
+        """Check whether a call may be made now."""
+        state = self.state
+        if state is CircuitState.closed:
+            return True
+        if state is CircuitState.half_open and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_cancel(self):
+        """Let another call probe the service if the probe was cancelled."""
+        self._probing = False
+
+    def record_failure(self):
+        """Count a failed call and open the circuit if needed."""
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                self.opened_count += 1
+            self._opened_at = monotonic()
+            self._probing = False
+
+    def stats(self) -> dict[str, str | int]:
+        """Return the state and counters of the circuit."""
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "opened": self.opened_count,
+        }
@@ -0,0 +1,74 @@
+"""Helpers for running independent I/O concurrently."""
+import asyncio
+from contextlib import nullcontext
+from contextvars import Context
+from typing import Any, Awaitable, Collection, Coroutine
+
+
+def create_background_task(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """Start a task with an empty context instead of a copy of the current.
+
+    Background work outlives the request that started it, so it must not
+    see the request context variables, e.g. the request deadline.
+    """
+    return Context().run(asyncio.create_task, coro)
+
+
+async def gather_limited(
+    *aws: Awaitable[Any],
+    limit: int | None = None,
+) -> list[Any]:
+    """Run awaitables concurrently with at most `limit` of them at once.
+
+    Unlike asyncio.gather, the first exception cancels the awaitables
+    that are still running and is raised immediately.
+
+    Returns:
+        Results in the order of the given awaitables.
+
+    Raises:
+        asyncio.CancelledError: if cancelled, after the awaitables are.
+    """
+    semaphore = asyncio.Semaphore(limit) if limit else None
+    tasks = [asyncio.ensure_future(_run(aw, semaphore)) for aw in aws]
+    if not tasks:
+        return []
+
+    try:
+        done, pending = await asyncio.wait(
+            tasks,
+            return_when=asyncio.FIRST_EXCEPTION,
+        )
+    except asyncio.CancelledError:
+        await cancel_tasks(tasks)
+        raise
+
+    await cancel_tasks(pending)
+    # Сначала результаты выполненных, чтобы поднять исключение упавшей
+    # задачи, а не отмену оставшихся
+    for finished in tasks:
+        if finished in done:
+            finished.result()
+
+    return [task.result() for task in tasks]
+
+
+async def cancel_tasks(tasks: Collection[asyncio.Future]) -> None:
+    """Cancel tasks and wait until they are finished."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _run(
+    aw: Awaitable[Any],
+    semaphore: asyncio.Semaphore | None,
+) -> Any:
+    try:
+        async with semaphore or nullcontext():
+            return await aw
+    except asyncio.CancelledError:
+        # Не запущенная корутина иначе вызовет "never awaited"
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise
@@ -1,6 +1,7 @@
 import os
-
 from logging import config as logging_config
+from typing import Literal
+
 from pydantic import BaseSettings
 
 from core.logger import LOGGING
@@ -17,7 +18,7 @@ class CommonSettings(BaseSettings):
     # Корень проекта
     file_path = os.path.abspath(__file__)
     dir_path = os.path.dirname(file_path)
-    BASE_DIR = os.path.dirname(dir_path)
+    base_dir = os.path.dirname(dir_path)
 
     class Config:
         env_file = "../.env"
@@ -30,10 +31,24 @@ class ApiSettings(CommonSettings):
     """
 
     # Название проекта. Используется в Swagger-документации
-    PROJECT_NAME: str
+    project_name: str
 
     # Шаблон для UUID
-    UUID_REGEXP = r"[\w\d]{8}-[\w\d]{4}-[\w\d]{4}-[\w\d]{4}-[\w\d]{12}"
+    uuid_regexp = r"[\w\d]{8}-[\w\d]{4}-[\w\d]{4}-[\w\d]{4}-[\w\d]{12}"
+
+    # Максимум одновременных запросов к хранилищам в рамках одного запроса
+    concurrency_limit: int = 10
+
+    # Бюджет времени на обработку запроса, после него повторы прекращаются
+    request_timeout: float = 10.0  # sec
+
+    # Повторы запросов к хранилищам: число попыток вместе с первой
+    retry_max_attempts: int = 3
+    retry_base_delay: float = 0.05  # sec
+    retry_max_delay: float = 1.0  # sec
+    # Повторов в секунду на процесс и их максимальный запас
+    retry_budget_rate: float = 10.0
+    retry_budget_burst: float = 20.0
 
 
 class ESSettings(CommonSettings):
@@ -41,21 +56,129 @@ class ESSettings(CommonSettings):
     Класс с настройками Elasticsearch.
     """
 
-    ELASTIC_HOST: str
-    ELASTIC_PORT: int
-
-    MAX_ELASTIC_QUERY_SIZE = 10000
-    DEFAULT_ELASTIC_QUERY_SIZE = 10
+    elastic_host: str
+    elastic_port: int
+
+    max_elastic_query_size = 10000
+    default_elastic_query_size = 10
+    # Время жизни point in time между запросами страниц по курсору
+    elastic_pit_keep_alive = "1m"
+
+    # Настройки пула соединений клиента
+    elastic_connections_per_node: int = 10
+    elastic_request_timeout: float = 10.0  # sec
+    elastic_http_compress: bool = True
+    # Одиночные get запроса собираются в один mget за окно, 0 - за одну
+    # итерацию цикла событий
+    elastic_get_batch_enabled: bool = True
+    elastic_get_batch_delay: float = 0  # sec
+    elastic_get_batch_size: int = 100
+    # Размер пачки scroll и число срезов, читаемых параллельно
+    elastic_scan_size: int = 1000
+    elastic_scan_slices: int = 1
+    # Размер страницы при потоковой выгрузке фильмов
+    elastic_export_page_size: int = 1000
 
 
 class RedisSettings(CommonSettings):
     """
-    Класс с настройками Redis.
+    Класс с настройками Redis и локального кеша перед ним.
     """
 
-    REDIS_HOST: str
-    REDIS_PORT: int
-    REDIS_EXPIRE: int = 60 * 5  # 5 min
+    redis_host: str
+    redis_port: int
+    redis_expire: int = 60 * 5  # 5 min
+    # Ограничение времени ответа и подключения, чтобы зависший Redis
+    # не задерживал запросы без ограничения
+    redis_socket_timeout: float = 1.0  # sec
+    redis_socket_connect_timeout: float = 1.0  # sec
+
+    # Раскладка ключей: "key" - отдельный ключ с собственным TTL на запись,
+    # "hash" - устаревшая раскладка с общим хешем на пространство имён
+    redis_key_layout: Literal["key", "hash"] = "key"
+    redis_key_prefix: str = "movies"
+    # TTL по пространствам имён, например {"films": 60, "all_genres": 3600}
+    redis_namespace_expire: dict[str, int] = {}
+    # Читать записи из старой раскладки, если ключа ещё нет
+    redis_read_legacy_hash: bool = False
+
+    # Мягкий срок жизни по пространствам имён: по его истечении запись
+    # ещё отдаётся из кеша, но обновляется в фоне, например {"films": 240}
+    redis_namespace_soft_expire: dict[str, int] = {}
+    # Коэффициент вероятностного раннего обновления (XFetch), 0 - выключено
+    redis_early_refresh_beta: float = 1.0
+    # Оценка времени пересчёта записи для XFetch
+    redis_recompute_time: float = 0.1  # sec
+
+    # Сжатие значений: none, zlib, zstd (zstandard) или lz4 (lz4),
+    # без установленного пакета приложение не запустится
+    redis_compression: Literal["none", "zlib", "zstd", "lz4"] = "none"
+    # Сжатие для отдельных пространств имён, например {"filmography": "zlib"}
+    redis_namespace_compression: dict[
+        str,
+        Literal["none", "zlib", "zstd", "lz4"],
+    ] = {}
+    # Значения меньше порога не сжимаются
+    redis_compress_threshold: int = 1024  # bytes
+
+    # Блокировка между воркерами на время пересчёта записи кеша
+    redis_lock_enabled: bool = False
+    redis_lock_expire: float = 5.0  # sec
+    redis_lock_wait: float = 5.0  # sec
+
+    # Без Redis сервис продолжает работать только с Elasticsearch
+    redis_breaker_enabled: bool = True
+    redis_breaker_failure_threshold: int = 5
+    redis_breaker_reset_timeout: float = 10.0  # sec
+    redis_call_timeout: float = 0.5  # sec
+    # Вызовы дольше этого считаются сбоями
+    redis_slow_call: float = 0.2  # sec
+
+    # Запись в кеш в фоне, вне ответа на запрос
+    redis_writer_enabled: bool = True
+    redis_writer_queue_size: int = 1000
+    redis_writer_workers: int = 2
+    # Сколько запись ждёт места в очереди, прежде чем будет отброшена
+    redis_writer_put_timeout: float = 0  # sec
+
+    # Локальный (in-process) кеш перед Redis
+    local_cache_enabled: bool = False
+    local_cache_max_entries: int = 1024
+    local_cache_max_bytes: int = 64 * 1024 * 1024  # 64 MB
+    local_cache_expire: int = 30  # sec
+
+
+class HttpCacheSettings(CommonSettings):
+    """Класс с настройками HTTP-кеша ответов (ETag, Cache-Control)."""
+
+    http_cache_enabled: bool = True
+    # Кешируются только GET-запросы с путями с этим префиксом
+    http_cache_path_prefix: str = "/api/v1/"
+    http_cache_max_age: int = 60  # sec
+    # Шаблоны путей маршрутов: кешируются только перечисленные (все,
+    # если не задано), исключённые запросы идут мимо кеша
+    http_cache_include_routes: list[str] | None = None
+    http_cache_exclude_routes: list[str] = ["/api/v1/films/export"]
+
+
+class WarmUpSettings(CommonSettings):
+    """Класс с настройками прогрева кеша при запуске."""
+
+    warmup_enabled: bool = False
+    # Время, после которого приложение запускается с непрогретым кешем
+    warmup_timeout: float = 60.0  # sec
+    # Одновременных запросов при прогреве
+    warmup_concurrency: int = 10
+    # Первые страницы списка фильмов для каждой сортировки и жанра
+    warmup_films_pages: int = 1
+    # Значения параметра sort, None - без сортировки
+    warmup_films_sorts: list[str | None] = [
+        None,
+        "-imdb_rating",
+        "+imdb_rating",
+    ]
+    # Число фильмов с наибольшим рейтингом, детали которых кешируются
+    warmup_top_films: int = 100
 
 
 class SecuritySettings(CommonSettings):
@@ -65,9 +188,20 @@ class SecuritySettings(CommonSettings):
     algorithm: str
     auth_service_token_url: str
     auth_service_refresh_token_url: str
+    auth_service_timeout: float = 5.0
+    auth_service_max_connections: int = 10
+    # Ошибок подряд, после которых запросы в сервис авторизации прекращаются
+    auth_service_failure_threshold: int = 5
+    auth_service_reset_timeout: float = 30.0
+    # Библиотека проверки подписи токена: python-jose или PyJWT
+    jwt_backend: Literal["jose", "pyjwt"] = "jose"
+    claims_cache_enabled: bool = True
+    claims_cache_max_entries: int = 10000
 
 
 fast_api_conf = ApiSettings()  # type: ignore
 es_conf = ESSettings()  # type: ignore
 redis_conf = RedisSettings()  # type: ignore
+http_cache_conf = HttpCacheSettings()  # type: ignore
+warmup_conf = WarmUpSettings()  # type: ignore
 security_settings = SecuritySettings()  # type: ignore
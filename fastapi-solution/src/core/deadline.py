@@ -0,0 +1,45 @@
+"""Time budget of the request being handled."""
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from time import monotonic
+from typing import Iterator
+
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+def _deadline_after(budget: float | None) -> float | None:
+    return None if budget is None else monotonic() + budget
+
+
+def set_deadline(budget: float | None):
+    """Set the deadline of the current request in seconds from now.
+
+    Tasks started by the request inherit it with the context.
+    """
+    _deadline.set(_deadline_after(budget))
+
+
+@contextmanager
+def override_deadline(budget: float | None) -> Iterator[None]:
+    """Set the deadline inside the block, restoring the previous one after.
+
+    May wrap yields of a generator: if the generator is closed in another
+    context, e.g. by the garbage collector, there is nothing to restore.
+
+    Yields:
+        None, the deadline is set inside the block.
+    """
+    token = _deadline.set(_deadline_after(budget))
+    try:
+        yield
+    finally:
+        with suppress(ValueError):
+            _deadline.reset(token)
+
+
+def time_left() -> float | None:
+    """Return seconds left until the deadline or None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - monotonic()
@@ -0,0 +1,11 @@
+"""Imports of optional dependencies."""
+from importlib import import_module
+from types import ModuleType
+
+
+def import_optional(name: str) -> ModuleType | None:
+    """Import an optional dependency, None if it is not installed."""
+    try:
+        return import_module(name)
+    except ImportError:
+        return None
@@ -1,3 +1,5 @@
 FILM_NOT_FOUND = "Film(s) not found"
 GENRE_NOT_FOUND = "Genre(s) not found"
 PERSON_NOT_FOUND = "Person(s) not found"
+INVALID_CURSOR = "Cursor is malformed or expired"
+INVALID_FIELDS = "Unknown film field(s)"
@@ -1,26 +1,166 @@
-from aioretry import RetryPolicyStrategy, RetryInfo
+import asyncio
+from functools import wraps
+from secrets import SystemRandom
+from time import monotonic
+from typing import Any, Awaitable, Callable
 
+from aioretry import RetryInfo, RetryPolicyStrategy
+from elastic_transport import ConnectionError as TransportConnectionError
+from elastic_transport import ConnectionTimeout
+from elasticsearch import ApiError
+from redis.exceptions import BusyLoadingError
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
 
-def retry_policy(info: RetryInfo,
-                 start_sleep_time=0.1,
-                 factor=2,
-                 border_sleep_time=10,
-                 ) -> RetryPolicyStrategy:
+from core.config import fast_api_conf
+from core.deadline import time_left
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Разброс задержек из системного генератора, не из общего random
+uniform = SystemRandom().uniform
+
+# Ответы Elasticsearch, после которых повтор запроса может помочь
+RETRYABLE_STATUSES = frozenset((429, 502, 503, 504))
+
+RETRYABLE_ERRORS = (
+    TransportConnectionError,
+    ConnectionTimeout,
+    RedisConnectionError,
+    RedisTimeoutError,
+    BusyLoadingError,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+class NonRetryableError(Exception):
+    """Base class for errors that repeating the call can not fix."""
+
+
+def is_retryable(exception: BaseException) -> bool:
+    """Check whether a failed call may succeed if it is repeated."""
+    if isinstance(exception, NonRetryableError):
+        return False
+    if isinstance(exception, ApiError):
+        return exception.meta.status in RETRYABLE_STATUSES
+    return isinstance(exception, RETRYABLE_ERRORS)
+
+
+def within_deadline(
+    func: Callable[..., Awaitable[Any]],
+) -> Callable[..., Awaitable[Any]]:
+    """Bound a call by the time left until the request deadline.
+
+    Put it under the retry decorator to bound every attempt: a hung
+    call raises asyncio.TimeoutError when the request budget is spent,
+    and RetryPolicy does not repeat it then.
     """
-    Функция политики рестарта.
-    Использует наивный экспоненциальный рост времени повтора (factor)
-    до граничного времени ожидания (border_sleep_time)
-
-    Формула:
-        t = start_sleep_time * 2^(n) if t < border_sleep_time
-        t = border_sleep_time if t >= border_sleep_time
-    :param info: класс aioretry.RetryInfo - требование пакета
-    :param start_sleep_time: начальное время повтора
-    :param factor: во сколько раз нужно увеличить время ожидания
-    :param border_sleep_time: граничное время ожидания
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        left = time_left()
+        if left is None:
+            return await func(*args, **kwargs)
+        return await asyncio.wait_for(func(*args, **kwargs), max(left, 0))
+
+    return wrapper
+
+
+class RetryBudget:
+    """Process-wide limit of retries as a token bucket.
+
+    Every retry takes a token, tokens are refilled at a constant rate,
+    so during an outage retries can not multiply the load on a service.
+
+    Args:
+        rate: retries allowed per second.
+        burst: the maximum number of retries allowed at once.
+    """
+
+    def __init__(self, rate: float = 10, burst: float = 20) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.exhausted = 0
+        self._updated_at = monotonic()
+
+    def acquire(self) -> bool:
+        """Take a token for a retry if there is one."""
+        now = monotonic()
+        self.tokens = min(
+            self.burst,
+            self.tokens + (now - self._updated_at) * self.rate,
+        )
+        self._updated_at = now
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RetryPolicy:
+    """Bounded retry policy for aioretry.
+
+    A failed call is repeated only if the error is retryable, attempts
+    are left, the request deadline is not reached by the end of the
+    delay and the retry budget allows it. Delays grow exponentially
+    with full jitter: a random time from 0 to the current backoff.
+
+    Args:
+        max_attempts: the maximum number of calls including the first.
+        base_delay: the backoff before the first retry in seconds.
+        max_delay: the upper bound of the backoff in seconds.
+        budget: the retry budget shared by all calls.
     """
 
-    new_t = start_sleep_time * factor ** info.fails
-    t = new_t if new_t < border_sleep_time else border_sleep_time
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.05,
+        max_delay: float = 1,
+        budget: RetryBudget | None = None,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def __call__(self, info: RetryInfo) -> RetryPolicyStrategy:
+        """Return whether to abandon the call and the delay before retry."""
+        if not is_retryable(info.exception):
+            return True, 0
+
+        if info.fails >= self.max_attempts:
+            logger.warning("Give up after {0} attempts".format(info.fails))
+            return True, 0
+
+        delay = uniform(
+            0,
+            min(self.max_delay, self.base_delay * 2 ** (info.fails - 1)),
+        )
+        left = time_left()
+        if left is not None and left <= delay:
+            logger.warning("Give up retrying, request deadline is reached")
+            return True, 0
+
+        if self.budget is not None and not self.budget.acquire():
+            logger.warning("Give up retrying, retry budget is exhausted")
+            return True, 0
+
+        return False, delay
+
+
+retry_budget = RetryBudget(
+    rate=fast_api_conf.retry_budget_rate,
+    burst=fast_api_conf.retry_budget_burst,
+)
 
-    return False, t
+retry_policy = RetryPolicy(
+    max_attempts=fast_api_conf.retry_max_attempts,
+    base_delay=fast_api_conf.retry_base_delay,
+    max_delay=fast_api_conf.retry_max_delay,
+    budget=retry_budget,
+)
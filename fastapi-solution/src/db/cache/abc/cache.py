@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod, abstractproperty
-from typing import Any
+from typing import Any, Callable
 
 
 class AbstractClient(ABC):
@@ -22,8 +22,15 @@ class AbstractCache(AbstractClient):
         self,
         name: str,
         key: str,
+        on_stale: Callable[[], Any] | None = None,
+        raw: bool = False,
     ):
-        """Get named cache by a key."""
+        """Get named cache by a key.
+
+        Stale entries are still returned, on_stale is called to let
+        the caller refresh them. With raw the stored bytes are returned
+        as is, e.g. an already serialized response body.
+        """
         raise NotImplementedError
 
     @abstractmethod
@@ -36,3 +43,40 @@ class AbstractCache(AbstractClient):
     ):
         """Set named cache by a key."""
         raise NotImplementedError
+
+    @abstractmethod
+    async def mget(
+        self,
+        name: str,
+        keys: list[str],
+    ) -> list[Any]:
+        """Get named cache by several keys in one round trip."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mset(
+        self,
+        name: str,
+        mapping: dict[str, Any],
+        expire_time: int | None = None,
+    ):
+        """Set named cache for several keys in one round trip."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def acquire_lock(
+        self,
+        name: str,
+        expire_time: float,
+    ) -> str | None:
+        """Acquire a named lock shared between workers.
+
+        Returns:
+            A token to release the lock with or None if it is taken.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release_lock(self, name: str, token: str):
+        """Release a named lock if it is still held with the token."""
+        raise NotImplementedError
@@ -0,0 +1 @@
+from .breaker import CircuitBreakerCache
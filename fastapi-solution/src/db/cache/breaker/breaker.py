@@ -0,0 +1,187 @@
+import asyncio
+from time import monotonic
+from typing import Any, Awaitable, Callable
+
+from core.circuit_breaker import CircuitBreaker, CircuitState
+from core.logger import get_logger
+from db.cache.abc.cache import AbstractCache
+
+logger = get_logger(__name__)
+
+# Токен блокировки, пока кеш недоступен: пересчёт идёт без блокировки
+NO_LOCK = "no-lock"
+
+
+class CircuitBreakerCache(AbstractCache):
+    """Make the wrapped cache optional while it is failing.
+
+    Errors and calls slower than `slow_call` count as failures of the
+    circuit breaker. While the circuit is open the cache is not called:
+    reads are misses and writes are skipped, so services are served
+    straight from the search db. Cache errors are never raised.
+
+    Args:
+        cache: the cache to wrap, e.g. RedisCache.
+        failure_threshold: consecutive failures to open the circuit.
+        reset_timeout: seconds to wait before probing the cache.
+        call_timeout: the time limit of a cache call in seconds.
+        slow_call: calls slower than this are failures, in seconds.
+    """
+
+    def __init__(
+        self,
+        cache: AbstractCache,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10,
+        call_timeout: float = 0.5,
+        slow_call: float = 0.2,
+    ) -> None:
+        self.cache = cache
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout,
+        )
+        self.call_timeout = call_timeout
+        self.slow_call = slow_call
+        self.short_circuited = 0
+        self._state = CircuitState.closed
+        return super().__init__()
+
+    @property
+    def client(self):
+        """Return the client of the wrapped cache."""
+        return self.cache.client
+
+    async def close(self):
+        """Close the wrapped cache."""
+        await self.cache.close()
+
+    def stats(self) -> dict[str, str | int]:
+        """Return the circuit state and counters."""
+        return {
+            **self.circuit_breaker.stats(),
+            "short_circuited": self.short_circuited,
+        }
+
+    async def _call(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        default: Any = None,
+    ) -> Any:
+        """Call the wrapped cache, returning default if it fails.
+
+        Raises:
+            asyncio.CancelledError: if the call is cancelled, which is
+                not a failure of the cache.
+        """
+        if not self.circuit_breaker.allow():
+            self.short_circuited += 1
+            return default
+
+        started_at = monotonic()
+        try:
+            cached = await asyncio.wait_for(call(), self.call_timeout)
+        except asyncio.CancelledError:
+            self.circuit_breaker.record_cancel()
+            raise
+        except Exception as error:
+            logger.warning("Cache call failed: {0!r}".format(error))
+            self.circuit_breaker.record_failure()
+            self._log_state()
+            return default
+
+        if monotonic() - started_at > self.slow_call:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        self._log_state()
+        return cached
+
+    def _log_state(self):
+        """Log changes of the circuit state."""
+        state = self.circuit_breaker.state
+        if state is not self._state:
+            logger.warning("Cache circuit is {0}".format(state.value))
+            self._state = state
+
+    async def get(
+        self,
+        name: str,
+        key: str,
+        on_stale: Callable[[], Any] | None = None,
+        raw: bool = False,
+    ) -> Any | None:
+        """Get data from the wrapped cache, a miss if it is unavailable."""
+        return await self._call(
+            lambda: self.cache.get(
+                name=name,
+                key=key,
+                on_stale=on_stale,
+                raw=raw,
+            ),
+        )
+
+    async def mget(self, name: str, keys: list[str]) -> list[Any]:
+        """Get several entries, all are misses if the cache is unavailable."""
+        return await self._call(
+            lambda: self.cache.mget(name=name, keys=keys),
+            default=[None for _ in keys],
+        )
+
+    async def set(
+        self,
+        name: str,
+        key: str,
+        key_value: Any,
+        expire_time: int | None = None,
+    ):
+        """Set data to the wrapped cache if it is available."""
+        await self._call(
+            lambda: self.cache.set(
+                name=name,
+                key=key,
+                key_value=key_value,
+                expire_time=expire_time,
+            ),
+        )
+
+    async def mset(
+        self,
+        name: str,
+        mapping: dict[str, Any],
+        expire_time: int | None = None,
+    ):
+        """Set several entries to the wrapped cache if it is available."""
+        await self._call(
+            lambda: self.cache.mset(
+                name=name,
+                mapping=mapping,
+                expire_time=expire_time,
+            ),
+        )
+
+    async def acquire_lock(
+        self,
+        name: str,
+        expire_time: float,
+    ) -> str | None:
+        """Acquire a lock, or let the caller go on without it.
+
+        Waiting for a worker, which holds a lock, polls the cache,
+        that is pointless while it is unavailable.
+        """
+        return await self._call(
+            lambda: self.cache.acquire_lock(
+                name=name,
+                expire_time=expire_time,
+            ),
+            default=NO_LOCK,
+        )
+
+    async def release_lock(self, name: str, token: str):
+        """Release a lock in the wrapped cache."""
+        if token == NO_LOCK:
+            return
+        await self._call(
+            lambda: self.cache.release_lock(name=name, token=token),
+        )
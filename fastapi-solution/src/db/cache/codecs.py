@@ -0,0 +1,105 @@
+"""Encoding of cache values."""
+import zlib
+from typing import Any, Callable, Literal
+
+import orjson
+
+from core.imports import import_optional
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+Compression = Literal["none", "zlib", "zstd", "lz4"]
+
+# Первый байт значения: версия формата и алгоритм сжатия. Значения
+# без заголовка записаны до его появления, они читаются как JSON:
+# JSON не может начинаться с этих байтов.
+HEADERS: dict[Compression, bytes] = {
+    "zlib": b"\x01",
+    "zstd": b"\x02",
+    "lz4": b"\x03",
+    "none": b"\x04",
+}
+
+
+zstandard = import_optional("zstandard")
+lz4_frame = import_optional("lz4.frame")
+
+
+def _zstd_compress(serialized: bytes) -> bytes:
+    return zstandard.ZstdCompressor().compress(serialized)
+
+
+def _zstd_decompress(compressed: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(compressed)
+
+
+COMPRESSORS: dict[Compression, Callable[[bytes], bytes]] = {
+    "zlib": zlib.compress,
+}
+DECOMPRESSORS: dict[bytes, Callable[[bytes], bytes]] = {
+    HEADERS["zlib"]: zlib.decompress,
+}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _zstd_compress
+    DECOMPRESSORS[HEADERS["zstd"]] = _zstd_decompress
+if lz4_frame is not None:
+    COMPRESSORS["lz4"] = lz4_frame.compress
+    DECOMPRESSORS[HEADERS["lz4"]] = lz4_frame.decompress
+
+
+class Codec:
+    """Serialize cache values to JSON, compressing large ones.
+
+    Values of at least `threshold` bytes are compressed. Every value is
+    prefixed with a header byte of its format, so any codec decodes
+    values of any other one. zstd and lz4 are optional dependencies,
+    a codec of a missing one is not created.
+
+    Args:
+        compression: the compression algorithm.
+        threshold: the minimal size of a value to compress in bytes.
+        default: serializes objects orjson does not support.
+
+    Raises:
+        ValueError: if the compression library is not installed.
+    """
+
+    def __init__(
+        self,
+        compression: Compression = "none",
+        threshold: int = 1024,
+        default: Callable[[Any], Any] | None = None,
+    ) -> None:
+        if compression != "none" and compression not in COMPRESSORS:
+            raise ValueError(
+                "{0} compression is not installed".format(compression),
+            )
+        self.compression = compression
+        self.threshold = threshold
+        self.default = default
+
+    def encode(self, entry: Any) -> bytes:
+        """Serialize a value."""
+        serialized = orjson.dumps(entry, default=self.default)
+        if self.compression == "none" or len(serialized) < self.threshold:
+            return HEADERS["none"] + serialized
+        compress = COMPRESSORS[self.compression]
+        return HEADERS[self.compression] + compress(serialized)
+
+
+def decode(encoded: bytes) -> Any:
+    """Deserialize a value written by any codec.
+
+    Raises:
+        ValueError: if the value is compressed by a missing library.
+    """
+    header, payload = encoded[:1], encoded[1:]
+    if header == HEADERS["none"]:
+        return orjson.loads(payload)
+    decompress = DECOMPRESSORS.get(header)
+    if decompress is not None:
+        return orjson.loads(decompress(payload))
+    if header in HEADERS.values():
+        raise ValueError("Cache value is compressed by a missing library")
+    return orjson.loads(encoded)
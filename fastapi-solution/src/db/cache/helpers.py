@@ -1,9 +1,66 @@
 """This file contains common functions or class for services."""
+from functools import partial
+from hashlib import blake2b
+from typing import Any, TypeVar
+
+import orjson
+from pydantic import BaseModel
+
 from core.logger import get_logger
 
 logger = get_logger(__name__)
 
+M = TypeVar("M", bound=BaseModel)
+
+# Меняется при изменении формата ключей или значений, чтобы не читать старые
+CACHE_KEY_VERSION = "v1"
+
+
+def _canonical(arg: Any) -> Any:
+    """Return an arg in a form that does not depend on the order of items.
+
+    Order of list items is not significant for any query args,
+    so lists are sorted as well as dict keys.
+    """
+    if isinstance(arg, dict):
+        return {str(key): _canonical(member) for key, member in arg.items()}
+    if isinstance(arg, (list, tuple, set, frozenset)):
+        return sorted(
+            (_canonical(member) for member in arg),
+            key=partial(
+                orjson.dumps,
+                option=orjson.OPT_SORT_KEYS,
+                default=str,
+            ),
+        )
+    return arg
+
 
 def prepare_key_by_args(**kwargs) -> str:
-    """Convert a random named parameters to string as key:value pairs."""
-    return ':'.join([f'{key}:{value}' for key, value in kwargs.items()])
+    """Build a compact cache key from named query args.
+
+    Equivalent args give the same key: unset (None) args are skipped,
+    dict keys and list items are sorted. The key is a fixed length
+    digest with the key version prefix, so user input is never stored
+    in keys verbatim.
+    """
+    args = {key: arg for key, arg in kwargs.items() if arg is not None}
+    payload = orjson.dumps(
+        _canonical(args),
+        option=orjson.OPT_SORT_KEYS,
+        default=str,
+    )
+    digest = blake2b(payload, digest_size=16).hexdigest()
+    return "{0}:{1}".format(CACHE_KEY_VERSION, digest)
+
+
+def load_model(model: type[M], cached: Any) -> M:
+    """Return a cached value as a model, parsing it only if needed."""
+    if isinstance(cached, model):
+        return cached
+    return model.parse_obj(cached)
+
+
+def load_models(model: type[M], cached: list[Any]) -> list[M]:
+    """Return cached values as a list of models."""
+    return [load_model(model, entry) for entry in cached]
@@ -0,0 +1,237 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, NamedTuple
+
+import orjson
+
+from core.logger import get_logger
+from db.cache.abc.cache import AbstractCache
+
+logger = get_logger(__name__)
+
+
+class _Entry(NamedTuple):
+    """Object kept in the local cache."""
+
+    cached: Any
+    size: int
+    expire_at: float
+
+
+# Ключ локальной записи: пространство имён, ключ и признак сырых байтов
+_EntryKey = tuple[str, str, bool]
+
+
+class LocalCache(AbstractCache):
+    """In-process LRU cache in front of another cache.
+
+    Keeps already parsed objects, so a hit costs neither network I/O
+    nor deserialization. The local TTL should be shorter than the TTL
+    of the wrapped cache, because workers do not invalidate each other.
+    An entry set with a shorter TTL is kept locally for that TTL.
+    Raw bytes and decoded objects of a key are kept apart.
+
+    Args:
+        cache: the cache to wrap, e.g. RedisCache.
+        max_entries: the maximum number of stored entries.
+        max_bytes: the maximum total JSON size of stored entries.
+        expire_time: the maximum TTL of an entry in seconds.
+        loaders: converters of values read from the wrapped cache.
+    """
+
+    def __init__(
+        self,
+        cache: AbstractCache,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        expire_time: int = 30,
+        loaders: dict[str, Callable[[Any], Any]] | None = None,
+    ) -> None:
+        self.cache = cache
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.expire_time = expire_time
+        self.loaders = loaders or {}
+
+        self._entries: OrderedDict[_EntryKey, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        return super().__init__()
+
+    @property
+    def client(self):
+        """Return the client of the wrapped cache."""
+        return self.cache.client
+
+    async def close(self):
+        """Drop local entries and close the wrapped cache."""
+        self._entries.clear()
+        self._bytes = 0
+        await self.cache.close()
+
+    def stats(self) -> dict[str, int]:
+        """Return occupancy and hit statistics."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
+
+    def _lookup(self, name: str, key: str, raw: bool = False) -> Any | None:
+        """Return a fresh local entry and mark it as recently used."""
+        entry_key = (name, key, raw)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        if entry.expire_at <= monotonic():
+            self._discard(entry_key)
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(entry_key)
+        self._hits += 1
+        return entry.cached
+
+    def _discard(self, entry_key: _EntryKey):
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _store(
+        self,
+        name: str,
+        key: str,
+        cached: Any,
+        expire_time: int | None = None,
+    ):
+        """Keep an object locally, evicting least recently used entries."""
+        if cached is None:
+            return
+
+        raw = isinstance(cached, bytes)
+        if raw or isinstance(cached, str):
+            size = len(cached)
+        else:
+            size = len(orjson.dumps(cached, default=dict))
+        if size > self.max_bytes:
+            return
+
+        if expire_time is None:
+            expire_time = self.expire_time
+        entry_key = (name, key, raw)
+        self._discard(entry_key)
+        self._entries[entry_key] = _Entry(
+            cached=cached,
+            size=size,
+            expire_at=monotonic() + min(expire_time, self.expire_time),
+        )
+        self._bytes += size
+
+        while (
+            len(self._entries) > self.max_entries
+            or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._evictions += 1
+
+    def _load(self, name: str, cached: Any) -> Any:
+        """Convert a value from the wrapped cache to a local object."""
+        loader = self.loaders.get(name)
+        if cached is None or loader is None:
+            return cached
+        return loader(cached)
+
+    async def get(
+        self,
+        name: str,
+        key: str,
+        on_stale: Callable[[], Any] | None = None,
+        raw: bool = False,
+    ) -> Any | None:
+        """Get data from the local cache or from the wrapped one."""
+        cached = self._lookup(name, key, raw)
+        if cached is not None:
+            return cached
+
+        cached = await self.cache.get(
+            name=name,
+            key=key,
+            on_stale=on_stale,
+            raw=raw,
+        )
+        if not raw:
+            cached = self._load(name, cached)
+        self._store(name, key, cached)
+        return cached
+
+    async def mget(self, name: str, keys: list[str]) -> list[Any]:
+        """Get several entries, asking the wrapped cache only for misses."""
+        found = [self._lookup(name, key) for key in keys]
+        missed = [
+            index for index, cached in enumerate(found) if cached is None
+        ]
+        if not missed:
+            return found
+
+        fetched = await self.cache.mget(
+            name=name,
+            keys=[keys[index] for index in missed],
+        )
+        for index, cached in zip(missed, fetched):
+            found[index] = self._load(name, cached)
+            self._store(name, keys[index], found[index])
+
+        return found
+
+    async def set(
+        self,
+        name: str,
+        key: str,
+        key_value: Any,
+        expire_time: int | None = None,
+    ):
+        """Set data to both the local and the wrapped cache."""
+        self._store(name, key, key_value, expire_time)
+        await self.cache.set(
+            name=name,
+            key=key,
+            key_value=key_value,
+            expire_time=expire_time,
+        )
+
+    async def mset(
+        self,
+        name: str,
+        mapping: dict[str, Any],
+        expire_time: int | None = None,
+    ):
+        """Set several entries to both the local and the wrapped cache."""
+        for key, key_value in mapping.items():
+            self._store(name, key, key_value, expire_time)
+        await self.cache.mset(
+            name=name,
+            mapping=mapping,
+            expire_time=expire_time,
+        )
+
+    async def acquire_lock(
+        self,
+        name: str,
+        expire_time: float,
+    ) -> str | None:
+        """Acquire a lock in the wrapped cache."""
+        return await self.cache.acquire_lock(
+            name=name,
+            expire_time=expire_time,
+        )
+
+    async def release_lock(self, name: str, token: str):
+        """Release a lock in the wrapped cache."""
+        await self.cache.release_lock(name=name, token=token)
@@ -1,24 +1,122 @@
-from typing import Any
+import struct
+from math import log
+from secrets import SystemRandom
+from time import time
+from typing import Any, Callable, Literal
+from uuid import uuid4
 
-import orjson
+from aioretry import retry
+from pydantic import BaseModel
 from redis.asyncio import Redis
 
+from core.config import redis_conf
 from core.logger import get_logger
+from db.backoff_policy import retry_policy, within_deadline
 from db.cache.abc.cache import AbstractCache
-from core.config import redis_conf
-from db.backoff_policy import retry_policy
-from aioretry import retry
+from db.cache.codecs import Codec, Compression, decode
 
 logger = get_logger(__name__)
 
+# Случайное раннее обновление из системного генератора, не из общего random
+random = SystemRandom().random
+
+# Удаляет блокировку, только если она всё ещё принадлежит владельцу токена
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Поля обёртки записи с мягким сроком жизни
+SOFT_EXPIRE_FIELD = "_soft_expire"
+VALUE_FIELD = "_value"
+
+# Сырое значение с мягким сроком жизни: байт заголовка и время (double)
+# перед сохранёнными байтами. JSON не может начинаться с нулевого байта.
+RAW_SOFT_EXPIRE_HEADER = b"\x00"
+RAW_SOFT_EXPIRE = struct.Struct("!cd")
+
+
+def _dump_default(entry: Any) -> Any:
+    """Serialize models without unset fields, e.g. ones cut by projection.
+
+    Parsing fills such fields with defaults again, so nothing is lost.
+    """
+    if isinstance(entry, BaseModel):
+        return entry.dict(exclude_unset=True)
+    return dict(entry)
+
+
+def _unwrap_raw(key_value: bytes | None) -> tuple[Any, float | None]:
+    """Split stored raw bytes into the value and its soft expiry time."""
+    if not key_value or key_value[:1] != RAW_SOFT_EXPIRE_HEADER:
+        return key_value, None
+    _, soft_expire = RAW_SOFT_EXPIRE.unpack_from(key_value)
+    return key_value[RAW_SOFT_EXPIRE.size:], soft_expire
+
+
+def _unwrap(key_value: Any) -> tuple[Any, float | None]:
+    """Split a stored value into the value and its soft expiry time."""
+    if isinstance(key_value, dict) and SOFT_EXPIRE_FIELD in key_value:
+        return key_value[VALUE_FIELD], key_value[SOFT_EXPIRE_FIELD]
+    return key_value, None
+
+
+def _decode(key_value: Any) -> Any:
+    """Deserialize a raw value fetched from Redis."""
+    if isinstance(key_value, bytes):
+        return decode(key_value)
+    return key_value
+
 
 class RedisCache(AbstractCache):
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        key_layout: Literal["key", "hash"] = "key",
+        key_prefix: str = "",
+        namespace_expire: dict[str, int] | None = None,
+        read_legacy_hash: bool = False,
+        namespace_soft_expire: dict[str, int] | None = None,
+        early_refresh_beta: float = 0,
+        recompute_time: float = 0.1,
+        compression: Compression = "none",
+        namespace_compression: dict[str, Compression] | None = None,
+        compress_threshold: int = 1024,
+        socket_timeout: float | None = None,
+        socket_connect_timeout: float | None = None,
+    ) -> None:
         self.host = host
         self.port = port
+        self._key_layout = key_layout
+        self._key_prefix = key_prefix
+        self._namespace_expire = namespace_expire or {}
+        self._read_legacy_hash = read_legacy_hash
+        self._namespace_soft_expire = namespace_soft_expire or {}
+        self._early_refresh_beta = early_refresh_beta
+        self._recompute_time = recompute_time
+        self._codec = Codec(
+            compression=compression,
+            threshold=compress_threshold,
+            default=_dump_default,
+        )
+        self._namespace_codecs = {
+            name: Codec(
+                compression=namespace_compression,
+                threshold=compress_threshold,
+                default=_dump_default,
+            )
+            for name, namespace_compression in (
+                namespace_compression or {}
+            ).items()
+        }
         self._client = Redis(
             host=self.host,
             port=self.port,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
         )
         return super().__init__()
 
@@ -31,34 +129,188 @@ class RedisCache(AbstractCache):
         """Close Redis connection."""
         await self.client.close()
 
-    @retry(retry_policy)
-    async def get(self, name: str, key: str) -> Any | None:
-        """Get data from Redis cache using hash name."""
-        logger.info(f"Search hash {name} in redis cache by key <{key}>")
-        key_value = await self.client.hget(name=name, key=key)
+    def entry_key(self, name: str, key: str) -> str:
+        """Build a namespaced key for a single cache entry."""
+        if self._key_prefix:
+            return "{0}:{1}:{2}".format(self._key_prefix, name, key)
+        return "{0}:{1}".format(name, key)
+
+    def expire_for(self, name: str, expire_time: int | None = None) -> int:
+        """Return TTL for a namespace unless it is given explicitly."""
+        if expire_time is not None:
+            return expire_time
+        return self._namespace_expire.get(name, redis_conf.redis_expire)
+
+    def _wrap(self, name: str, key_value: Any) -> Any:
+        """Attach a soft expiry time for namespaces that use it.
+
+        Raw values get a binary header, so they are still stored and
+        returned as is, without decoding.
+        """
+        soft_expire = self._namespace_soft_expire.get(name)
+        if soft_expire is None:
+            return key_value
+        if isinstance(key_value, bytes):
+            return RAW_SOFT_EXPIRE.pack(
+                RAW_SOFT_EXPIRE_HEADER,
+                time() + soft_expire,
+            ) + key_value
+        return {
+            SOFT_EXPIRE_FIELD: time() + soft_expire,
+            VALUE_FIELD: key_value,
+        }
+
+    def is_stale(self, soft_expire: float) -> bool:
+        """Check whether an entry should be refreshed.
+
+        Uses probabilistic early expiration (XFetch): the closer
+        the soft expiry time is, the more likely a refresh, so entries
+        get recomputed before they expire without synchronized misses.
+        """
+        now = time()
+        if self._early_refresh_beta > 0:
+            now -= (
+                self._recompute_time
+                * self._early_refresh_beta
+                * log(1 - random())
+            )
+        return now >= soft_expire
+
+    def _encode(self, name: str, key_value: Any) -> bytes:
+        """Serialize a value with the codec of its namespace."""
         if isinstance(key_value, bytes):
-            key_value = orjson.loads(key_value.decode("utf-8"))
+            return key_value
+        codec = self._namespace_codecs.get(name, self._codec)
+        return codec.encode(key_value)
+
+    @retry(retry_policy)
+    @within_deadline
+    async def get(
+        self,
+        name: str,
+        key: str,
+        on_stale: Callable[[], Any] | None = None,
+        raw: bool = False,
+    ) -> Any | None:
+        """Get data from Redis cache by namespace and key."""
+        logger.info("Search {0} in redis cache by key <{1}>".format(name, key))
+        if self._key_layout == "hash":
+            key_value = await self.client.hget(name=name, key=key)
+        else:
+            key_value = await self.client.get(self.entry_key(name, key))
+            if key_value is None and self._read_legacy_hash:
+                key_value = await self.client.hget(name=name, key=key)
+
+        if raw:
+            key_value, soft_expire = _unwrap_raw(key_value)
+        else:
+            key_value, soft_expire = _unwrap(_decode(key_value))
+        if soft_expire is not None and on_stale and self.is_stale(soft_expire):
+            logger.info(
+                "Refresh stale {0} in redis cache by key <{1}>".format(
+                    name,
+                    key,
+                ),
+            )
+            on_stale()
         return key_value
 
     @retry(retry_policy)
+    @within_deadline
+    async def mget(self, name: str, keys: list[str]) -> list[Any]:
+        """Get several entries of a namespace in one round trip."""
+        logger.info(
+            "Search {0} in redis cache by {1} keys".format(name, len(keys)),
+        )
+        if not keys:
+            return []
+
+        if self._key_layout == "hash":
+            stored = await self.client.hmget(name, keys)
+        else:
+            stored = await self.client.mget(
+                [self.entry_key(name, key) for key in keys],
+            )
+            missed = [i for i, entry in enumerate(stored) if entry is None]
+            if missed and self._read_legacy_hash:
+                legacy = await self.client.hmget(
+                    name,
+                    [keys[i] for i in missed],
+                )
+                for i, legacy_entry in zip(missed, legacy):
+                    stored[i] = legacy_entry
+
+        return [_unwrap(_decode(entry))[0] for entry in stored]
+
     async def set(
         self,
         name: str,
         key: str,
         key_value: Any,
-        expire_time: int = redis_conf.REDIS_EXPIRE,
+        expire_time: int | None = None,
     ):
-        """Set data to Redis cache using hash name."""
-        logger.info(f"Put hash {name} in redis cache by key <{key}>")
-        if not isinstance(key_value, bytes):
-            key_value = orjson.dumps(key_value, default=dict)
-
-        await self.client.hset(
+        """Set data to Redis cache by namespace and key."""
+        await self.mset(
             name=name,
-            key=key,
-            value=key_value,
+            mapping={key: key_value},
+            expire_time=expire_time,
         )
-        await self.client.expire(
-            name=name,
-            time=expire_time,
+
+    @retry(retry_policy)
+    @within_deadline
+    async def mset(
+        self,
+        name: str,
+        mapping: dict[str, Any],
+        expire_time: int | None = None,
+    ):
+        """Set several entries of a namespace in one round trip.
+
+        The legacy hash layout needs HSET and EXPIRE to be applied
+        together, so it is sent as MULTI/EXEC.
+        """
+        if not mapping:
+            return
+
+        logger.info(
+            "Put {0} in redis cache by {1} keys".format(name, len(mapping)),
+        )
+        expire_time = self.expire_for(name, expire_time)
+        encoded = {
+            key: self._encode(name, self._wrap(name, key_value))
+            for key, key_value in mapping.items()
+        }
+
+        use_hash = self._key_layout == "hash"
+        async with self.client.pipeline(transaction=use_hash) as pipe:
+            if use_hash:
+                pipe.hset(name=name, mapping=encoded)
+                pipe.expire(name=name, time=expire_time)
+            else:
+                for key, entry in encoded.items():
+                    pipe.set(self.entry_key(name, key), entry, ex=expire_time)
+            await pipe.execute()
+
+    async def acquire_lock(
+        self,
+        name: str,
+        expire_time: float,
+    ) -> str | None:
+        """Acquire a lock with a lease using SET NX PX."""
+        token = uuid4().hex
+        acquired = await self.client.set(
+            self.entry_key("lock", name),
+            token,
+            nx=True,
+            px=int(expire_time * 1000),
+        )
+        return token if acquired else None
+
+    async def release_lock(self, name: str, token: str):
+        """Release a lock only if it was not taken over after expiring."""
+        await self.client.eval(
+            RELEASE_LOCK_SCRIPT,
+            1,
+            self.entry_key("lock", name),
+            token,
         )
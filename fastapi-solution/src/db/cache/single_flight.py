@@ -0,0 +1,212 @@
+"""Protection against cache stampede on cache misses."""
+import asyncio
+from contextlib import AsyncExitStack
+from functools import partial
+from time import monotonic
+from typing import Any, Awaitable, Callable
+
+from core.config import redis_conf
+from core.logger import get_logger
+from db.cache.abc.cache import AbstractCache
+
+logger = get_logger(__name__)
+
+
+def _start(
+    calls: dict[str, asyncio.Future],
+    key: str,
+    coro: Awaitable[Any],
+) -> asyncio.Future:
+    """Run a call, keeping it in `calls` by key while it is in flight."""
+    call = asyncio.ensure_future(coro)
+    calls[key] = call
+    call.add_done_callback(partial(_forget, calls, key))
+    return call
+
+
+def _forget(
+    calls: dict[str, asyncio.Future],
+    key: str,
+    call: asyncio.Future,
+) -> None:
+    """Remove a finished call, unless the key is taken by a newer one."""
+    if calls.get(key) is call:
+        calls.pop(key)
+
+
+def _log_failure(call: asyncio.Future) -> None:
+    """Log an error of a background refresh, nobody awaits it."""
+    if not call.cancelled() and call.exception():
+        logger.error(
+            "Background cache refresh failed",
+            exc_info=call.exception(),
+        )
+
+
+class SingleFlight:
+    """Coalesce concurrent recomputations of the same cache entry.
+
+    Inside a worker only one coroutine per key runs `load`, the others
+    await its result. With `use_lock` a short-lived lock in the cache
+    lets only one worker recompute: the rest poll the cache until the
+    value appears or the wait time is over and then load it themselves.
+    `refresh` recomputes stale entries in background, so callers keep
+    being served the old value meanwhile.
+
+    Args:
+        cache: the cache that holds cross-worker locks.
+        use_lock: whether to take the cross-worker lock.
+        lock_expire: lease of the lock in seconds.
+        lock_wait: how long to wait for another worker in seconds.
+        lock_poll: delay between cache checks while waiting in seconds.
+    """
+
+    def __init__(
+        self,
+        cache: AbstractCache | None = None,
+        use_lock: bool = redis_conf.redis_lock_enabled,
+        lock_expire: float = redis_conf.redis_lock_expire,
+        lock_wait: float = redis_conf.redis_lock_wait,
+        lock_poll: float = 0.05,
+    ) -> None:
+        self.cache = cache
+        self.use_lock = use_lock and cache is not None
+        self.lock_expire = lock_expire
+        self.lock_wait = lock_wait
+        self.lock_poll = lock_poll
+        self._calls: dict[str, asyncio.Future] = {}
+        self._refreshes: dict[str, asyncio.Future] = {}
+
+    async def fetch(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        store: Callable[[Any], Awaitable[Any]] | None = None,
+        recheck: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Any:
+        """Load a value once for all concurrent callers with the same key.
+
+        Args:
+            key: the cache key of the value.
+            load: fetches the value from the search db.
+            store: puts a loaded value to cache.
+            recheck: reads the value from cache, returns None on a miss.
+
+        Returns:
+            The loaded value.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _start(
+                self._calls,
+                key,
+                self._run(key, load, store, recheck),
+            )
+
+        # Отмена одного из ожидающих не должна отменять общий запрос
+        return await asyncio.shield(call)
+
+    def refresh(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        store: Callable[[Any], Awaitable[Any]],
+    ):
+        """Recompute a stale entry in background unless it is in flight.
+
+        Meant to be passed as on_stale to AbstractCache.get, so callers
+        are served the stale value without waiting.
+        """
+        if key in self._calls or key in self._refreshes:
+            return
+
+        call = _start(
+            self._refreshes,
+            key,
+            self._refresh(key, load, store),
+        )
+        call.add_done_callback(_log_failure)
+
+    async def _refresh(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        store: Callable[[Any], Awaitable[Any]],
+    ) -> Any:
+        if not self.use_lock:
+            return await self._load(load, store)
+
+        # Другой воркер уже обновляет запись, ждать его не нужно
+        token = await self.cache.acquire_lock(  # type: ignore
+            name=key,
+            expire_time=self.lock_expire,
+        )
+        if not token:
+            return None
+
+        return await self._load_locked(key, token, load, store)
+
+    async def _run(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        store: Callable[[Any], Awaitable[Any]] | None,
+        recheck: Callable[[], Awaitable[Any]] | None,
+    ) -> Any:
+        if not self.use_lock or recheck is None:
+            return await self._load(load, store)
+
+        token = await self.cache.acquire_lock(  # type: ignore
+            name=key,
+            expire_time=self.lock_expire,
+        )
+        if token:
+            return await self._load_locked(key, token, load, store)
+
+        cached = await self._wait_for_recompute(key, recheck)
+        if cached:
+            return cached
+        return await self._load(load, store)
+
+    async def _wait_for_recompute(
+        self,
+        key: str,
+        recheck: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Poll the cache until another worker stores the value."""
+        logger.info(
+            "Wait for another worker to recompute <{0}>".format(key),
+        )
+        deadline = monotonic() + self.lock_wait
+        while monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll)
+            cached = await recheck()
+            if cached:
+                return cached
+        return None
+
+    async def _load_locked(
+        self,
+        key: str,
+        token: str,
+        load: Callable[[], Awaitable[Any]],
+        store: Callable[[Any], Awaitable[Any]] | None,
+    ) -> Any:
+        """Load a value holding the lock, releasing it in any case."""
+        async with AsyncExitStack() as stack:
+            stack.push_async_callback(
+                self.cache.release_lock,  # type: ignore
+                name=key,
+                token=token,
+            )
+            return await self._load(load, store)
+
+    async def _load(
+        self,
+        load: Callable[[], Awaitable[Any]],
+        store: Callable[[Any], Awaitable[Any]] | None,
+    ) -> Any:
+        loaded = await load()
+        if loaded and store is not None:
+            await store(loaded)
+        return loaded
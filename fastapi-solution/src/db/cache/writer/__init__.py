@@ -0,0 +1 @@
+from .writer import WriteBehindCache
@@ -0,0 +1,178 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from core.concurrency import cancel_tasks, create_background_task
+from core.logger import get_logger
+from db.cache.abc.cache import AbstractCache
+
+logger = get_logger(__name__)
+
+# Отложенная запись в кеш
+Write = Callable[[], Awaitable[Any]]
+
+
+class WriteBehindCache(AbstractCache):
+    """Write to the wrapped cache in background.
+
+    set and mset put the write into a bounded queue and return at once,
+    so a response does not wait for the cache round trip and
+    serialization. Workers apply queued writes one by one. If the queue
+    is full, a write waits up to `put_timeout` for a free slot and is
+    dropped after that: a lost write is only a future cache miss.
+
+    Args:
+        cache: the cache to wrap, e.g. RedisCache.
+        queue_size: the maximum number of pending writes.
+        workers: the number of concurrent writers.
+        put_timeout: how long a write waits for a free slot in seconds.
+    """
+
+    def __init__(
+        self,
+        cache: AbstractCache,
+        queue_size: int = 1000,
+        workers: int = 2,
+        put_timeout: float = 0,
+    ) -> None:
+        self.cache = cache
+        self._workers = workers
+        self._put_timeout = put_timeout
+        self.queue: asyncio.Queue[Write] = asyncio.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._tasks: list[asyncio.Task] = []
+        return super().__init__()
+
+    @property
+    def client(self):
+        """Return the client of the wrapped cache."""
+        return self.cache.client
+
+    def start(self):
+        """Start the writers, must be called in the running event loop.
+
+        Writers started by the first write of a request do not inherit
+        its context, so the request deadline does not apply to them.
+        """
+        if not self._tasks:
+            self._tasks = [
+                create_background_task(self._work())
+                for _ in range(self._workers)
+            ]
+
+    async def close(self, timeout: float = 5):
+        """Apply pending writes, stop the writers and close the cache."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Drop {0} cache writes on shutdown".format(self.queue.qsize()),
+            )
+        await cancel_tasks(self._tasks)
+        self._tasks = []
+        await self.cache.close()
+
+    def stats(self) -> dict[str, int]:
+        """Return queue occupancy and write counters."""
+        return {
+            "pending": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def _work(self):
+        """Apply queued writes until cancelled."""
+        while True:
+            write = await self.queue.get()
+            try:
+                await write()
+            except Exception:
+                self.failed += 1
+                logger.exception("Background cache write failed")
+            else:
+                self.written += 1
+            finally:
+                self.queue.task_done()
+
+    async def _enqueue(self, write: Write):
+        """Queue a write, dropping it if the queue stays full."""
+        self.start()
+        try:
+            if self._put_timeout > 0:
+                await asyncio.wait_for(
+                    self.queue.put(write),
+                    self._put_timeout,
+                )
+            else:
+                self.queue.put_nowait(write)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.dropped += 1
+            logger.warning("Cache write queue is full, drop the write")
+
+    async def get(
+        self,
+        name: str,
+        key: str,
+        on_stale: Callable[[], Any] | None = None,
+        raw: bool = False,
+    ) -> Any | None:
+        """Get data from the wrapped cache."""
+        return await self.cache.get(
+            name=name,
+            key=key,
+            on_stale=on_stale,
+            raw=raw,
+        )
+
+    async def mget(self, name: str, keys: list[str]) -> list[Any]:
+        """Get several entries from the wrapped cache."""
+        return await self.cache.mget(name=name, keys=keys)
+
+    async def set(
+        self,
+        name: str,
+        key: str,
+        key_value: Any,
+        expire_time: int | None = None,
+    ):
+        """Queue a write of data to the wrapped cache."""
+        await self._enqueue(
+            lambda: self.cache.set(
+                name=name,
+                key=key,
+                key_value=key_value,
+                expire_time=expire_time,
+            ),
+        )
+
+    async def mset(
+        self,
+        name: str,
+        mapping: dict[str, Any],
+        expire_time: int | None = None,
+    ):
+        """Queue a write of several entries to the wrapped cache."""
+        await self._enqueue(
+            lambda: self.cache.mset(
+                name=name,
+                mapping=mapping,
+                expire_time=expire_time,
+            ),
+        )
+
+    async def acquire_lock(
+        self,
+        name: str,
+        expire_time: float,
+    ) -> str | None:
+        """Acquire a lock in the wrapped cache."""
+        return await self.cache.acquire_lock(
+            name=name,
+            expire_time=expire_time,
+        )
+
+    async def release_lock(self, name: str, token: str):
+        """Release a lock in the wrapped cache."""
+        await self.cache.release_lock(name=name, token=token)
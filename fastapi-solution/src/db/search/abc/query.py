@@ -1,7 +1,7 @@
+from abc import ABC, abstractmethod
 from typing import TypeVar
 
 from .model import IndexMixin
-from abc import ABC, abstractmethod
 
 S = TypeVar("S", bound=IndexMixin)
 
@@ -1,10 +1,20 @@
 """Здесь должен быть модуль с абстракцией работы с поисковой базой (elasticsearch)"""
 from abc import ABC, abstractmethod, abstractproperty
-from typing import Any
+from typing import Any, AsyncIterator, Callable
+
+from db.backoff_policy import NonRetryableError
 
 from .query import AbstractQuery
 
 
+class SearchContextMissing(NonRetryableError):
+    """Raised when a point in time or a scroll context has expired."""
+
+
+class InvalidSearchQuery(NonRetryableError):
+    """Raised when the search db rejects a query as malformed."""
+
+
 class AbstractClient(ABC):
     """Interface for a client."""
 
@@ -24,6 +34,13 @@ class AbstractIndex(ABC):
 
 
 class AbstractSearch(AbstractClient):
+    def start_batching(self):
+        """Start collecting single gets of the current request in batches.
+
+        Called once per request, tasks started by the request share
+        its batches. Does nothing unless a search db supports batching.
+        """
+
     @abstractmethod
     async def get(
         self,
@@ -38,26 +55,53 @@ class AbstractSearch(AbstractClient):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    async def mget(
+        self,
+        index: str,
+        ids: list[str],
+    ) -> list[Any]:
+        """
+        Get several documents from search db by ids in one request.
+
+        Returns:
+            Should return sources of documents in the ids order,
+            None for missing ones.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     async def scan(
         self,
         index: str | list[str],
         query: AbstractQuery | None = None,
         scroll: str = "5m",
-    ):
+        size: int | None = None,
+        slices: int | None = None,
+        parse: Callable[[dict[str, Any]], Any] | None = None,
+    ) -> AsyncIterator[Any]:
         """
         Get data from search db using async scan.
         Using scroll.
 
+        Hits are streamed as they arrive, the scroll contexts are
+        cleared when the iteration ends, fails or the iterator is
+        closed, so use it with contextlib.aclosing.
+
+        Args:
+            size: the number of hits fetched per scroll request.
+            slices: the number of scroll slices read in parallel.
+            parse: converts the source of a hit, e.g. to a model.
+
         Returns:
-            Should yield every hit.
+            Should yield every hit, or every parsed source with parse.
         """
         raise NotImplementedError
 
     @abstractmethod
     async def search(
         self,
-        index: str | list[str],
+        index: str | list[str] | None,
         query: AbstractQuery | None = None,
         size: int | None = None,
         from_: int | None = None,
@@ -66,11 +110,36 @@ class AbstractSearch(AbstractClient):
         Get data from search db using async scan.
         Using pagination.
 
+        Index should be None if the query searches in a point in time.
+
         Returns:
             Should return full response.
+
+        Raises:
+            SearchContextMissing: if the point in time has expired.
+            InvalidSearchQuery: if the query is rejected as malformed.
         """
         raise NotImplementedError
 
+    @abstractmethod
+    async def open_point_in_time(
+        self,
+        index: str | list[str],
+        keep_alive: str,
+    ) -> str:
+        """
+        Open a point in time to page through a consistent view of index.
+
+        Returns:
+            Should return the point in time id.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def close_point_in_time(self, pit_id: str):
+        """Close a point in time, ignoring already expired ones."""
+        raise NotImplementedError
+
     @abstractmethod
     async def scroll(
         self,
@@ -0,0 +1,92 @@
+"""Coalescing of single document loads into batch loads."""
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from core.concurrency import create_background_task
+
+# Загрузка значений ключей группы в порядке ключей
+LoadMany = Callable[[str, list[str]], Awaitable[list[Any]]]
+
+
+class Batcher:
+    """Collect concurrent loads of single keys into one batch load.
+
+    Works like DataLoader: keys requested for the same group, e.g.
+    an index, in one iteration of the event loop or within `delay`
+    seconds are loaded by one call of `load_many`, a batch is sent
+    earlier when it reaches `max_batch` keys. Concurrent loads of the
+    same key share one result. A batch serves several callers, so it is
+    loaded without the context of any of them, e.g. their deadlines.
+
+    Args:
+        load_many: loads values of keys of a group in the keys order.
+        delay: how long to collect a batch in seconds, 0 for one loop turn.
+        max_batch: the maximum number of keys in a batch.
+    """
+
+    def __init__(
+        self,
+        load_many: LoadMany,
+        delay: float = 0,
+        max_batch: int = 100,
+    ) -> None:
+        self.load_many = load_many
+        self.delay = delay
+        self.max_batch = max_batch
+        self._pending: dict[str, dict[str, asyncio.Future]] = {}
+        self._timers: dict[str, asyncio.Handle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, group: str, key: str) -> Any:
+        """Load the value of a key as a part of a batch."""
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(group, {})
+        future = pending.get(key)
+        if future is None:
+            future = loop.create_future()
+            pending[key] = future
+            if len(pending) >= self.max_batch:
+                self._dispatch(group)
+            elif group not in self._timers:
+                self._timers[group] = self._schedule(loop, group)
+
+        # Отмена одного из ожидающих не должна отменять загрузку пачки
+        return await asyncio.shield(future)
+
+    def _schedule(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        group: str,
+    ) -> asyncio.Handle:
+        """Schedule sending the batch of a group."""
+        if self.delay > 0:
+            return loop.call_later(self.delay, self._dispatch, group)
+        return loop.call_soon(self._dispatch, group)
+
+    def _dispatch(self, group: str):
+        """Send the collected batch of a group."""
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(group, None)
+        if not batch:
+            return
+
+        task = create_background_task(self._run(group, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: str, batch: dict[str, asyncio.Future]):
+        """Load a batch and resolve the futures of its keys."""
+        try:
+            loaded = await self.load_many(group, list(batch))
+        except Exception as error:
+            for waiter in batch.values():
+                if not waiter.done():
+                    waiter.set_exception(error)
+            return
+
+        for future, entry in zip(batch.values(), loaded):
+            if not future.done():
+                future.set_result(entry)
@@ -4,5 +4,10 @@ db: AbstractSearch | None = None
 
 
 async def get_search() -> AbstractSearch | None:
-    """For create one connection in app as dependency."""
+    """For create one connection in app as dependency.
+
+    Starts batching of single gets for the request.
+    """
+    if db is not None:
+        db.start_batching()
     return db
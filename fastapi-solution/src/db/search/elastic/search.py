@@ -1,29 +1,128 @@
-from typing import Any, Iterator
+import asyncio
+from contextlib import AsyncExitStack, ExitStack, aclosing
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterator
 
-from db.search.abc.query import AbstractQuery
-from db.search.abc.search import AbstractSearch
-from elasticsearch import AsyncElasticsearch, NotFoundError
-from elasticsearch.helpers import async_scan
 from aioretry import retry
+from elastic_transport import AiohttpHttpNode
+from elasticsearch import AsyncElasticsearch, BadRequestError, NotFoundError
+from elasticsearch.helpers import async_scan
+
+from core.concurrency import cancel_tasks
+from db.backoff_policy import retry_policy, within_deadline
+from db.search.abc.query import AbstractQuery
+from db.search.abc.search import (
+    AbstractSearch,
+    InvalidSearchQuery,
+    SearchContextMissing,
+)
+from db.search.batcher import Batcher
+
+# Пачка одиночных get текущего запроса, см. Search.start_batching
+_get_batcher: ContextVar[Batcher | None] = ContextVar(
+    "get_batcher",
+    default=None,
+)
+
+# Срез scroll прочитан полностью
+_SLICE_DONE = object()
+
+
+async def _parse_hits(
+    hits: AsyncIterator[Any],
+    parse: Callable[[dict[str, Any]], Any] | None,
+) -> AsyncIterator[Any]:
+    async with aclosing(hits) as opened_hits:
+        async for hit in opened_hits:
+            yield parse(hit["_source"]) if parse else hit
+
 
-from db.backoff_policy import retry_policy
+class PooledNode(AiohttpHttpNode):
+    """Node of the transport pool, which counts its requests.
+
+    aiohttp does not expose how many pooled connections are busy,
+    so requests in flight are counted around perform_request.
+    """
+
+    def __init__(self, config) -> None:
+        super().__init__(config)
+        self.in_flight = 0
+        self.requests = 0
+
+    async def perform_request(self, *args, **kwargs):
+        """Send a request, counting it while it is in flight."""
+        self.in_flight += 1
+        self.requests += 1
+        with ExitStack() as stack:
+            stack.callback(self._finish_request)
+            return await super().perform_request(*args, **kwargs)
+
+    def _finish_request(self):
+        self.in_flight -= 1
 
 
 class Search(AbstractSearch):
-    def __init__(self, hosts) -> None:
+    def __init__(
+        self,
+        hosts,
+        connections_per_node: int = 10,
+        request_timeout: float | None = None,
+        http_compress: bool = False,
+        get_batch: bool = False,
+        get_batch_delay: float = 0,
+        get_batch_size: int = 100,
+        scan_size: int = 1000,
+        scan_slices: int = 1,
+    ) -> None:
         self.hosts = hosts
+        self.connections_per_node = connections_per_node
+        self.scan_size = scan_size
+        self.scan_slices = scan_slices
+        # Соединения узла держатся открытыми в пуле aiohttp и переиспользуются
+        self._client = AsyncElasticsearch(
+            hosts=self.hosts,
+            verify_certs=False,
+            node_class=PooledNode,
+            connections_per_node=connections_per_node,
+            request_timeout=request_timeout,
+            http_compress=http_compress,
+        )
+        self._new_get_batcher = None
+        if get_batch:
+            self._new_get_batcher = partial(
+                Batcher,
+                load_many=self.mget,
+                delay=get_batch_delay,
+                max_batch=get_batch_size,
+            )
         return super().__init__()
 
     @property
     def client(self):
-        return AsyncElasticsearch(
-            hosts=self.hosts,
-            verify_certs=False,
-        )
+        """Return the shared Elasticsearch client."""
+        return self._client
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Return usage of the connection pool of every node."""
+        return [
+            {
+                "node": str(node.base_url),
+                "connections": node.config.connections_per_node,
+                "in_flight": node.in_flight,
+                "requests": node.requests,
+            }
+            for node in self.client.transport.node_pool.all()
+        ]
 
     async def exist(self):
         return
 
+    def start_batching(self):
+        """Send concurrent gets of the current request as one mget."""
+        if self._new_get_batcher is not None:
+            _get_batcher.set(self._new_get_batcher())
+
     def batch(
         self,
         items: Iterator[Any],
@@ -46,45 +145,169 @@ class Search(AbstractSearch):
 
         return iter(())
 
-    @retry(retry_policy)
     async def get(
         self,
         index: str,
         id: str | None = None,
     ):
-        """Return index data by a query from Elasticsearch."""
-        try:
-            if not id:
-                return None
+        """Return index data by a query from Elasticsearch.
+
+        Concurrent calls of a request are sent as one mget if batching
+        is started, see start_batching.
+        """
+        if not id:
+            return None
+
+        batcher = _get_batcher.get()
+        # Пачка могла быть начата другим экземпляром Search
+        if batcher is not None and batcher.load_many == self.mget:
+            return await batcher.load(index, id)
+        return await self._get(index, id)
 
+    @retry(retry_policy)
+    @within_deadline
+    async def _get(self, index: str, doc_id: str):
+        try:
             doc = await self.client.get(
                 index=index,
-                id=id,
+                id=doc_id,
             )
-            return doc.body["_source"]
         except NotFoundError:
             return None
+        return doc.body["_source"]
+
+    @retry(retry_policy)
+    @within_deadline
+    async def mget(
+        self,
+        index: str,
+        ids: list[str],
+    ) -> list[Any]:
+        """Return documents by ids in one request, None if not found."""
+        if not ids:
+            return []
+
+        response = await self.client.mget(index=index, ids=ids)
+        return [
+            doc["_source"] if doc.get("found") else None
+            for doc in response["docs"]
+        ]
 
     async def scan(
         self,
         index: str | list[str],
         query: AbstractQuery | None = None,
         scroll: str = "5m",
+        size: int | None = None,
+        slices: int | None = None,
+        parse: Callable[[dict[str, Any]], Any] | None = None,
+    ) -> AsyncIterator[Any]:
+        es_query = query.get_query() if query else {}
+        size = size or self.scan_size
+        slices = slices or self.scan_slices
+        if slices > 1:
+            hits = self._scan_slices(index, es_query, scroll, size, slices)
+        else:
+            hits = self._scan(index, es_query, scroll, size)
+        return _parse_hits(hits, parse)
+
+    async def _scan(
+        self,
+        index: str | list[str],
+        query: dict[str, Any],
+        scroll: str,
+        size: int,
+    ) -> AsyncIterator[Any]:
+        """Stream hits of one scroll, clearing it when closed.
+
+        Yields:
+            Hits of the scroll.
+        """
+        async with aclosing(
+            async_scan(
+                client=self.client,
+                index=index,
+                query=query or None,
+                scroll=scroll,
+                size=size,
+                clear_scroll=True,
+            ),
+        ) as hits:
+            async for hit in hits:
+                yield hit
+
+    async def _scan_slices(
+        self,
+        index: str | list[str],
+        query: dict[str, Any],
+        scroll: str,
+        size: int,
+        slices: int,
+    ) -> AsyncIterator[Any]:
+        # Срезы складывают хиты в ограниченную очередь, так медленный
+        # потребитель придерживает scroll, а не накапливает все хиты.
+        # Закрытие итератора отменяет срезы, они очищают свои scroll.
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=size)
+        tasks = [
+            asyncio.create_task(
+                self._read_slice(
+                    queue,
+                    index,
+                    {**query, "slice": {"id": slice_id, "max": slices}},
+                    scroll,
+                    size,
+                ),
+            )
+            for slice_id in range(slices)
+        ]
+        async with AsyncExitStack() as stack:
+            stack.push_async_callback(cancel_tasks, tasks)
+            running = slices
+            while running:
+                hit = await queue.get()
+                if hit is _SLICE_DONE:
+                    running -= 1
+                elif isinstance(hit, Exception):
+                    raise hit
+                else:
+                    yield hit
+
+    async def _read_slice(
+        self,
+        queue: asyncio.Queue[Any],
+        index: str | list[str],
+        query: dict[str, Any],
+        scroll: str,
+        size: int,
     ):
-        _query = None
-        if query:
-            _query = query.get_query()
-        return async_scan(
-            client=self.client,
-            index=index,
-            query=_query,
-            scroll=scroll,
-        )
+        """Put hits of a scroll slice into a queue, then a done marker.
+
+        A failed slice puts its error instead of the marker.
+        """
+        try:
+            await self._put_hits(queue, index, query, scroll, size)
+        except Exception as error:
+            await queue.put(error)
+        else:
+            await queue.put(_SLICE_DONE)
+
+    async def _put_hits(
+        self,
+        queue: asyncio.Queue[Any],
+        index: str | list[str],
+        query: dict[str, Any],
+        scroll: str,
+        size: int,
+    ):
+        async with aclosing(self._scan(index, query, scroll, size)) as hits:
+            async for hit in hits:
+                await queue.put(hit)
 
     @retry(retry_policy)
+    @within_deadline
     async def search(
         self,
-        index: str | list[str],
+        index: str | list[str] | None,
         query: AbstractQuery | None = None,
         size: int | None = None,
         from_: int | None = 0,
@@ -93,14 +316,43 @@ class Search(AbstractSearch):
         if query:
             _query = query.get_query()
 
-        return await self.client.search(
+        try:
+            return await self.client.search(
+                index=index,
+                body=_query,  # type: ignore
+                size=size,
+                from_=from_,
+            )
+        except NotFoundError as error:
+            if _query and "pit" in _query:
+                raise SearchContextMissing(str(error)) from error
+            raise
+        except BadRequestError as error:
+            raise InvalidSearchQuery(str(error)) from error
+
+    @retry(retry_policy)
+    @within_deadline
+    async def open_point_in_time(
+        self,
+        index: str | list[str],
+        keep_alive: str,
+    ) -> str:
+        """Open a point in time of an index and return its id."""
+        response = await self.client.open_point_in_time(
             index=index,
-            body=_query,  # type: ignore
-            size=size,
-            from_=from_,
+            keep_alive=keep_alive,
         )
+        return response["id"]
+
+    async def close_point_in_time(self, pit_id: str):
+        """Close a point in time, it is fine if it has already expired."""
+        try:
+            await self.client.close_point_in_time(id=pit_id)
+        except NotFoundError:
+            return
 
     @retry(retry_policy)
+    @within_deadline
     async def scroll(
         self,
         scroll_id: str,
@@ -112,6 +364,7 @@ class Search(AbstractSearch):
         )
 
     @retry(retry_policy)
+    @within_deadline
     async def save_mapping(
         self,
         mapping: dict[str, Any],
@@ -126,4 +379,4 @@ class Search(AbstractSearch):
         raise NotImplementedError
 
     async def close(self):
-        await self.client.transport.close()
+        await self.client.close()
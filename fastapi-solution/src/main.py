@@ -1,18 +1,37 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
 
-
+from api import metrics
+from api.http_cache import HTTPCacheMiddleware
 from api.v1.films import routes as films_v1
+from api.v1.films import service as films_service
 from api.v1.genres import routes as genres_v1
+from api.v1.genres import service as genres_service
 from api.v1.persons import routes as persons_v1
-from core.config import es_conf, fast_api_conf, redis_conf
+from api.v1.persons import service as persons_service
+from api.v1.warmup import warm_up_cache_until
+from core.config import (
+    es_conf,
+    fast_api_conf,
+    http_cache_conf,
+    redis_conf,
+    security_settings,
+    warmup_conf,
+)
+from core.deadline import set_deadline
 from db.cache import dependency as cache_dependency
+from db.cache.breaker import CircuitBreakerCache
+from db.cache.local import LocalCache
 from db.cache.redis import RedisCache
+from db.cache.writer import WriteBehindCache
 from db.search import dependency as search_dependency
 from db.search.elastic.search import Search
+from security import dependency as auth_dependency
+from security.claims import ClaimsCache, get_decoder
+from security.refresh import TokenRefresher
 
 app = FastAPI(
-    title=fast_api_conf.PROJECT_NAME,
+    title=fast_api_conf.project_name,
     docs_url="/api/openapi",
     openapi_url="/api/openapi.json",
     default_response_class=ORJSONResponse,
@@ -23,17 +42,95 @@ app = FastAPI(
 async def startup():
     """Start dependency."""
     cache_dependency.cache = RedisCache(
-        host=redis_conf.REDIS_HOST,
-        port=redis_conf.REDIS_PORT,
+        host=redis_conf.redis_host,
+        port=redis_conf.redis_port,
+        key_layout=redis_conf.redis_key_layout,
+        key_prefix=redis_conf.redis_key_prefix,
+        namespace_expire=redis_conf.redis_namespace_expire,
+        read_legacy_hash=redis_conf.redis_read_legacy_hash,
+        namespace_soft_expire=redis_conf.redis_namespace_soft_expire,
+        early_refresh_beta=redis_conf.redis_early_refresh_beta,
+        recompute_time=redis_conf.redis_recompute_time,
+        compression=redis_conf.redis_compression,
+        namespace_compression=redis_conf.redis_namespace_compression,
+        compress_threshold=redis_conf.redis_compress_threshold,
+        socket_timeout=redis_conf.redis_socket_timeout,
+        socket_connect_timeout=redis_conf.redis_socket_connect_timeout,
     )
+    if redis_conf.redis_breaker_enabled:
+        cache_dependency.cache = CircuitBreakerCache(
+            cache=cache_dependency.cache,
+            failure_threshold=redis_conf.redis_breaker_failure_threshold,
+            reset_timeout=redis_conf.redis_breaker_reset_timeout,
+            call_timeout=redis_conf.redis_call_timeout,
+            slow_call=redis_conf.redis_slow_call,
+        )
+    if redis_conf.redis_writer_enabled:
+        cache_dependency.cache = WriteBehindCache(
+            cache=cache_dependency.cache,
+            queue_size=redis_conf.redis_writer_queue_size,
+            workers=redis_conf.redis_writer_workers,
+            put_timeout=redis_conf.redis_writer_put_timeout,
+        )
+        cache_dependency.cache.start()
+    if redis_conf.local_cache_enabled:
+        cache_dependency.cache = LocalCache(
+            cache=cache_dependency.cache,
+            max_entries=redis_conf.local_cache_max_entries,
+            max_bytes=redis_conf.local_cache_max_bytes,
+            expire_time=redis_conf.local_cache_expire,
+            loaders={
+                **films_service.CACHE_LOADERS,
+                **genres_service.CACHE_LOADERS,
+                **persons_service.CACHE_LOADERS,
+            },
+        )
     search_dependency.db = Search(
         hosts=[
             "http://{host}:{port}".format(
-                host=es_conf.ELASTIC_HOST,
-                port=es_conf.ELASTIC_PORT,
+                host=es_conf.elastic_host,
+                port=es_conf.elastic_port,
             ),
         ],
+        connections_per_node=es_conf.elastic_connections_per_node,
+        request_timeout=es_conf.elastic_request_timeout,
+        http_compress=es_conf.elastic_http_compress,
+        get_batch=es_conf.elastic_get_batch_enabled,
+        get_batch_delay=es_conf.elastic_get_batch_delay,
+        get_batch_size=es_conf.elastic_get_batch_size,
+        scan_size=es_conf.elastic_scan_size,
+        scan_slices=es_conf.elastic_scan_slices,
+    )
+    auth_dependency.refresher = TokenRefresher(
+        url=security_settings.auth_service_refresh_token_url,
+        timeout=security_settings.auth_service_timeout,
+        max_connections=security_settings.auth_service_max_connections,
+        failure_threshold=security_settings.auth_service_failure_threshold,
+        reset_timeout=security_settings.auth_service_reset_timeout,
     )
+    if security_settings.claims_cache_enabled:
+        auth_dependency.claims_cache = ClaimsCache(
+            decode=get_decoder(security_settings.jwt_backend),
+            max_entries=security_settings.claims_cache_max_entries,
+        )
+    # Воркер начинает принимать запросы только после прогрева
+    if warmup_conf.warmup_enabled:
+        await warm_up_cache_until(
+            timeout=warmup_conf.warmup_timeout,
+            cache=cache_dependency.cache,
+            search=search_dependency.db,
+            films_pages=warmup_conf.warmup_films_pages,
+            films_sorts=warmup_conf.warmup_films_sorts,
+            top_films=warmup_conf.warmup_top_films,
+            concurrency=warmup_conf.warmup_concurrency,
+        )
+
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """Set the time budget of a request, retries stop when it is spent."""
+    set_deadline(fast_api_conf.request_timeout)
+    return await call_next(request)
 
 
 @app.on_event("shutdown")
@@ -45,6 +142,9 @@ async def shutdown():
     if search_dependency.db:
         await search_dependency.db.close()
 
+    if auth_dependency.refresher:
+        await auth_dependency.refresher.close()
+
 
 # Теги указываем для удобства навигации по документации
 app.include_router(
@@ -62,3 +162,18 @@ app.include_router(
     prefix="/api/v1/persons",
     tags=["persons"],
 )
+app.include_router(
+    metrics.router,
+    prefix="/api",
+    tags=["metrics"],
+)
+
+if http_cache_conf.http_cache_enabled:
+    app.add_middleware(
+        HTTPCacheMiddleware,
+        routes=app.routes,
+        max_age=http_cache_conf.http_cache_max_age,
+        path_prefix=http_cache_conf.http_cache_path_prefix,
+        include_routes=http_cache_conf.http_cache_include_routes,
+        exclude_routes=http_cache_conf.http_cache_exclude_routes,
+    )
@@ -1,3 +1,3 @@
 from models.film import Film
-from models.person import Person
 from models.genre import Genre
+from models.person import Person, PersonFilm
@@ -1,6 +1,7 @@
+from pydantic import BaseModel
+
 from models.common import ConfigOrjsonMixin, UUIDMixin
 from models.person import Person
-from pydantic import BaseModel
 
 
 class Film(UUIDMixin, BaseModel):
@@ -1,6 +1,7 @@
-from models.common import ConfigOrjsonMixin, IdMixin
 from pydantic import BaseModel
 
+from models.common import ConfigOrjsonMixin, IdMixin
+
 
 class Genre(IdMixin, BaseModel):
     """Genre model class.
@@ -1,6 +1,7 @@
-from models.common import ConfigOrjsonMixin, IdMixin
 from pydantic import BaseModel
 
+from models.common import ConfigOrjsonMixin, IdMixin
+
 
 class Person(IdMixin, BaseModel):
     """Person model class.
@@ -13,3 +14,20 @@ class Person(IdMixin, BaseModel):
 
     class Config(ConfigOrjsonMixin):
         """Configuration for orjson."""
+
+
+class PersonFilm(IdMixin, BaseModel):
+    """Film of a person filmography.
+
+    Attributes:
+        title (str): Title of the film.
+        imdb_rating (float | None): Rating of the film on IMDB.
+        roles (list[str]): Roles of the person in the film.
+    """
+
+    title: str
+    imdb_rating: float | None
+    roles: list[str] = []
+
+    class Config(ConfigOrjsonMixin):
+        """Configuration for orjson."""
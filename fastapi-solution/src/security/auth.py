@@ -1,13 +1,16 @@
 from typing import Annotated, Any
 
-import requests
 from fastapi import Depends, HTTPException, Response, status
 from jose import ExpiredSignatureError, JWTError, jwt
 
 from core.config import security_settings
 from core.logger import get_logger
+from security import dependency as auth_dependency
 from security.bearers import OAuth2PasswordCookiesBearer
+from security.claims import ClaimsCache
+from security.dependency import get_claims_cache, get_refresher
 from security.models import UserToken
+from security.refresh import TokenRefresher
 
 logger = get_logger(__name__)
 
@@ -26,12 +29,37 @@ class Auth():
     def __init__(
         self,
         response: Response,
-        token: Annotated[dict[str, str], Depends(oauth2_scheme)],
+        token: dict[str, str],
+        refresher: TokenRefresher | None = None,
+        claims_cache: ClaimsCache | None = None,
     ) -> None:
         self.access_token = token.get("access_token")
         self.refresh_token = token.get("refresh_token")
         self.response = response
-        self._decode_token()
+        self.refresher = refresher
+        self.claims_cache = claims_cache
+
+    async def authenticate(self) -> dict[str, Any]:
+        """Validate the access token, refreshing it if it has expired.
+
+        Returns:
+            dict[str, Any]: jwt token dict representation.
+
+        Raises:
+            HTTPException - if token expired and can't be refreshed or invalid
+        """
+        try:
+            return self.decode_token()
+        except ExpiredSignatureError:
+            if not await self._refresh_token():
+                self._raise_expired_exception()
+        except JWTError:
+            self._raise_credential_exception()
+
+        try:
+            return self.decode_token()
+        except JWTError:
+            self._raise_credential_exception()
 
     def get_user_claims(self) -> UserToken:
         """Return user claims from token.
@@ -42,45 +70,38 @@ class Auth():
         logger.warning("The method get_user_from_token not implemented yet.")
         return UserToken()
 
-    def _decode_token(self) -> dict[str, Any]:
-        """Verifies a JWT string's signature and validates reserved claims.
+    def decode_token(self) -> dict[str, Any]:
+        """Verify a JWT string's signature and validate reserved claims.
+
+        Claims of an already verified token are taken from claims cache.
+        Errors of an invalid or expired token are raised as JWTError.
 
         Returns:
             dict[str, Any]: jwt token dict representation.
-
-        Raises:
-            ExpiredSignatureError - if token expired
-            JWTError - if token invalid
         """
-        try:
-            decoded_token = jwt.decode(
+        if self.claims_cache:
+            return self.claims_cache.get(
                 token=self.access_token,
                 key=security_settings.secret_key,
                 algorithms=[security_settings.algorithm],
             )
-        except ExpiredSignatureError:
-            status = self._refresh_token()
-            if not status:
-                self._raise_expired_exception()
-            decoded_token = self._decode_token()
-        except JWTError:
-            self._raise_credential_exception()
-
-        return decoded_token
+        return jwt.decode(
+            token=self.access_token,
+            key=security_settings.secret_key,
+            algorithms=[security_settings.algorithm],
+        )
 
-    def _refresh_token(self) -> bool:
+    async def _refresh_token(self) -> bool:
         """Request new access & refresh tokens using the provided refresh token, if any.
 
         Returns:
             bool: whether the refreshing of the token was successful or not
         """
-        response = requests.post(
-            url=security_settings.auth_service_refresh_token_url,
-            json=self.refresh_token,
-        )
-        if response.ok:
-            tokens = response.json()
+        if not self.refresher:
+            return False
 
+        tokens = await self.refresher.refresh(self.refresh_token)
+        if tokens:
             self.response.set_cookie(
                 key="access_token",
                 value="Bearer {0}".format(tokens.get("access_token")),
@@ -93,7 +114,7 @@ class Auth():
             )
             self.access_token = tokens.get('access_token')
 
-        return response.ok
+        return bool(tokens)
 
     def _raise_expired_exception(self):
         raise HTTPException(
@@ -108,3 +129,37 @@ class Auth():
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+def is_token_valid(access_token: str | None) -> bool:
+    """Check an access token without refreshing it."""
+    if not access_token:
+        return False
+
+    auth = Auth(
+        response=Response(),
+        token={"access_token": access_token},
+        claims_cache=auth_dependency.claims_cache,
+    )
+    try:
+        auth.decode_token()
+    except JWTError:
+        return False
+    return True
+
+
+async def get_auth(
+    response: Response,
+    token: Annotated[dict[str, str], Depends(oauth2_scheme)],
+    refresher: TokenRefresher | None = Depends(get_refresher),
+    claims_cache: ClaimsCache | None = Depends(get_claims_cache),
+) -> Auth:
+    """Authenticate the user of a request as dependency in api route."""
+    auth = Auth(
+        response=response,
+        token=token,
+        refresher=refresher,
+        claims_cache=claims_cache,
+    )
+    await auth.authenticate()
+    return auth
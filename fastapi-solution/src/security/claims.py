@@ -0,0 +1,133 @@
+"""Verified JWT claims and the cache of them."""
+from collections import OrderedDict
+from hashlib import sha256
+from time import time
+from typing import Any, Callable, Literal, NamedTuple
+
+from jose import ExpiredSignatureError, JWTError, jwt
+
+from core.imports import import_optional
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+pyjwt = import_optional("jwt")
+
+JWTBackend = Literal["jose", "pyjwt"]
+
+
+def _decode_with_jose(
+    token: str,
+    key: str,
+    algorithms: list[str],
+) -> dict[str, Any]:
+    return jwt.decode(token=token, key=key, algorithms=algorithms)
+
+
+def _decode_with_pyjwt(
+    token: str,
+    key: str,
+    algorithms: list[str],
+) -> dict[str, Any]:
+    # Ошибки PyJWT приводятся к ошибкам jose, которые ожидает Auth
+    try:
+        return pyjwt.decode(token, key=key, algorithms=algorithms)
+    except pyjwt.ExpiredSignatureError as error:
+        raise ExpiredSignatureError(str(error)) from error
+    except pyjwt.InvalidTokenError as error:
+        raise JWTError(str(error)) from error
+
+
+def get_decoder(
+    backend: JWTBackend = "jose",
+) -> Callable[[str, str, list[str]], dict[str, Any]]:
+    """Return the function that verifies and decodes a JWT.
+
+    PyJWT is not a required dependency, if it is configured but missing,
+    python-jose is used.
+    """
+    if backend == "pyjwt":
+        if pyjwt is not None:
+            return _decode_with_pyjwt
+        logger.warning("PyJWT is not installed, use python-jose")
+    return _decode_with_jose
+
+
+class _Entry(NamedTuple):
+    """Claims kept in the cache."""
+
+    claims: dict[str, Any]
+    expire_at: float
+
+
+class ClaimsCache:
+    """Bounded in-process cache of verified token claims.
+
+    A token is verified once, afterwards its claims are returned until
+    the token expires. Entries are keyed by the token digest, so tokens
+    themselves are not kept in memory. Tokens without `exp` claim are
+    not cached.
+
+    Args:
+        decode: verifies and decodes a token, see get_decoder.
+        max_entries: the maximum number of cached tokens.
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[str, str, list[str]], dict[str, Any]],
+        max_entries: int = 10000,
+    ) -> None:
+        self.decode = decode
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return occupancy and hit statistics."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def get(
+        self,
+        token: str,
+        key: str,
+        algorithms: list[str],
+    ) -> dict[str, Any]:
+        """Return the claims of a token, verifying it if not cached.
+
+        Raises:
+            JWTError: if the token is not a string, errors of an invalid
+                or expired token are raised by decode.
+        """
+        if not isinstance(token, str):
+            raise JWTError("Token must be a string")
+
+        digest = sha256(token.encode()).hexdigest()
+        entry = self._entries.get(digest)
+        if entry is not None:
+            if entry.expire_at > time():
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry.claims
+            self._entries.pop(digest)
+
+        self.misses += 1
+        claims = self.decode(token, key, algorithms)
+        expire_at = claims.get("exp")
+        if isinstance(expire_at, (int, float)):
+            self._store(digest, _Entry(claims=claims, expire_at=expire_at))
+        return claims
+
+    def _store(self, digest: str, entry: _Entry):
+        self._entries[digest] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
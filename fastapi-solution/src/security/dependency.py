@@ -0,0 +1,15 @@
+from security.claims import ClaimsCache
+from security.refresh import TokenRefresher
+
+refresher: TokenRefresher | None = None
+claims_cache: ClaimsCache | None = None
+
+
+async def get_refresher() -> TokenRefresher | None:
+    """For create one HTTP client in app as dependency."""
+    return refresher
+
+
+async def get_claims_cache() -> ClaimsCache | None:
+    """For share verified token claims in app as dependency."""
+    return claims_cache
@@ -0,0 +1,144 @@
+from hashlib import sha256
+from typing import Any
+
+import httpx
+
+from core.circuit_breaker import CircuitBreaker
+from core.logger import get_logger
+from db.cache.single_flight import SingleFlight
+
+logger = get_logger(__name__)
+
+JSON_CONTENT_TYPE = "application/json"
+
+
+class TokenRefreshError(Exception):
+    """Raised when the auth service answers a refresh with a bad response."""
+
+
+def _read_json(response: httpx.Response) -> Any:
+    """Return the JSON body of a response.
+
+    Raises:
+        TokenRefreshError: if the body is not JSON.
+    """
+    content_type = response.headers.get("content-type", "")
+    if not content_type.startswith(JSON_CONTENT_TYPE):
+        raise TokenRefreshError(
+            "Unexpected content type {0}".format(content_type),
+        )
+
+    try:
+        return response.json()
+    except ValueError as error:
+        raise TokenRefreshError("Response body is not JSON") from error
+
+
+def _parse_tokens(response: httpx.Response) -> dict[str, str]:
+    """Return the tokens of a successful refresh response.
+
+    Raises:
+        TokenRefreshError: if the response is not a successful JSON
+            object with both tokens.
+    """
+    if not response.is_success:
+        raise TokenRefreshError(
+            "Auth service responded with {0}".format(response.status_code),
+        )
+
+    tokens = _read_json(response)
+    if not isinstance(tokens, dict) or not all(
+        isinstance(tokens.get(name), str)
+        for name in ("access_token", "refresh_token")
+    ):
+        raise TokenRefreshError("Response has no tokens")
+    return tokens
+
+
+class TokenRefresher:
+    """Refresh tokens in the auth service without blocking the event loop.
+
+    Uses one pooled HTTP client for all requests. Concurrent refreshes
+    of the same refresh token are sent once, and a circuit breaker stops
+    calling the auth service while it fails.
+
+    Args:
+        url: the refresh endpoint of the auth service.
+        timeout: timeout of a refresh request in seconds.
+        max_connections: size of the connection pool.
+        failure_threshold: failures in a row to stop calling the service.
+        reset_timeout: seconds to wait before calling the service again.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 5,
+        max_connections: int = 10,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ) -> None:
+        self.url = url
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout,
+        )
+        self.single_flight = SingleFlight()
+
+    async def close(self):
+        """Close the HTTP client."""
+        await self.client.aclose()
+
+    async def refresh(self, refresh_token: str | None) -> dict | None:
+        """Request new access & refresh tokens.
+
+        Returns:
+            New tokens or None if the refresh failed.
+        """
+        if not refresh_token:
+            return None
+
+        key = sha256(refresh_token.encode()).hexdigest()
+        try:
+            return await self.single_flight.fetch(
+                key=key,
+                load=lambda: self._request(refresh_token),
+            )
+        except TokenRefreshError as error:
+            logger.warning("Token refresh failed: {0}".format(error))
+            return None
+
+    async def _request(self, refresh_token: str) -> dict | None:
+        if not self.circuit_breaker.allow():
+            logger.warning("Auth service is unavailable, skip token refresh")
+            return None
+
+        try:
+            response = await self.client.post(
+                url=self.url,
+                json=refresh_token,
+            )
+        except httpx.HTTPError as error:
+            self.circuit_breaker.record_failure()
+            raise TokenRefreshError(repr(error)) from error
+
+        # Отказ в обновлении токена не является сбоем сервиса авторизации
+        if response.is_client_error:
+            self.circuit_breaker.record_success()
+            return None
+
+        try:
+            tokens = _parse_tokens(response)
+        except TokenRefreshError:
+            self.circuit_breaker.record_failure()
+            raise
+
+        self.circuit_breaker.record_success()
+        return tokens
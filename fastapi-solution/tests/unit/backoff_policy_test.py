@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime
+from time import monotonic
+
+import pytest
+from aioretry import RetryInfo, retry
+
+from core.deadline import set_deadline
+from db.backoff_policy import (
+    NonRetryableError,
+    RetryBudget,
+    RetryPolicy,
+    is_retryable,
+    within_deadline,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+def failure(exception: Exception, fails: int = 1) -> RetryInfo:
+    return RetryInfo(fails=fails, exception=exception, since=datetime.now())
+
+
+@pytest.mark.parametrize(
+    "exception, expected",
+    [
+        (ConnectionError(), True),
+        (asyncio.TimeoutError(), True),
+        (NonRetryableError(), False),
+        (ValueError(), False),
+    ],
+)
+async def test_is_retryable(exception, expected):
+    assert is_retryable(exception) is expected
+
+
+async def test_budget_limits_retries():
+    budget = RetryBudget(rate=0, burst=2)
+
+    assert [budget.acquire() for _ in range(3)] == [True, True, False]
+    assert budget.exhausted == 1
+
+
+async def test_policy_retries_with_jittered_delay():
+    set_deadline(None)
+    policy = RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=1)
+
+    abandon, delay = policy(failure(ConnectionError(), fails=2))
+
+    assert abandon is False
+    assert 0 <= delay <= 0.2
+
+
+async def test_policy_gives_up():
+    set_deadline(None)
+    policy = RetryPolicy(max_attempts=3, budget=RetryBudget(rate=0, burst=0))
+
+    assert policy(failure(ValueError()))[0] is True
+    assert policy(failure(ConnectionError(), fails=3))[0] is True
+    assert policy(failure(ConnectionError()))[0] is True
+
+
+async def test_policy_gives_up_at_deadline():
+    set_deadline(0)
+    policy = RetryPolicy(max_attempts=3)
+
+    assert policy(failure(ConnectionError()))[0] is True
+
+
+async def test_attempt_is_bounded_by_deadline():
+    calls = 0
+
+    @retry(RetryPolicy(max_attempts=3))
+    @within_deadline
+    async def hung_call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(10)
+
+    set_deadline(0.05)
+    started_at = monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await hung_call()
+
+    assert monotonic() - started_at < 1
+    assert calls == 1
+
+
+async def test_call_without_deadline_is_not_bounded():
+    @within_deadline
+    async def call():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    set_deadline(None)
+
+    assert await call() == "done"
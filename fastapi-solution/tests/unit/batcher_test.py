@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from db.search.batcher import Batcher
+
+pytestmark = pytest.mark.asyncio
+
+
+class Loader:
+    """load_many, which records batches and may fail."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.batches: list[tuple[str, list[str]]] = []
+        self.error = error
+
+    async def load_many(self, group: str, keys: list[str]) -> list[str]:
+        self.batches.append((group, keys))
+        if self.error:
+            raise self.error
+        return [f"{group}/{key}" for key in keys]
+
+
+async def test_concurrent_loads_are_sent_as_one_batch():
+    loader = Loader()
+    batcher = Batcher(loader.load_many)
+
+    values = await asyncio.gather(
+        batcher.load("movies", "1"),
+        batcher.load("movies", "2"),
+        batcher.load("persons", "1"),
+    )
+
+    assert values == ["movies/1", "movies/2", "persons/1"]
+    assert loader.batches == [("movies", ["1", "2"]), ("persons", ["1"])]
+
+
+async def test_loads_of_a_key_share_one_result():
+    loader = Loader()
+    batcher = Batcher(loader.load_many)
+
+    values = await asyncio.gather(
+        batcher.load("movies", "1"),
+        batcher.load("movies", "1"),
+    )
+
+    assert values == ["movies/1", "movies/1"]
+    assert loader.batches == [("movies", ["1"])]
+
+
+async def test_full_batch_is_sent_without_delay():
+    loader = Loader()
+    batcher = Batcher(loader.load_many, delay=10, max_batch=2)
+
+    values = await asyncio.wait_for(
+        asyncio.gather(
+            batcher.load("movies", "1"),
+            batcher.load("movies", "2"),
+        ),
+        1,
+    )
+
+    assert values == ["movies/1", "movies/2"]
+
+
+async def test_later_loads_go_to_the_next_batch():
+    loader = Loader()
+    batcher = Batcher(loader.load_many)
+
+    await batcher.load("movies", "1")
+    await batcher.load("movies", "2")
+
+    assert loader.batches == [("movies", ["1"]), ("movies", ["2"])]
+
+
+async def test_batch_error_is_raised_to_all_loads():
+    loader = Loader(error=ConnectionError("search is down"))
+    batcher = Batcher(loader.load_many)
+
+    results = await asyncio.gather(
+        batcher.load("movies", "1"),
+        batcher.load("movies", "2"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+async def test_cancelled_load_does_not_cancel_batch():
+    loader = Loader()
+    batcher = Batcher(loader.load_many)
+
+    first = asyncio.create_task(batcher.load("movies", "1"))
+    second = asyncio.create_task(batcher.load("movies", "2"))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "movies/2"
+    assert loader.batches == [("movies", ["1", "2"])]
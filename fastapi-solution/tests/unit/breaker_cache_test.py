@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from db.cache.breaker import CircuitBreakerCache
+from db.cache.breaker.breaker import NO_LOCK
+from tests.unit.fakes import FakeCache
+
+pytestmark = pytest.mark.asyncio
+
+
+class BrokenCache(FakeCache):
+    """Cache, which fails or stalls while it is broken."""
+
+    def __init__(self, delay: float = 0) -> None:
+        super().__init__()
+        self.broken = True
+        self.delay = delay
+
+    async def get(self, *args, **kwargs):
+        self.calls.append("get")
+        await asyncio.sleep(self.delay)
+        if self.broken and not self.delay:
+            raise ConnectionError("cache is down")
+        return "value"
+
+    async def mget(self, name, keys):
+        self.calls.append("mget")
+        raise ConnectionError("cache is down")
+
+    async def set(self, *args, **kwargs):
+        self.calls.append("set")
+        raise ConnectionError("cache is down")
+
+    async def acquire_lock(self, name, expire_time):
+        self.calls.append("acquire_lock")
+        raise ConnectionError("cache is down")
+
+    async def release_lock(self, name, token):
+        self.calls.append("release_lock")
+
+
+async def test_cache_errors_are_misses():
+    cache = CircuitBreakerCache(BrokenCache(), failure_threshold=5)
+
+    assert await cache.get(name="film", key="1") is None
+    assert await cache.mget(name="film", keys=["1", "2"]) == [None, None]
+    await cache.set(name="film", key="1", key_value={})
+    assert cache.stats()["failures"] == 3
+
+
+async def test_open_circuit_skips_cache_calls():
+    broken = BrokenCache()
+    cache = CircuitBreakerCache(broken, failure_threshold=1)
+    await cache.get(name="film", key="1")
+    broken.calls.clear()
+
+    assert await cache.get(name="film", key="1") is None
+    assert await cache.mget(name="film", keys=["1"]) == [None]
+    await cache.set(name="film", key="1", key_value={})
+
+    assert broken.calls == []
+    assert cache.stats() == {
+        "state": "open",
+        "failures": 1,
+        "opened": 1,
+        "short_circuited": 3,
+    }
+
+
+async def test_lock_is_skipped_while_cache_is_unavailable():
+    broken = BrokenCache()
+    cache = CircuitBreakerCache(broken, failure_threshold=1)
+
+    token = await cache.acquire_lock(name="film:1", expire_time=1)
+    await cache.release_lock(name="film:1", token=token)
+
+    # Без блокировки вызывающий пересчитывает запись сам, не дожидаясь
+    assert token == NO_LOCK
+    assert broken.calls == ["acquire_lock"]
+
+
+async def test_slow_calls_are_failures():
+    cache = CircuitBreakerCache(
+        BrokenCache(delay=0.02),
+        failure_threshold=2,
+        slow_call=0.01,
+    )
+
+    assert await cache.get(name="film", key="1") == "value"
+    assert await cache.get(name="film", key="1") == "value"
+    assert cache.stats()["state"] == "open"
+
+
+async def test_stalled_call_is_a_miss():
+    cache = CircuitBreakerCache(
+        BrokenCache(delay=1),
+        call_timeout=0.01,
+    )
+
+    assert await cache.get(name="film", key="1") is None
+    assert cache.stats()["failures"] == 1
+
+
+async def test_recovered_cache_closes_circuit():
+    broken = BrokenCache()
+    cache = CircuitBreakerCache(broken, failure_threshold=1, reset_timeout=0)
+    await cache.get(name="film", key="1")
+
+    broken.broken = False
+
+    assert await cache.get(name="film", key="1") == "value"
+    assert cache.stats()["state"] == "closed"
@@ -0,0 +1,51 @@
+import pytest
+
+from db.cache.helpers import (
+    CACHE_KEY_VERSION,
+    load_model,
+    load_models,
+    prepare_key_by_args,
+)
+from models.person import Person
+
+
+def test_equivalent_args_give_the_same_key():
+    key = prepare_key_by_args(
+        page_size=50,
+        filter_field={"genre": ["Action", "Comedy"]},
+        fields=["id", "title"],
+        search_query=None,
+    )
+
+    assert key == prepare_key_by_args(
+        fields=["title", "id"],
+        filter_field={"genre": ["Comedy", "Action"]},
+        page_size=50,
+    )
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        {"page_size": 51},
+        {"page_size": 50, "page_number": 2},
+        {"page_size": 50, "filter_field": {"genre": ["Action"]}},
+    ],
+)
+def test_different_args_give_different_keys(args):
+    assert prepare_key_by_args(**args) != prepare_key_by_args(page_size=50)
+
+
+def test_key_is_compact_and_versioned():
+    key = prepare_key_by_args(search_query="spam " * 100)
+
+    assert key.startswith(f"{CACHE_KEY_VERSION}:")
+    assert len(key) == len(CACHE_KEY_VERSION) + 1 + 32
+    assert "spam" not in key
+
+
+def test_cached_models_are_parsed_only_if_needed():
+    person = Person(id="7a44ea5e-a6ed-4d4b-9c8c-a3e4c4a6b0c1", name="Ann")
+
+    assert load_model(Person, person) is person
+    assert load_models(Person, [person.dict()]) == [person]
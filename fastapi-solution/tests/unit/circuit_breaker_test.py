@@ -0,0 +1,71 @@
+import pytest
+
+from core.circuit_breaker import CircuitBreaker, CircuitState
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr("core.circuit_breaker.monotonic", clock)
+    return clock
+
+
+def test_circuit_opens_after_failures_in_a_row(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state is CircuitState.open
+    assert not breaker.allow()
+    assert breaker.stats() == {"state": "open", "failures": 2, "opened": 1}
+
+
+def test_one_probe_is_let_through_after_reset_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.state is CircuitState.half_open
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state is CircuitState.closed
+    assert breaker.allow()
+
+
+def test_failed_probe_opens_circuit_again(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state is CircuitState.open
+    assert breaker.opened_count == 2
+    clock.now += 9
+    assert not breaker.allow()
+
+
+def test_cancelled_probe_lets_another_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+
+    breaker.record_cancel()
+
+    assert breaker.allow()
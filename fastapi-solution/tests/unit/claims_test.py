@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+import pytest
+from jose import ExpiredSignatureError, JWTError, jwt
+
+from core.config import security_settings
+from security.claims import ClaimsCache, get_decoder
+
+KEY = security_settings.secret_key
+ALGORITHMS = [security_settings.algorithm]
+
+
+class CountingDecoder:
+    def __init__(self) -> None:
+        self.decode = get_decoder("jose")
+        self.calls = 0
+
+    def __call__(self, token, key, algorithms):
+        self.calls += 1
+        return self.decode(token, key, algorithms)
+
+
+def test_token_is_verified_once(make_access_token):
+    decoder = CountingDecoder()
+    cache = ClaimsCache(decode=decoder)
+    token = make_access_token()
+
+    first = cache.get(token, KEY, ALGORITHMS)
+    second = cache.get(token, KEY, ALGORITHMS)
+
+    assert first == second
+    assert first["sub"] == "user"
+    assert decoder.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_token_is_not_served_from_cache(make_access_token):
+    cache = ClaimsCache(decode=get_decoder())
+    token = make_access_token(expires_in=timedelta(minutes=-1))
+
+    with pytest.raises(ExpiredSignatureError):
+        cache.get(token, KEY, ALGORITHMS)
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalid_token_is_not_cached(make_access_token):
+    cache = ClaimsCache(decode=get_decoder())
+
+    with pytest.raises(JWTError):
+        cache.get(make_access_token() + "x", KEY, ALGORITHMS)
+    assert cache.stats()["entries"] == 0
+
+
+def test_token_without_expiry_is_not_cached():
+    cache = ClaimsCache(decode=get_decoder())
+    token = jwt.encode({"sub": "user"}, KEY, algorithm=ALGORITHMS[0])
+
+    assert cache.get(token, KEY, ALGORITHMS) == {"sub": "user"}
+    assert cache.stats()["entries"] == 0
+
+
+def test_oldest_token_is_evicted(make_access_token):
+    cache = ClaimsCache(decode=get_decoder(), max_entries=1)
+    cache.get(make_access_token(), KEY, ALGORITHMS)
+    cache.get(make_access_token(timedelta(minutes=10)), KEY, ALGORITHMS)
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_missing_token_is_invalid():
+    cache = ClaimsCache(decode=get_decoder())
+
+    with pytest.raises(JWTError):
+        cache.get(None, KEY, ALGORITHMS)
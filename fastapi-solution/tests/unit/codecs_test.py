@@ -0,0 +1,55 @@
+import orjson
+import pytest
+
+from db.cache import codecs
+from db.cache.codecs import COMPRESSORS, HEADERS, Codec, decode
+
+value = {"title": "Spam " * 100, "imdb_rating": 8.5}
+
+
+def test_small_value_is_plain_json_with_header():
+    data = Codec(compression="zlib", threshold=10_000).encode(value)
+
+    assert data[:1] == HEADERS["none"]
+    assert data[1:] == orjson.dumps(value)
+    assert decode(data) == value
+
+
+def test_value_without_header_is_read_as_json():
+    assert decode(orjson.dumps(value)) == value
+
+
+@pytest.mark.parametrize("compression", ["zlib", "zstd", "lz4"])
+def test_large_value_is_compressed_with_header(compression):
+    if compression not in COMPRESSORS:
+        pytest.skip(f"{compression} is not installed")
+    codec = Codec(compression=compression, threshold=100)
+
+    data = codec.encode(value)
+
+    assert data[:1] == HEADERS[compression]
+    assert len(data) < len(Codec().encode(value))
+    assert decode(data) == value
+
+
+def test_codec_of_missing_library_is_not_created(monkeypatch):
+    monkeypatch.delitem(COMPRESSORS, "zstd", raising=False)
+
+    with pytest.raises(ValueError, match="not installed"):
+        Codec(compression="zstd", threshold=100)
+
+
+def test_value_of_missing_library_is_not_decoded(monkeypatch):
+    data = HEADERS["zstd"] + b"compressed"
+    monkeypatch.delitem(codecs.DECOMPRESSORS, HEADERS["zstd"], raising=False)
+
+    with pytest.raises(ValueError, match="missing library"):
+        decode(data)
+
+
+def test_unsupported_objects_use_default():
+    codec = Codec(default=lambda obj: sorted(obj))
+
+    assert decode(codec.encode({"genre": {"b", "a"}})) == {
+        "genre": ["a", "b"],
+    }
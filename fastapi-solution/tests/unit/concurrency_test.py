@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from core.concurrency import gather_limited
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_results_keep_order():
+    async def value(number, delay):
+        await asyncio.sleep(delay)
+        return number
+
+    results = await gather_limited(value(1, 0.02), value(2, 0), value(3, 0.01))
+
+    assert results == [1, 2, 3]
+
+
+async def test_no_awaitables():
+    assert await gather_limited() == []
+
+
+async def test_limit_bounds_running_awaitables():
+    running = 0
+    max_running = 0
+
+    async def work():
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await gather_limited(*(work() for _ in range(10)), limit=3)
+
+    assert max_running == 3
+
+
+async def test_first_error_cancels_the_rest():
+    cancelled = []
+
+    async def fail():
+        raise ValueError("search is down")
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(ValueError):
+        await asyncio.wait_for(gather_limited(slow(), fail(), slow()), 1)
+
+    assert cancelled == [True, True]
+
+
+async def test_waiting_awaitables_are_closed_on_error():
+    async def fail():
+        raise ValueError("search is down")
+
+    async def never_started():
+        return None
+
+    waiting = never_started()
+    with pytest.raises(ValueError):
+        await gather_limited(fail(), waiting, limit=1)
+
+    # Закрытая корутина не выдаст предупреждение "never awaited"
+    assert waiting.cr_frame is None
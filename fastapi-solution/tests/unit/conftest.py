@@ -0,0 +1,32 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from dotenv import dotenv_values
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(base_dir, "..", "..", "src")
+
+# Настройки приложения читаются при импорте модулей, берём их из примера
+env_sample = os.path.join(base_dir, "..", "..", ".env.sample")
+for name, value in dotenv_values(env_sample).items():
+    os.environ.setdefault(name, value or "")
+sys.path.insert(0, src_dir)
+
+
+@pytest.fixture
+def make_access_token():
+    """Issue access tokens signed like the auth service does."""
+    from jose import jwt
+
+    from core.config import security_settings
+
+    def inner(expires_in: timedelta = timedelta(minutes=5)) -> str:
+        return jwt.encode(
+            {"sub": "user", "exp": datetime.utcnow() + expires_in},
+            security_settings.secret_key,
+            algorithm=security_settings.algorithm,
+        )
+
+    return inner
@@ -0,0 +1,262 @@
+import asyncio
+
+import pytest
+from elastic_transport import (
+    AiohttpHttpNode,
+    ApiResponseMeta,
+    HttpHeaders,
+    NodeConfig,
+    ObjectApiResponse,
+)
+from elasticsearch import BadRequestError
+
+from api.v1.films.queries import QueryFilm
+from core.config import es_conf
+from core.deadline import set_deadline, time_left
+from db.cache import dependency as cache_dependency
+from db.search import dependency as search_dependency
+from db.search.abc.search import InvalidSearchQuery
+from db.search.elastic.search import PooledNode, Search
+from main import shutdown, startup
+from security import dependency as auth_dependency
+
+pytestmark = pytest.mark.asyncio
+
+docs = {"1": {"id": "1", "title": "Spam"}, "2": {"id": "2", "title": "Egg"}}
+
+
+class FakeElasticsearch:
+    """AsyncElasticsearch client, which records the requests."""
+
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, dict]] = []
+        self.deadlines: list[float | None] = []
+
+    async def mget(self, index, ids):
+        self.requests.append(("mget", {"index": index, "ids": ids}))
+        self.deadlines.append(time_left())
+        return {
+            "docs": [
+                {"_id": id, "found": id in docs, "_source": docs.get(id)}
+                for id in ids
+            ],
+        }
+
+    async def get(self, index, id):
+        self.requests.append(("get", {"index": index, "id": id}))
+        return ObjectApiResponse(body={"_source": docs[id]}, meta=None)
+
+    async def search(self, index, body, size, from_):
+        meta = ApiResponseMeta(
+            status=400,
+            http_version="1.1",
+            headers=HttpHeaders(),
+            duration=0,
+            node=NodeConfig("http", "localhost", 9200),
+        )
+        raise BadRequestError("search_after size mismatch", meta, {})
+
+    async def close(self):
+        return None
+
+
+def make_search(**kwargs) -> Search:
+    search = Search(hosts=["http://localhost:9200"], **kwargs)
+    search._client = FakeElasticsearch()
+    return search
+
+
+async def test_concurrent_gets_are_sent_as_one_mget():
+    search = make_search(get_batch=True)
+    search.start_batching()
+
+    found = await asyncio.gather(
+        search.get(index="movies", id="1"),
+        search.get(index="movies", id="2"),
+        search.get(index="movies", id="3"),
+    )
+
+    assert found == [docs["1"], docs["2"], None]
+    assert search.client.requests == [
+        ("mget", {"index": "movies", "ids": ["1", "2", "3"]}),
+    ]
+
+
+async def test_mget_of_nothing_skips_elasticsearch():
+    search = make_search()
+
+    assert await search.mget(index="movies", ids=[]) == []
+    assert search.client.requests == []
+
+
+async def test_gets_are_sent_alone_without_batching():
+    search = make_search(get_batch=True)
+
+    assert await search.get(index="movies", id="1") == docs["1"]
+    assert search.client.requests == [
+        ("get", {"index": "movies", "id": "1"}),
+    ]
+
+
+async def test_requests_do_not_share_batches():
+    search = make_search(get_batch=True)
+
+    async def request(id):
+        search.start_batching()
+        return await search.get(index="movies", id=id)
+
+    found = await asyncio.gather(request("1"), request("2"))
+
+    assert found == [docs["1"], docs["2"]]
+    assert [name for name, _ in search.client.requests] == ["mget", "mget"]
+
+
+async def test_batch_is_loaded_without_caller_deadline():
+    search = make_search(get_batch=True)
+    search.start_batching()
+    set_deadline(5)
+
+    await search.get(index="movies", id="1")
+
+    assert search.client.deadlines == [None]
+
+
+class FakeScan:
+    """async_scan over a number of hits per slice, which records scrolls."""
+
+    def __init__(self, hits: int, error_slice: int = -1) -> None:
+        self.hits = hits
+        self.error_slice = error_slice
+        self.queries: list[dict | None] = []
+        self.cleared: list[int | None] = []
+
+    def __call__(self, client, index, query, scroll, size, clear_scroll):
+        self.queries.append(query)
+        slice_id = (query or {}).get("slice", {}).get("id")
+        return self._scan(slice_id)
+
+    async def _scan(self, slice_id):
+        try:
+            if slice_id == self.error_slice:
+                raise ConnectionError("search is down")
+            for number in range(self.hits):
+                await asyncio.sleep(0)
+                yield {"_source": {"id": f"{slice_id}-{number}"}}
+        finally:
+            self.cleared.append(slice_id)
+
+
+@pytest.fixture
+def fake_scan(monkeypatch):
+    def install(**kwargs) -> FakeScan:
+        scan = FakeScan(**kwargs)
+        monkeypatch.setattr("db.search.elastic.search.async_scan", scan)
+        return scan
+
+    return install
+
+
+async def test_scan_reads_one_scroll(fake_scan):
+    scan = fake_scan(hits=3)
+    search = make_search()
+
+    hits = await search.scan(index="movies", parse=lambda doc: doc["id"])
+
+    assert [hit async for hit in hits] == ["None-0", "None-1", "None-2"]
+    assert scan.queries == [None]
+    assert scan.cleared == [None]
+
+
+async def test_scan_reads_slices_in_parallel(fake_scan):
+    scan = fake_scan(hits=3)
+    search = make_search(scan_slices=2)
+
+    hits = await search.scan(index="movies", parse=lambda doc: doc["id"])
+
+    assert sorted([hit async for hit in hits]) == [
+        "0-0", "0-1", "0-2", "1-0", "1-1", "1-2",
+    ]
+    assert [query["slice"] for query in scan.queries] == [
+        {"id": 0, "max": 2},
+        {"id": 1, "max": 2},
+    ]
+    assert sorted(scan.cleared) == [0, 1]
+
+
+async def test_closed_scan_clears_all_slices(fake_scan):
+    scan = fake_scan(hits=100)
+    search = make_search(scan_slices=3)
+
+    hits = await search.scan(index="movies", size=2)
+    await anext(hits)
+    await hits.aclose()
+
+    assert sorted(scan.cleared) == [0, 1, 2]
+
+
+async def test_slice_error_stops_scan(fake_scan):
+    scan = fake_scan(hits=100, error_slice=1)
+    search = make_search(scan_slices=2)
+
+    hits = await search.scan(index="movies", size=2)
+    with pytest.raises(ConnectionError):
+        async for _ in hits:
+            pass
+
+    assert sorted(scan.cleared) == [0, 1]
+
+
+async def test_client_is_built_from_pool_settings(monkeypatch):
+    monkeypatch.setattr(es_conf, "elastic_host", "elastic")
+    monkeypatch.setattr(es_conf, "elastic_connections_per_node", 3)
+    monkeypatch.setattr(es_conf, "elastic_request_timeout", 2.5)
+    monkeypatch.setattr(es_conf, "elastic_http_compress", True)
+    for module, name in (
+        (search_dependency, "db"),
+        (cache_dependency, "cache"),
+        (auth_dependency, "refresher"),
+        (auth_dependency, "claims_cache"),
+    ):
+        monkeypatch.setattr(module, name, None)
+
+    await startup()
+    client = search_dependency.db.client
+    await shutdown()
+
+    (node,) = client.transport.node_pool.all()
+    assert isinstance(node, PooledNode)
+    assert node.config.host == "elastic"
+    assert node.config.connections_per_node == 3
+    # Таймаут клиент передаёт узлу с каждым запросом
+    assert client._request_timeout == 2.5
+    assert node.config.http_compress
+    assert "connection" not in node.config.headers
+
+
+async def test_pool_stats_count_requests_in_flight(monkeypatch):
+    search = Search(hosts=["http://localhost:9200"], connections_per_node=3)
+    (node,) = search.client.transport.node_pool.all()
+    in_flight = []
+
+    async def perform_request(self, *args, **kwargs):
+        in_flight.append(search.stats()[0]["in_flight"])
+
+    monkeypatch.setattr(AiohttpHttpNode, "perform_request", perform_request)
+    await node.perform_request("GET", "/")
+
+    assert in_flight == [1]
+    assert search.stats() == [
+        {
+            "node": "http://localhost:9200",
+            "connections": 3,
+            "in_flight": 0,
+            "requests": 1,
+        },
+    ]
+
+
+async def test_rejected_query_is_invalid_search_query():
+    search = make_search()
+
+    with pytest.raises(InvalidSearchQuery):
+        await search.search(index=None, query=QueryFilm(pit_id="pit"))
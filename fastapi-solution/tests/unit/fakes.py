@@ -0,0 +1,156 @@
+from typing import Any, Callable
+from uuid import uuid4
+
+from db.cache.abc.cache import AbstractCache
+
+
+class FakeCache(AbstractCache):
+    """Cache in a dict, which records the calls made to it."""
+
+    def __init__(self) -> None:
+        self.data: dict[tuple[str, str], Any] = {}
+        self.locks: dict[str, str] = {}
+        self.calls: list[str] = []
+
+    @property
+    def client(self):
+        return None
+
+    async def close(self):
+        self.calls.append("close")
+
+    async def get(
+        self,
+        name: str,
+        key: str,
+        on_stale: Callable[[], Any] | None = None,
+        raw: bool = False,
+    ) -> Any | None:
+        self.calls.append("get")
+        return self.data.get((name, key))
+
+    async def mget(self, name: str, keys: list[str]) -> list[Any]:
+        self.calls.append("mget")
+        return [self.data.get((name, key)) for key in keys]
+
+    async def set(
+        self,
+        name: str,
+        key: str,
+        key_value: Any,
+        expire_time: int | None = None,
+    ):
+        self.calls.append("set")
+        self.data[(name, key)] = key_value
+
+    async def mset(
+        self,
+        name: str,
+        mapping: dict[str, Any],
+        expire_time: int | None = None,
+    ):
+        self.calls.append("mset")
+        for key, key_value in mapping.items():
+            self.data[(name, key)] = key_value
+
+    async def acquire_lock(
+        self,
+        name: str,
+        expire_time: float,
+    ) -> str | None:
+        if name in self.locks:
+            return None
+        self.locks[name] = str(uuid4())
+        return self.locks[name]
+
+    async def release_lock(self, name: str, token: str):
+        if self.locks.get(name) == token:
+            del self.locks[name]
+
+
+class FakePipeline:
+    """Redis pipeline, whose commands are applied by execute."""
+
+    def __init__(self, redis: "FakeRedis", transaction: bool) -> None:
+        self.redis = redis
+        self.transaction = transaction
+        self.commands: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    def __getattr__(self, command: str):
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+
+        return queue
+
+    async def execute(self) -> list:
+        self.redis.round_trips += 1
+        return [
+            getattr(self.redis, f"_{command}")(*args, **kwargs)
+            for command, args, kwargs in self.commands
+        ]
+
+
+class FakeRedis:
+    """Redis client over dicts, which counts round trips."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+        self.hashes: dict[str, dict[str, bytes]] = {}
+        self.expires: dict[str, float] = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self, transaction)
+
+    def _set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        if ex is not None:
+            self.expires[key] = ex
+        if px is not None:
+            self.expires[key] = px / 1000
+        return True
+
+    def _hset(self, name, mapping):
+        self.hashes.setdefault(name, {}).update(mapping)
+
+    def _expire(self, name, time):
+        self.expires[name] = time
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.values.get(key)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.values.get(key) for key in keys]
+
+    async def hget(self, name, key):
+        self.round_trips += 1
+        return self.hashes.get(name, {}).get(key)
+
+    async def hmget(self, name, keys):
+        self.round_trips += 1
+        return [self.hashes.get(name, {}).get(key) for key in keys]
+
+    async def set(self, key, value, **kwargs):
+        self.round_trips += 1
+        return self._set(key, value, **kwargs)
+
+    async def eval(self, script, numkeys, key, token):
+        # Только скрипт освобождения блокировки
+        self.round_trips += 1
+        if self.values.get(key) == token:
+            del self.values[key]
+            return 1
+        return 0
+
+    async def close(self):
+        return None
@@ -0,0 +1,78 @@
+from http import HTTPStatus
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from api.v1.films.service import FilmService, get_film_service
+from main import app
+
+EXPORT_URL = "/api/v1/films/export"
+
+films = [
+    {"id": "b92ef010-5e4c-4fd0-99d6-41b6456272cd", "title": "Spam"},
+    {"id": "2a090dde-f688-46fe-a9f4-b781a985275e", "title": "Egg"},
+]
+
+
+class FakeSearch:
+    """Search over a list of films, a page per point in time query."""
+
+    def __init__(self):
+        self.closed_pits = []
+
+    async def open_point_in_time(self, index, keep_alive):
+        return "pit"
+
+    async def close_point_in_time(self, pit_id):
+        self.closed_pits.append(pit_id)
+
+    async def search(self, index, query, size):
+        start = (query.search_after or [0])[0]
+        hits = [
+            {"_source": dict(film), "sort": [start + number + 1]}
+            for number, film in enumerate(films[start:start + size])
+        ]
+        return {"hits": {"hits": hits}}
+
+
+@pytest.fixture
+def search():
+    search = FakeSearch()
+    app.dependency_overrides[get_film_service] = lambda: FilmService(
+        cache=None,
+        search=search,
+    )
+    yield search
+    app.dependency_overrides.clear()
+
+
+def test_export_requires_auth(search):
+    response = TestClient(app).get(EXPORT_URL)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert not search.closed_pits
+
+
+def test_export_streams_films_as_ndjson(search, make_access_token):
+    client = TestClient(app)
+    client.cookies["access_token"] = f"Bearer {make_access_token()}"
+
+    response = client.get(EXPORT_URL)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [orjson.loads(line) for line in response.content.splitlines()]
+    assert lines == [
+        {"uuid": film["id"], "title": film["title"]} for film in films
+    ]
+    assert search.closed_pits == ["pit"]
+
+
+def test_export_rejects_unknown_fields(search, make_access_token):
+    client = TestClient(app)
+    client.cookies["access_token"] = f"Bearer {make_access_token()}"
+
+    response = client.get(EXPORT_URL, params={"fields": "password"})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
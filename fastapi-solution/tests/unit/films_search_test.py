@@ -0,0 +1,73 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.v1.films.service import FilmService, get_film_service
+from main import app
+from security.dependency import get_refresher
+from tests.unit.fakes import FakeCache
+
+SEARCH_URL = "/api/v1/films/search"
+
+film = {
+    "id": "b92ef010-5e4c-4fd0-99d6-41b6456272cd",
+    "title": "Spam",
+    "imdb_rating": 8.5,
+}
+
+
+class FakeSearch:
+    async def search(self, index, query, size, from_=None):
+        return {
+            "hits": {
+                "total": {"value": 1},
+                "hits": [{"_source": dict(film)}],
+            },
+        }
+
+
+class FakeRefresher:
+    def __init__(self, access_token: str) -> None:
+        self.access_token = access_token
+
+    async def refresh(self, refresh_token):
+        return {"access_token": self.access_token, "refresh_token": "new"}
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_film_service] = lambda: FilmService(
+        cache=FakeCache(),
+        search=FakeSearch(),
+    )
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_search_returns_films(client, make_access_token):
+    client.cookies["access_token"] = f"Bearer {make_access_token()}"
+
+    response = client.get(SEARCH_URL, params={"query": "Spam"})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["films"] == [
+        {"uuid": film["id"], "title": film["title"], "imdb_rating": 8.5},
+    ]
+    assert "set-cookie" not in response.headers
+
+
+def test_search_sets_refreshed_tokens(client, make_access_token):
+    refreshed_token = make_access_token()
+    app.dependency_overrides[get_refresher] = lambda: FakeRefresher(
+        refreshed_token,
+    )
+    expired_token = make_access_token(expires_in=timedelta(minutes=-1))
+    client.cookies["access_token"] = f"Bearer {expired_token}"
+
+    response = client.get(SEARCH_URL, params={"query": "Spam"})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.cookies["access_token"] == f'"Bearer {refreshed_token}"'
+    assert response.cookies["refresh_token"] == '"Bearer new"'
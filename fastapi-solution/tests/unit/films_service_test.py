@@ -0,0 +1,321 @@
+import asyncio
+from base64 import urlsafe_b64encode
+from http import HTTPStatus
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from api.v1.films import routes
+from api.v1.films.service import (
+    FIRST_PAGE_CURSOR,
+    FilmService,
+    _decode_cursor,
+    _encode_cursor,
+    get_film_service,
+)
+from core.deadline import set_deadline, time_left
+from core.messages import INVALID_CURSOR
+from db.cache.codecs import decode
+from db.cache.helpers import prepare_key_by_args
+from db.cache.redis import RedisCache
+from db.search.abc.search import InvalidSearchQuery
+from main import app
+from tests.unit.fakes import FakeRedis
+
+pytestmark = pytest.mark.asyncio
+
+LIST_FIELDS = ["id", "title", "imdb_rating"]
+
+films = [
+    {
+        "id": f"b92ef010-5e4c-4fd0-99d6-41b6456272c{number}",
+        "title": f"Film {number}",
+        "imdb_rating": 10 - number,
+        "description": "Long description",
+        "genre": ["Action"],
+    }
+    for number in range(5)
+]
+
+
+class FakeSearch:
+    """Search over a list of films, which records the queries."""
+
+    def __init__(self) -> None:
+        self.queries: list[dict] = []
+        self.closed_pits: list[str] = []
+        self.error: Exception | None = None
+        self.close_error: Exception | None = None
+
+    async def open_point_in_time(self, index, keep_alive):
+        return "pit"
+
+    async def close_point_in_time(self, pit_id):
+        if self.close_error:
+            raise self.close_error
+        self.closed_pits.append(pit_id)
+
+    async def search(self, index, query, size, from_=None):
+        if self.error:
+            raise self.error
+        body = query.get_query()
+        self.queries.append(body)
+        start = (body.get("search_after") or [from_ or 0])[-1]
+        fields = body.get("_source")
+        hits = [
+            {
+                "_source": {
+                    field: value
+                    for field, value in film.items()
+                    if not fields or field in fields
+                },
+                "sort": [film["imdb_rating"], start + number + 1],
+            }
+            for number, film in enumerate(films[start:start + size])
+        ]
+        return {"hits": {"total": {"value": len(films)}, "hits": hits}}
+
+
+@pytest.fixture
+def redis() -> FakeRedis:
+    return FakeRedis()
+
+
+@pytest.fixture
+def service(redis) -> FilmService:
+    cache = RedisCache(host="localhost", port=6379)
+    cache._client = redis
+    return FilmService(cache, FakeSearch())
+
+
+async def test_list_fetches_only_requested_fields(service):
+    count, page = await service.get_films_list(
+        page_size=2,
+        page_number=1,
+        fields=LIST_FIELDS,
+    )
+
+    assert service.search.queries[0]["_source"] == LIST_FIELDS
+    assert count == len(films)
+    assert [film.title for film in page] == ["Film 0", "Film 1"]
+    assert page[0].description is None
+
+
+async def test_projected_list_is_cached_compactly(service, redis):
+    await service.get_films_list(
+        page_size=2,
+        page_number=1,
+        fields=LIST_FIELDS,
+    )
+
+    (entry,) = redis.values.values()
+    cached_films = decode(entry)["values"]
+    assert set(cached_films[0]) == set(LIST_FIELDS)
+
+    _, page = await service.get_films_list(
+        page_size=2,
+        page_number=1,
+        fields=LIST_FIELDS,
+    )
+    assert len(service.search.queries) == 1
+    assert page[0].genre == []
+
+
+async def test_projected_and_full_lists_are_cached_apart(service, redis):
+    await service.get_films_list(
+        page_size=2,
+        page_number=1,
+        fields=LIST_FIELDS,
+    )
+    _, page = await service.get_films_list(page_size=2, page_number=1)
+
+    assert len(service.search.queries) == 2
+    assert "_source" not in service.search.queries[1]
+    assert page[0].description == "Long description"
+    assert len(redis.values) == 2
+
+
+async def test_cursor_keeps_pagination_state():
+    state = {"pit": "pit", "after": [8.5, 3], "query": "v1:key"}
+
+    assert _decode_cursor(_encode_cursor(state), "v1:key", 2) == state
+    assert _decode_cursor(FIRST_PAGE_CURSOR, "v1:key", 2) == {}
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        urlsafe_b64encode(b"not json").decode(),
+        urlsafe_b64encode(b"[1, 2]").decode(),
+        _encode_cursor({"after": [1, 2], "query": "v1:key"}),
+        _encode_cursor({"pit": "pit", "after": [1, 2]}),
+        _encode_cursor({"pit": "pit", "after": [1, 2], "query": "v1:other"}),
+        _encode_cursor({"pit": "pit", "after": [1], "query": "v1:key"}),
+        _encode_cursor({"pit": "pit", "after": "1,2", "query": "v1:key"}),
+        _encode_cursor({"pit": "pit", "after": [{}, 2], "query": "v1:key"}),
+    ],
+)
+async def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor, "v1:key", 2)
+
+
+async def test_cursor_of_another_query_is_rejected(service):
+    *_, cursor = await service.get_films_page_by_cursor(
+        page_size=2,
+        cursor=FIRST_PAGE_CURSOR,
+    )
+
+    with pytest.raises(ValueError):
+        await service.get_films_page_by_cursor(
+            page_size=2,
+            cursor=cursor,
+            sort_field={"imdb_rating": {"order": "desc"}},
+        )
+
+
+async def test_rejected_search_after_is_bad_request():
+    service = FilmService(cache=None, search=FakeSearch())
+    service.search.error = InvalidSearchQuery("search_after size mismatch")
+    app.dependency_overrides[get_film_service] = lambda: service
+    state = {"pit": "pit", "after": [1, 2], "query": prepare_key_by_args()}
+
+    response = TestClient(app).get(
+        "/api/v1/films/",
+        params={"cursor": _encode_cursor(state)},
+    )
+    app.dependency_overrides.clear()
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()["detail"] == INVALID_CURSOR
+
+
+async def test_cursor_pages_walk_all_films(service, redis):
+    titles = []
+    cursor = FIRST_PAGE_CURSOR
+    while cursor:
+        count, page, cursor = await service.get_films_page_by_cursor(
+            page_size=2,
+            cursor=cursor,
+        )
+        titles.extend(film.title for film in page)
+
+    assert count == len(films)
+    assert titles == [film["title"] for film in films]
+    assert all(query["pit"]["id"] == "pit" for query in service.search.queries)
+    # PIT закрывается после последней страницы, страницы не кешируются
+    assert service.search.closed_pits == ["pit"]
+    assert redis.values == {}
+
+
+async def test_failed_first_page_closes_its_pit(service):
+    service.search.error = ConnectionError("search is down")
+
+    with pytest.raises(ConnectionError):
+        await service.get_films_page_by_cursor(
+            page_size=2,
+            cursor=FIRST_PAGE_CURSOR,
+        )
+
+    assert service.search.closed_pits == ["pit"]
+
+
+async def test_export_failure_is_not_masked_by_pit_close(service):
+    service.search.error = ConnectionError("search is down")
+    service.search.close_error = TimeoutError("close timed out")
+
+    with pytest.raises(ConnectionError):
+        async for _ in service.export_films():
+            pass
+
+
+async def test_export_restores_request_deadline(service):
+    set_deadline(5)
+
+    chunks = [chunk async for chunk in service.export_films(page_size=2)]
+
+    assert len(chunks) == 3
+    assert time_left() is not None
+
+
+async def test_failed_next_page_keeps_client_pit(service):
+    *_, cursor = await service.get_films_page_by_cursor(
+        page_size=2,
+        cursor=FIRST_PAGE_CURSOR,
+    )
+    service.search.error = ConnectionError("search is down")
+
+    with pytest.raises(ConnectionError):
+        await service.get_films_page_by_cursor(page_size=2, cursor=cursor)
+
+    # Клиент может повторить запрос с тем же курсором
+    assert service.search.closed_pits == []
+
+
+async def test_cached_response_body_is_served_without_models(
+    service,
+    monkeypatch,
+):
+    pagination = {"page_size": 2, "page_number": 1, "cursor": None}
+    response = await routes.get_films_response(service, pagination)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Models are built on a cache hit")
+
+    monkeypatch.setattr(routes, "render_films_page", fail)
+    cached_response = await routes.get_films_response(service, pagination)
+
+    assert cached_response.body == response.body
+    assert cached_response.media_type == "application/json"
+    assert len(service.search.queries) == 1
+
+
+async def test_list_response_is_cached_once(service, redis):
+    pagination = {"page_size": 2, "page_number": 1, "cursor": None}
+
+    await routes.get_films_response(service, pagination)
+
+    assert [key.split(":")[0] for key in redis.values] == ["films_response"]
+
+
+async def test_stale_response_body_is_refreshed_in_background(redis):
+    cache = RedisCache(
+        host="localhost",
+        port=6379,
+        namespace_soft_expire={"films_response": -1},
+    )
+    cache._client = redis
+    service = FilmService(cache, FakeSearch())
+    pagination = {"page_size": 2, "page_number": 1, "cursor": None}
+
+    response = await routes.get_films_response(service, pagination)
+    stale_response = await routes.get_films_response(service, pagination)
+    await asyncio.sleep(0.01)
+
+    assert stale_response.body == response.body
+    assert len(service.search.queries) == 2
+
+
+async def test_empty_list_response_is_not_cached(service, redis):
+    async def find_nothing(**kwargs):
+        return {"hits": {"total": {"value": 0}, "hits": []}}
+
+    service.search.search = find_nothing
+    pagination = {"page_size": 2, "page_number": 1, "cursor": None}
+
+    response = await routes.get_films_response(service, pagination)
+
+    assert orjson.loads(response.body)["films"] == []
+    assert redis.values == {}
+
+
+async def test_cursor_page_response_is_not_cached(service, redis):
+    pagination = {"page_size": 2, "page_number": 1, "cursor": "start"}
+
+    await routes.get_films_response(service, pagination)
+    await routes.get_films_response(service, pagination)
+
+    assert len(service.search.queries) == 2
+    assert redis.values == {}
@@ -0,0 +1,152 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from api.http_cache import HTTPCacheMiddleware
+from db.cache import dependency as cache_dependency
+from security.auth import get_auth
+from tests.unit.fakes import FakeCache
+
+
+class FailingCache(FakeCache):
+    async def get(self, *args, **kwargs):
+        raise ConnectionError("cache is down")
+
+    async def set(self, *args, **kwargs):
+        raise ConnectionError("cache is down")
+
+
+def make_app(**kwargs) -> FastAPI:
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/api/v1/films/")
+    async def films(cursor: str | None = None):
+        app.state.calls += 1
+        return {"calls": app.state.calls}
+
+    @app.get("/api/v1/genres/")
+    async def genres():
+        return [{"name": "Action"}]
+
+    @app.get("/api/v1/films/search", dependencies=[Depends(get_auth)])
+    async def films_search():
+        app.state.calls += 1
+        return {"calls": app.state.calls}
+
+    @app.get("/api/v1/films/export")
+    async def films_export():
+        app.state.calls += 1
+        return {"calls": app.state.calls}
+
+    app.add_middleware(
+        HTTPCacheMiddleware,
+        routes=app.routes,
+        max_age=60,
+        exclude_routes=["/api/v1/films/export"],
+        **kwargs,
+    )
+    return app
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = FakeCache()
+    monkeypatch.setattr(cache_dependency, "cache", cache)
+    return cache
+
+
+@pytest.fixture
+def client():
+    return TestClient(make_app())
+
+
+def test_public_response_is_cached_with_etag(cache, client):
+    first = client.get("/api/v1/films/")
+    second = client.get("/api/v1/films/")
+
+    assert first.status_code == second.status_code == HTTPStatus.OK
+    assert second.json() == first.json() == {"calls": 1}
+    assert second.headers["etag"] == first.headers["etag"]
+    assert first.headers["cache-control"] == "public, max-age=60"
+    assert "vary" not in first.headers
+
+
+def test_matching_etag_returns_not_modified(cache, client):
+    etag = client.get("/api/v1/films/").headers["etag"]
+
+    response = client.get("/api/v1/films/", headers={"If-None-Match": etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_fresh_response_with_matching_etag_returns_not_modified(
+    cache,
+    client,
+):
+    etag = client.get("/api/v1/genres/").headers["etag"]
+    cache.data.clear()
+
+    response = client.get("/api/v1/genres/", headers={"If-None-Match": etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert cache.data
+
+
+def test_protected_response_requires_valid_token(
+    cache,
+    client,
+    make_access_token,
+):
+    client.cookies["access_token"] = f"Bearer {make_access_token()}"
+    cached = client.get("/api/v1/films/search")
+    client.cookies["access_token"] = "Bearer invalid"
+    rejected = client.get("/api/v1/films/search")
+
+    assert cached.status_code == HTTPStatus.OK
+    assert cached.headers["cache-control"] == "private, max-age=60"
+    assert cached.headers["vary"] == "Cookie"
+    assert rejected.status_code == HTTPStatus.UNAUTHORIZED
+    assert len(cache.data) == 1
+
+
+def test_cursor_pages_are_not_stored(cache, client):
+    first = client.get("/api/v1/films/", params={"cursor": "start"})
+    second = client.get("/api/v1/films/", params={"cursor": "start"})
+
+    assert first.headers["cache-control"] == "no-store"
+    assert "etag" not in first.headers
+    assert second.json() == {"calls": 2}
+    assert not cache.data
+
+
+def test_cache_errors_do_not_fail_response(monkeypatch, client):
+    monkeypatch.setattr(cache_dependency, "cache", FailingCache())
+
+    response = client.get("/api/v1/films/")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"calls": 1}
+
+
+def test_excluded_route_skips_cache(cache, client):
+    first = client.get("/api/v1/films/export")
+    second = client.get("/api/v1/films/export")
+
+    assert second.json() == {"calls": 2}
+    assert "etag" not in first.headers
+    assert cache.calls == []
+
+
+def test_only_included_routes_are_cached(cache):
+    client = TestClient(make_app(include_routes=["/api/v1/genres/"]))
+
+    client.get("/api/v1/genres/")
+    response = client.get("/api/v1/films/")
+
+    assert "etag" not in response.headers
+    assert cache.calls == ["get", "set"]
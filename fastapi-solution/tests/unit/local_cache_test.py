@@ -0,0 +1,94 @@
+import pytest
+
+from db.cache.local import LocalCache
+from tests.unit.fakes import FakeCache
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_hit_does_not_call_wrapped_cache():
+    wrapped = FakeCache()
+    cache = LocalCache(wrapped)
+    await cache.set(name="film", key="1", key_value={"title": "Spam"})
+    wrapped.calls.clear()
+
+    assert await cache.get(name="film", key="1") == {"title": "Spam"}
+    assert not wrapped.calls
+
+
+async def test_miss_is_loaded_and_kept():
+    wrapped = FakeCache()
+    wrapped.data[("film", "1")] = {"title": "Spam"}
+    cache = LocalCache(wrapped, loaders={"film": lambda film: film["title"]})
+
+    assert await cache.get(name="film", key="1") == "Spam"
+    assert await cache.get(name="film", key="1") == "Spam"
+    assert wrapped.calls == ["get"]
+
+
+async def test_least_recently_used_entry_is_evicted():
+    cache = LocalCache(FakeCache(), max_entries=2)
+    for key in ("1", "2"):
+        await cache.set(name="film", key=key, key_value=key)
+    await cache.get(name="film", key="1")
+    await cache.set(name="film", key="3", key_value="3")
+
+    assert cache.stats()["evictions"] == 1
+    assert cache._lookup("film", "1") == "1"
+    assert cache._lookup("film", "2") is None
+
+
+async def test_size_limit_evicts_entries():
+    cache = LocalCache(FakeCache(), max_bytes=10)
+    await cache.set(name="film", key="1", key_value="12345")
+    await cache.set(name="film", key="2", key_value="123456")
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 6
+
+
+async def test_expired_entry_is_a_miss():
+    wrapped = FakeCache()
+    cache = LocalCache(wrapped, expire_time=0)
+    await cache.set(name="film", key="1", key_value="local")
+    wrapped.data[("film", "1")] = "wrapped"
+
+    assert await cache.get(name="film", key="1") == "wrapped"
+
+
+async def test_mget_asks_wrapped_cache_only_for_misses():
+    wrapped = FakeCache()
+    wrapped.data[("film", "2")] = "2"
+    cache = LocalCache(wrapped)
+    await cache.set(name="film", key="1", key_value="1")
+
+    assert await cache.mget(name="film", keys=["1", "2", "3"]) == [
+        "1",
+        "2",
+        None,
+    ]
+    assert cache._lookup("film", "2") == "2"
+
+
+async def test_shorter_expire_time_is_kept_locally():
+    wrapped = FakeCache()
+    cache = LocalCache(wrapped, expire_time=30)
+    await cache.set(name="film", key="1", key_value="local", expire_time=0)
+    await cache.mset(name="film", mapping={"2": "local"}, expire_time=0)
+    wrapped.data[("film", "1")] = "wrapped"
+    wrapped.data[("film", "2")] = "wrapped"
+
+    assert await cache.get(name="film", key="1") == "wrapped"
+    assert await cache.mget(name="film", keys=["2"]) == ["wrapped"]
+
+
+async def test_raw_and_decoded_entries_are_kept_apart():
+    wrapped = FakeCache()
+    cache = LocalCache(wrapped)
+    await cache.set(name="films", key="1", key_value=b'{"count": 1}')
+    wrapped.data[("films", "1")] = {"count": 1}
+
+    assert await cache.get(name="films", key="1") == {"count": 1}
+    assert await cache.get(name="films", key="1", raw=True) == (
+        b'{"count": 1}'
+    )
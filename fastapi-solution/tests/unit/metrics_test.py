@@ -0,0 +1,135 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core.config import security_settings
+from db.cache import dependency as cache_dependency
+from db.cache.breaker import CircuitBreakerCache
+from db.cache.local import LocalCache
+from db.cache.writer import WriteBehindCache
+from db.search import dependency as search_dependency
+from db.search.elastic.search import Search
+from main import app
+from security import dependency as auth_dependency
+from security.claims import ClaimsCache, get_decoder
+from tests.unit.fakes import FakeCache
+
+METRICS_URL = "/api/metrics"
+
+
+class FailingCache(FakeCache):
+    async def get(self, *args, **kwargs):
+        raise ConnectionError("cache is down")
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_metrics_without_caches(monkeypatch, client):
+    monkeypatch.setattr(cache_dependency, "cache", None)
+    monkeypatch.setattr(auth_dependency, "claims_cache", None)
+
+    response = client.get(METRICS_URL)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {}
+
+
+def test_metrics_report_open_breaker(monkeypatch, client):
+    breaker = CircuitBreakerCache(FailingCache(), failure_threshold=1)
+    monkeypatch.setattr(cache_dependency, "cache", breaker)
+    assert asyncio.run(breaker.get(name="film", key="1")) is None
+
+    response = client.get(METRICS_URL)
+
+    assert response.json()["cache_breaker"] == {
+        "state": "open",
+        "failures": 1,
+        "opened": 1,
+        "short_circuited": 0,
+    }
+
+
+def test_metrics_report_writer_queue(monkeypatch, client):
+    writer = WriteBehindCache(
+        CircuitBreakerCache(FakeCache()),
+        queue_size=1,
+    )
+    monkeypatch.setattr(cache_dependency, "cache", writer)
+
+    async def fill_queue():
+        # Писатели не успевают выполнить запись между вызовами set
+        for key in ("1", "2", "3"):
+            await writer.set(name="film", key=key, key_value={})
+        await writer.close()
+
+    asyncio.run(fill_queue())
+    response = client.get(METRICS_URL)
+
+    assert response.json()["cache_writer"] == {
+        "pending": 0,
+        "written": 1,
+        "dropped": 2,
+        "failed": 0,
+    }
+    assert response.json()["cache_breaker"]["state"] == "closed"
+
+
+def test_metrics_report_local_cache(monkeypatch, client):
+    local = LocalCache(FakeCache())
+    monkeypatch.setattr(cache_dependency, "cache", local)
+
+    async def read_twice():
+        await local.set(name="genre", key="1", key_value={"name": "Action"})
+        await local.get(name="genre", key="1")
+        await local.get(name="genre", key="2")
+
+    asyncio.run(read_twice())
+    response = client.get(METRICS_URL)
+
+    assert response.json()["local_cache"] == {
+        "entries": 1,
+        "bytes": len(b'{"name":"Action"}'),
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+    }
+
+
+def test_metrics_report_claims_cache(monkeypatch, client, make_access_token):
+    claims_cache = ClaimsCache(decode=get_decoder())
+    monkeypatch.setattr(auth_dependency, "claims_cache", claims_cache)
+    claims_cache.get(
+        make_access_token(),
+        security_settings.secret_key,
+        [security_settings.algorithm],
+    )
+
+    response = client.get(METRICS_URL)
+
+    assert response.json()["claims_cache"] == {
+        "entries": 1,
+        "hits": 0,
+        "misses": 1,
+        "evictions": 0,
+    }
+
+
+def test_metrics_report_search_pool(monkeypatch, client):
+    search = Search(hosts=["http://localhost:9200"], connections_per_node=3)
+    monkeypatch.setattr(search_dependency, "db", search)
+
+    response = client.get(METRICS_URL)
+
+    assert response.json()["search_pool"] == [
+        {
+            "node": "http://localhost:9200",
+            "connections": 3,
+            "in_flight": 0,
+            "requests": 0,
+        },
+    ]
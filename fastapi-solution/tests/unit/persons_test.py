@@ -0,0 +1,124 @@
+import pytest
+
+from api.v1.persons.service import PersonService, _persons_roles
+from models.person import Person, PersonFilm
+from tests.unit.fakes import FakeCache
+
+pytestmark = pytest.mark.asyncio
+
+ann = Person(id="7a44ea5e-a6ed-4d4b-9c8c-a3e4c4a6b0c1", name="Ann")
+bob = Person(id="c1e0e2b4-6a2b-4b7e-8f8e-5f5b1a9e1d2a", name="Bob")
+films = [
+    {
+        "id": "b92ef010-5e4c-4fd0-99d6-41b6456272cd",
+        "title": "Spam",
+        "imdb_rating": 8.5,
+        "actors": [{"id": str(ann.id), "name": ann.name}],
+        "writers": [{"id": str(bob.id), "name": bob.name}],
+        "director": [],
+    },
+    {
+        "id": "0312ed51-8833-413f-bff5-0e139c11264a",
+        "title": "Eggs",
+        "imdb_rating": None,
+        "actors": [],
+        "writers": [],
+        "director": [ann.name],
+    },
+]
+
+
+class FakeSearch:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def get(self, index, id):
+        self.calls.append(f"get {index}")
+        person = {str(ann.id): ann, str(bob.id): bob}.get(id)
+        return person and person.dict()
+
+    async def scan(self, index, query, parse=None, **kwargs):
+        self.calls.append(f"scan {index}")
+
+        async def hits():
+            for film in films:
+                yield {"_source": film}
+
+        return hits()
+
+
+@pytest.fixture
+def service() -> PersonService:
+    return PersonService(FakeCache(), FakeSearch())
+
+
+async def test_persons_films_are_found_by_one_scan(service):
+    persons_films = await service.get_persons_films([ann, bob])
+
+    assert service.search.calls == ["scan movies"]
+    assert service.cache.calls == ["mget", "mset"]
+    assert [film.title for film in persons_films[str(ann.id)]] == [
+        "Spam",
+        "Eggs",
+    ]
+    assert [film.roles for film in persons_films[str(bob.id)]] == [["writer"]]
+
+
+async def test_cached_persons_films_skip_search(service):
+    await service.get_persons_films([ann])
+    service.search.calls.clear()
+
+    persons_films = await service.get_persons_films([ann, bob])
+
+    # Из поиска запрашиваются только фильмы персоны, которых нет в кеше
+    assert service.search.calls == ["scan movies"]
+    assert set(persons_films) == {str(ann.id), str(bob.id)}
+    service.search.calls.clear()
+    await service.get_persons_films([ann, bob])
+    assert service.search.calls == []
+
+
+async def test_person_and_films_are_cached_for_all_endpoints(service):
+    person, person_films = await service.get_person_with_films(str(ann.id))
+
+    assert person == ann
+    assert [film.roles for film in person_films] == [["actor"], ["director"]]
+    assert service.search.calls == ["get persons", "scan movies"]
+
+    service.search.calls.clear()
+    await service.get_person_with_films(str(ann.id))
+    await service.get_persons_films([ann])
+    assert service.search.calls == []
+    assert set(service.cache.data) == {
+        ("person", str(ann.id)),
+        ("filmography", str(ann.id)),
+    }
+
+
+async def test_unknown_person_has_no_films(service):
+    person, person_films = await service.get_person_with_films(
+        "00000000-0000-0000-0000-000000000000",
+    )
+
+    assert (person, person_films) == (None, None)
+    assert "scan movies" not in service.search.calls
+
+
+async def test_roles_are_found_by_id_and_director_name():
+    film = {
+        "actors": [{"id": "1", "name": "Ann"}, {"id": "1", "name": "Ann"}],
+        "writers": [{"id": "1", "name": "Ann"}, {"id": "2", "name": "Bob"}],
+        "director": ["Ann", "Carl"],
+    }
+
+    roles = _persons_roles(film, {"Ann": ["1"], "Bob": ["2"]})
+
+    assert roles == {"1": ["actor", "writer", "director"], "2": ["writer"]}
+
+
+async def test_namesakes_both_get_director_role():
+    film = {"actors": None, "writers": [], "director": ["Ann"]}
+
+    roles = _persons_roles(film, {"Ann": ["1", "3"]})
+
+    assert roles == {"1": ["director"], "3": ["director"]}
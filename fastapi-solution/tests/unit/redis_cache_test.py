@@ -0,0 +1,207 @@
+from time import time
+
+import orjson
+import pytest
+
+from db.cache.codecs import HEADERS, decode
+from db.cache.redis import RedisCache
+from tests.unit.fakes import FakeRedis
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_cache(**kwargs) -> tuple[RedisCache, FakeRedis]:
+    cache = RedisCache(host="localhost", port=6379, **kwargs)
+    redis = FakeRedis()
+    cache._client = redis
+    return cache, redis
+
+
+async def test_entry_is_stored_under_its_own_key():
+    cache, redis = make_cache(
+        key_prefix="movies",
+        namespace_expire={"genre": 3600},
+    )
+
+    await cache.set(name="genre", key="1", key_value={"name": "Action"})
+
+    assert decode(redis.values["movies:genre:1"]) == {"name": "Action"}
+    assert redis.expires["movies:genre:1"] == 3600
+    assert await cache.get(name="genre", key="1") == {"name": "Action"}
+
+
+async def test_explicit_expire_time_wins():
+    cache, redis = make_cache(namespace_expire={"genre": 3600})
+
+    await cache.set(name="genre", key="1", key_value={}, expire_time=5)
+
+    assert redis.expires["genre:1"] == 5
+
+
+async def test_missing_entry_is_none():
+    cache, _ = make_cache()
+
+    assert await cache.get(name="genre", key="1") is None
+
+
+async def test_legacy_hash_is_read_on_miss():
+    cache, redis = make_cache(read_legacy_hash=True)
+    redis.hashes["genre"] = {"1": orjson.dumps({"name": "Action"})}
+
+    assert await cache.get(name="genre", key="1") == {"name": "Action"}
+
+
+async def test_hash_layout_keeps_namespace_in_one_hash():
+    cache, redis = make_cache(key_layout="hash")
+
+    await cache.set(name="genre", key="1", key_value={"name": "Action"})
+
+    assert decode(redis.hashes["genre"]["1"]) == {"name": "Action"}
+    assert "genre" in redis.expires
+    assert await cache.get(name="genre", key="1") == {"name": "Action"}
+
+
+async def test_mset_writes_all_keys_in_one_round_trip():
+    cache, redis = make_cache()
+
+    await cache.mset(name="film", mapping={"1": {"n": 1}, "2": {"n": 2}})
+
+    assert redis.round_trips == 1
+    assert set(redis.values) == {"film:1", "film:2"}
+
+
+async def test_mset_of_nothing_skips_redis():
+    cache, redis = make_cache()
+
+    await cache.mset(name="film", mapping={})
+
+    assert redis.round_trips == 0
+
+
+async def test_mget_reads_all_keys_in_one_round_trip():
+    cache, redis = make_cache()
+    await cache.mset(name="film", mapping={"1": {"n": 1}, "3": {"n": 3}})
+    redis.round_trips = 0
+
+    values = await cache.mget(name="film", keys=["1", "2", "3"])
+
+    assert values == [{"n": 1}, None, {"n": 3}]
+    assert redis.round_trips == 1
+
+
+async def test_mget_reads_missed_keys_from_legacy_hash():
+    cache, redis = make_cache(read_legacy_hash=True)
+    await cache.set(name="film", key="1", key_value={"n": 1})
+    redis.hashes["film"] = {"2": orjson.dumps({"n": 2})}
+    redis.round_trips = 0
+
+    values = await cache.mget(name="film", keys=["1", "2", "3"])
+
+    assert values == [{"n": 1}, {"n": 2}, None]
+    assert redis.round_trips == 2
+
+
+async def test_hash_layout_mget_reads_one_hash():
+    cache, redis = make_cache(key_layout="hash")
+    await cache.mset(name="film", mapping={"1": {"n": 1}, "2": {"n": 2}})
+    redis.round_trips = 0
+
+    values = await cache.mget(name="film", keys=["2", "1"])
+
+    assert values == [{"n": 2}, {"n": 1}]
+    assert redis.round_trips == 1
+
+
+async def test_lock_is_taken_once_and_released_by_its_owner():
+    cache, redis = make_cache()
+
+    token = await cache.acquire_lock(name="film:1", expire_time=0.5)
+
+    assert token
+    assert redis.expires["lock:film:1"] == 0.5
+    assert await cache.acquire_lock(name="film:1", expire_time=0.5) is None
+    await cache.release_lock(name="film:1", token="not-the-owner")
+    assert "lock:film:1" in redis.values
+    await cache.release_lock(name="film:1", token=token)
+    assert "lock:film:1" not in redis.values
+
+
+async def test_entry_is_stale_after_soft_expiry():
+    cache, _ = make_cache()
+
+    assert not cache.is_stale(time() + 10)
+    assert cache.is_stale(time() - 1)
+
+
+async def test_entry_may_be_refreshed_early(monkeypatch):
+    cache, _ = make_cache(early_refresh_beta=1, recompute_time=1)
+
+    monkeypatch.setattr("db.cache.redis.redis.random", lambda: 0)
+    assert not cache.is_stale(time() + 0.5)
+    # Чем ближе random() к единице, тем раньше запись считается устаревшей
+    monkeypatch.setattr("db.cache.redis.redis.random", lambda: 0.99)
+    assert cache.is_stale(time() + 0.5)
+    assert not cache.is_stale(time() + 10)
+
+
+async def test_stale_entry_is_served_and_refreshed():
+    cache, _ = make_cache(namespace_soft_expire={"film": -1})
+    await cache.set(name="film", key="1", key_value={"n": 1})
+    refreshes = []
+
+    value = await cache.get(
+        name="film",
+        key="1",
+        on_stale=lambda: refreshes.append("film:1"),
+    )
+
+    assert value == {"n": 1}
+    assert refreshes == ["film:1"]
+    assert await cache.mget(name="film", keys=["1"]) == [{"n": 1}]
+
+
+async def test_fresh_entry_is_not_refreshed():
+    cache, _ = make_cache(namespace_soft_expire={"film": 60})
+    await cache.set(name="film", key="1", key_value={"n": 1})
+    refreshes = []
+
+    value = await cache.get(
+        name="film",
+        key="1",
+        on_stale=lambda: refreshes.append("film:1"),
+    )
+
+    assert value == {"n": 1}
+    assert refreshes == []
+
+
+@pytest.mark.parametrize("soft_expire, refreshed", [(-1, True), (60, False)])
+async def test_raw_entry_keeps_soft_expiry(soft_expire, refreshed):
+    cache, _ = make_cache(namespace_soft_expire={"body": soft_expire})
+    await cache.set(name="body", key="1", key_value=b'{"n": 1}')
+    refreshes = []
+
+    value = await cache.get(
+        name="body",
+        key="1",
+        on_stale=lambda: refreshes.append("body:1"),
+        raw=True,
+    )
+
+    assert value == b'{"n": 1}'
+    assert bool(refreshes) == refreshed
+
+
+async def test_namespace_values_are_compressed_by_its_codec():
+    cache, redis = make_cache(
+        namespace_compression={"films": "zlib"},
+        compress_threshold=100,
+    )
+    films = [{"title": "Spam"}] * 100
+
+    await cache.set(name="films", key="1", key_value=films)
+    await cache.set(name="film", key="1", key_value=films)
+
+    assert redis.values["films:1"][:1] == HEADERS["zlib"]
+    assert redis.values["film:1"][:1] == HEADERS["none"]
+    assert await cache.get(name="films", key="1") == films
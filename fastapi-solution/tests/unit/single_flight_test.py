@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+
+from db.cache.single_flight import SingleFlight
+from tests.unit.fakes import FakeCache
+
+pytestmark = pytest.mark.asyncio
+
+
+class Loader:
+    """Load function, which counts its calls and waits to be released."""
+
+    def __init__(self, value=None, error: Exception | None = None) -> None:
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.released = asyncio.Event()
+        self.stored = []
+
+    async def load(self):
+        self.calls += 1
+        await self.released.wait()
+        if self.error:
+            raise self.error
+        return self.value
+
+    async def store(self, value):
+        self.stored.append(value)
+
+
+async def test_concurrent_misses_load_once():
+    single_flight = SingleFlight()
+    loader = Loader(value={"id": "1"})
+
+    calls = [
+        asyncio.create_task(
+            single_flight.fetch("film:1", loader.load, loader.store),
+        )
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    loader.released.set()
+
+    assert await asyncio.gather(*calls) == [{"id": "1"}] * 5
+    assert loader.calls == 1
+    assert loader.stored == [{"id": "1"}]
+
+
+async def test_different_keys_load_separately():
+    single_flight = SingleFlight()
+    loader = Loader(value={"id": "1"})
+    loader.released.set()
+
+    await asyncio.gather(
+        single_flight.fetch("film:1", loader.load),
+        single_flight.fetch("film:2", loader.load),
+    )
+
+    assert loader.calls == 2
+
+
+async def test_failed_load_is_raised_to_all_callers_and_forgotten():
+    single_flight = SingleFlight()
+    loader = Loader(error=ValueError("search is down"))
+
+    calls = [
+        asyncio.create_task(single_flight.fetch("film:1", loader.load))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+    loader.released.set()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    loader.error = None
+    loader.value = {"id": "1"}
+    assert await single_flight.fetch("film:1", loader.load) == {"id": "1"}
+    assert loader.calls == 2
+
+
+async def test_cancelled_caller_does_not_cancel_others():
+    single_flight = SingleFlight()
+    loader = Loader(value={"id": "1"})
+
+    first = asyncio.create_task(single_flight.fetch("film:1", loader.load))
+    second = asyncio.create_task(single_flight.fetch("film:1", loader.load))
+    await asyncio.sleep(0)
+    first.cancel()
+    loader.released.set()
+
+    assert await second == {"id": "1"}
+    assert first.cancelled()
+
+
+async def test_empty_value_is_not_stored():
+    single_flight = SingleFlight()
+    loader = Loader(value=None)
+    loader.released.set()
+
+    loaded = await single_flight.fetch("film:1", loader.load, loader.store)
+
+    assert loaded is None
+    assert loader.stored == []
+
+
+async def test_locked_key_is_read_from_cache_of_another_worker():
+    cache = FakeCache()
+    await cache.acquire_lock(name="film:1", expire_time=1)
+    single_flight = SingleFlight(
+        cache,
+        use_lock=True,
+        lock_wait=1,
+        lock_poll=0.01,
+    )
+    loader = Loader(value={"id": "1"})
+    loader.released.set()
+
+    async def recheck():
+        return cache.data.get(("film", "1"))
+
+    call = asyncio.create_task(
+        single_flight.fetch("film:1", loader.load, loader.store, recheck),
+    )
+    await asyncio.sleep(0.02)
+    await cache.set(name="film", key="1", key_value={"id": "from worker"})
+
+    assert await call == {"id": "from worker"}
+    assert loader.calls == 0
+
+
+async def test_locked_key_is_loaded_after_wait_time():
+    cache = FakeCache()
+    await cache.acquire_lock(name="film:1", expire_time=1)
+    single_flight = SingleFlight(
+        cache,
+        use_lock=True,
+        lock_wait=0.05,
+        lock_poll=0.01,
+    )
+    loader = Loader(value={"id": "1"})
+    loader.released.set()
+
+    async def recheck():
+        return None
+
+    value = await single_flight.fetch("film:1", loader.load, None, recheck)
+
+    assert value == {"id": "1"}
+    assert loader.calls == 1
+
+
+async def test_lock_is_released_after_load():
+    cache = FakeCache()
+    single_flight = SingleFlight(cache, use_lock=True)
+    loader = Loader(value={"id": "1"})
+    loader.released.set()
+
+    async def recheck():
+        return None
+
+    await single_flight.fetch("film:1", loader.load, loader.store, recheck)
+
+    assert cache.locks == {}
+    assert loader.stored == [{"id": "1"}]
+
+
+async def test_refresh_runs_once_in_background():
+    single_flight = SingleFlight()
+    loader = Loader(value={"id": "1"})
+
+    single_flight.refresh("film:1", loader.load, loader.store)
+    single_flight.refresh("film:1", loader.load, loader.store)
+    await asyncio.sleep(0)
+    assert loader.stored == []
+
+    loader.released.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert loader.calls == 1
+    assert loader.stored == [{"id": "1"}]
+
+
+async def test_refresh_is_skipped_while_another_worker_holds_lock():
+    cache = FakeCache()
+    await cache.acquire_lock(name="film:1", expire_time=1)
+    single_flight = SingleFlight(cache, use_lock=True)
+    loader = Loader(value={"id": "1"})
+    loader.released.set()
+
+    single_flight.refresh("film:1", loader.load, loader.store)
+    await asyncio.sleep(0.01)
+
+    assert loader.calls == 0
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import timedelta
+from http import HTTPStatus
+
+import httpx
+import pytest
+from fastapi import HTTPException, Response
+
+from security.auth import Auth
+from security.claims import ClaimsCache, get_decoder
+from security.refresh import TokenRefresher
+
+pytestmark = pytest.mark.asyncio
+
+TOKENS = {"access_token": "access", "refresh_token": "refresh"}
+
+
+def make_refresher(
+    status: int,
+    **kwargs,
+) -> tuple[TokenRefresher, list]:
+    body = kwargs.pop("body", {"json": TOKENS})
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(status, **body)
+
+    refresher = TokenRefresher(url="http://auth/refresh", **kwargs)
+    refresher.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler),
+    )
+    return refresher, requests
+
+
+async def test_concurrent_refreshes_of_a_token_are_sent_once():
+    refresher, requests = make_refresher(HTTPStatus.OK)
+
+    results = await asyncio.gather(
+        *(refresher.refresh("token") for _ in range(3)),
+    )
+
+    assert results == [TOKENS] * 3
+    assert len(requests) == 1
+
+
+async def test_rejected_token_is_not_refreshed():
+    refresher, _ = make_refresher(HTTPStatus.UNAUTHORIZED)
+
+    assert await refresher.refresh("token") is None
+    assert refresher.circuit_breaker.failures == 0
+
+
+async def test_missing_token_is_not_sent():
+    refresher, requests = make_refresher(HTTPStatus.OK)
+
+    assert await refresher.refresh(None) is None
+    assert requests == []
+
+
+async def test_failing_auth_service_is_not_called():
+    refresher, requests = make_refresher(
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        failure_threshold=2,
+    )
+
+    for _ in range(3):
+        assert await refresher.refresh("token") is None
+
+    assert len(requests) == 2
+
+
+@pytest.mark.parametrize(
+    "status, body",
+    [
+        (HTTPStatus.OK, {"text": "<html>maintenance</html>"}),
+        (HTTPStatus.OK, {"json": {"refresh_token": "refresh"}}),
+        (HTTPStatus.OK, {"json": ["access", "refresh"]}),
+        (HTTPStatus.BAD_GATEWAY, {"text": "Bad gateway"}),
+    ],
+)
+async def test_bad_response_is_a_failure(status, body):
+    refresher, _ = make_refresher(status, body=body)
+
+    assert await refresher.refresh("token") is None
+    assert refresher.circuit_breaker.failures == 1
+
+
+async def test_refresh_without_access_token_is_unauthorized(
+    make_access_token,
+):
+    refresher, _ = make_refresher(
+        HTTPStatus.OK,
+        body={"json": {"refresh_token": "refresh"}},
+    )
+    auth = Auth(
+        response=Response(),
+        token={
+            "access_token": make_access_token(timedelta(minutes=-1)),
+            "refresh_token": "refresh",
+        },
+        refresher=refresher,
+        claims_cache=ClaimsCache(decode=get_decoder()),
+    )
+
+    with pytest.raises(HTTPException) as error:
+        await auth.authenticate()
+
+    assert error.value.status_code == HTTPStatus.UNAUTHORIZED
@@ -0,0 +1,100 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.v1.films.service import get_film_service
+from api.v1.genres.service import get_genres_service
+from api.v1.warmup import warm_up_cache, warm_up_cache_until
+from db.cache import dependency as cache_dependency
+from db.search import dependency as search_dependency
+from main import app
+from tests.unit.fakes import FakeCache
+
+genres = [{"id": "3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff", "name": "Action"}]
+films = [
+    {
+        "id": "b92ef010-5e4c-4fd0-99d6-41b6456272cd",
+        "title": "Spam",
+        "imdb_rating": 8.5,
+        "genre": ["Action"],
+    },
+]
+
+
+class FakeSearch:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def scan(self, index, parse=None, **kwargs):
+        self.calls.append(f"scan {index}")
+
+        async def hits():
+            for genre in genres:
+                yield parse(genre)
+
+        return hits()
+
+    async def search(self, index, query, size, from_=None):
+        self.calls.append(f"search {index}")
+        return {
+            "hits": {
+                "total": {"value": len(films)},
+                "hits": [{"_source": dict(film)} for film in films],
+            },
+        }
+
+    async def get(self, index, id):
+        self.calls.append(f"get {index}")
+        return next(film for film in films if film["id"] == id)
+
+    def start_batching(self):
+        return None
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    cache, search = FakeCache(), FakeSearch()
+    monkeypatch.setattr(cache_dependency, "cache", cache)
+    monkeypatch.setattr(search_dependency, "db", search)
+    return cache, search
+
+
+def test_warmed_up_responses_are_served_by_routes(stores):
+    cache, search = stores
+    asyncio.run(
+        warm_up_cache(
+            cache=cache,
+            search=search,
+            films_sorts=[None, "-imdb_rating"],
+            top_films=1,
+        ),
+    )
+    film_services = get_film_service.cache_info().misses
+    genre_services = get_genres_service.cache_info().misses
+    search.calls.clear()
+
+    client = TestClient(app)
+    responses = [
+        client.get("/api/v1/films/"),
+        client.get("/api/v1/films/", params={"sort": "-imdb_rating"}),
+        client.get("/api/v1/films/", params={"genre": "Action"}),
+        client.get("/api/v1/genres/"),
+    ]
+
+    assert [response.status_code for response in responses] == [
+        HTTPStatus.OK,
+    ] * 4
+    assert not search.calls
+    assert get_film_service.cache_info().misses == film_services
+    assert get_genres_service.cache_info().misses == genre_services
+    assert ("film", films[0]["id"]) in cache.data
+
+
+def test_failed_warm_up_does_not_raise(stores):
+    cache, _ = stores
+
+    asyncio.run(
+        warm_up_cache_until(timeout=1, cache=cache, search=object()),
+    )
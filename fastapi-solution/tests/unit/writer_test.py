@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from core.deadline import set_deadline, time_left
+from db.cache.writer import WriteBehindCache
+from tests.unit.fakes import FakeCache
+
+pytestmark = pytest.mark.asyncio
+
+
+class SlowCache(FakeCache):
+    """Cache, whose writes wait to be released and may fail."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.released = asyncio.Event()
+        self.fail_keys: set[str] = set()
+
+    async def set(self, name, key, key_value, expire_time=None):
+        await self.released.wait()
+        if key in self.fail_keys:
+            raise ConnectionError("cache is down")
+        await super().set(name, key, key_value, expire_time)
+
+
+async def test_writes_are_applied_in_background():
+    slow = SlowCache()
+    cache = WriteBehindCache(slow, workers=1)
+
+    await asyncio.wait_for(cache.set(name="film", key="1", key_value=1), 0.1)
+    assert slow.data == {}
+
+    slow.released.set()
+    await cache.close()
+
+    assert slow.data == {("film", "1"): 1}
+    assert cache.stats()["written"] == 1
+
+
+async def test_writes_are_dropped_when_queue_is_full():
+    slow = SlowCache()
+    cache = WriteBehindCache(slow, queue_size=1, workers=1)
+
+    for key in "123":
+        await cache.set(name="film", key=key, key_value=key)
+    await asyncio.sleep(0)
+    # Воркер забрал первую запись, в очереди освободилось место
+    await cache.set(name="film", key="4", key_value="4")
+    slow.released.set()
+    await cache.close()
+
+    assert set(slow.data) == {("film", "1"), ("film", "4")}
+    assert cache.stats()["dropped"] == 2
+
+
+async def test_failed_write_does_not_stop_workers():
+    slow = SlowCache()
+    slow.fail_keys.add("1")
+    slow.released.set()
+    cache = WriteBehindCache(slow, workers=1)
+
+    await cache.set(name="film", key="1", key_value=1)
+    await cache.mset(name="film", mapping={"2": 2})
+    await cache.close()
+
+    assert slow.data == {("film", "2"): 2}
+    assert cache.stats() == {
+        "pending": 0,
+        "written": 1,
+        "dropped": 0,
+        "failed": 1,
+    }
+
+
+async def test_close_applies_pending_writes_and_closes_cache():
+    slow = SlowCache()
+    slow.released.set()
+    cache = WriteBehindCache(slow, workers=2)
+
+    for key in range(10):
+        await cache.set(name="film", key=str(key), key_value=key)
+    await cache.close()
+
+    assert len(slow.data) == 10
+    assert slow.calls[-1] == "close"
+
+
+async def test_close_gives_up_on_stalled_writes():
+    slow = SlowCache()
+    cache = WriteBehindCache(slow, workers=1)
+    await cache.set(name="film", key="1", key_value=1)
+
+    await asyncio.wait_for(cache.close(timeout=0.01), 1)
+
+    assert slow.data == {}
+    assert slow.calls[-1] == "close"
+
+
+async def test_reads_are_not_queued():
+    slow = SlowCache()
+    slow.data[("film", "1")] = 1
+    cache = WriteBehindCache(slow)
+
+    assert await cache.get(name="film", key="1") == 1
+    assert await cache.mget(name="film", keys=["1", "2"]) == [1, None]
+
+
+async def test_writers_do_not_inherit_request_deadline():
+    class DeadlineCache(FakeCache):
+        async def set(self, name, key, key_value, expire_time=None):
+            await super().set(name, key, time_left(), expire_time)
+
+    deadlines = DeadlineCache()
+    cache = WriteBehindCache(deadlines, workers=1)
+
+    set_deadline(5)
+    await cache.set(name="film", key="1", key_value=1)
+    await cache.close()
+
+    assert deadlines.data == {("film", "1"): None}